@@ -0,0 +1,8 @@
+"""
+URLconf of the admin site. It is only imported, and the admin's URL patterns
+built, on the first request under admin/ (see config/urls.py), or when a URL
+is first reversed.
+"""
+from django.contrib import admin
+
+urlpatterns = admin.site.get_urls()
@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
+# Requests are not bound to a thread, so database connections are returned to
+# the per-process pool at the end of every request (see DB_POOL in settings)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
+
+# Readiness (the /ready view) waits for the warm-up, see core/utils/warmup.py
+from core.utils import warmup  # noqa: E402
+
+warmup.start()
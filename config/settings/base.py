@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _
 from datetime import timedelta
@@ -6,7 +7,19 @@ from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-DB_ENGINE = 'django.db.backends.postgresql_psycopg2'
+# PostgreSQL (psycopg2) backend with connection health checks and pooling
+DB_ENGINE = 'core.utils.db'
+# Under WSGI, every worker thread keeps its connection open for
+# DB_CONN_MAX_AGE seconds, checking it before reuse. Under ASGI, where
+# requests are not bound to a thread, config/asgi.py sets DB_CONN_MAX_AGE to
+# 0 and connections are borrowed from a per-process pool instead (see
+# core/utils/db/base.py).
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+DB_POOL = {
+    'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 0)),
+    'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'IDLE_TIMEOUT': 300,
+} if DB_CONN_MAX_AGE == 0 else None
 
 
 
@@ -38,6 +51,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Keep first so that the time spent in the other middleware is measured
+    'core.utils.metrics.MetricsMiddleware',
+    # Samples the stacks of selected requests; off unless PROFILING selects
+    # some (see core/utils/profiling.py)
+    'core.utils.profiling.ProfilerMiddleware',
+    # Collected static files, with their pre-compressed variants; only when
+    # DEBUG is off and STATIC_ROOT is set (see core/utils/staticfiles.py)
+    'core.utils.staticfiles.StaticFilesMiddleware',
+    # gzip/brotli; above the middleware that read or change response bodies
+    'core.utils.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +114,61 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing policy. New passwords, and older hashes on their user's
+# next login, are hashed with the first hasher of PASSWORD_HASHERS, which
+# PASSWORD_HASHER selects: 'scrypt' (standard library), 'argon2' (needs the
+# optional argon2-cffi package) or Django's default 'pbkdf2'. The others
+# only verify existing hashes.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')
+_PASSWORD_HASHERS = {
+    'scrypt': 'core.user.hashers.ScryptPasswordHasher',
+    'argon2': 'core.user.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Cost parameters of core.user.hashers, tuned for pods limited to 500m CPU
+# and 128Mi (see deployment/kubernetes): about 70ms of CPU and 16 MiB per
+# scrypt hash, against 130ms for PBKDF2. Run `python manage.py tune_hashers`
+# on the target hardware to pick values for a given hash time.
+PASSWORD_HASHING = {
+    'SCRYPT': {'N': 2 ** 14, 'R': 8, 'P': 1},
+    # MEMORY_COST in KiB
+    'ARGON2': {'TIME_COST': 2, 'MEMORY_COST': 16384, 'PARALLELISM': 1},
+}
+
+# Same as ModelBackend, but upgraded password hashes are saved on a
+# background thread after the login instead of during it
+AUTHENTICATION_BACKENDS = [
+    'core.user.backends.BackgroundRehashBackend',
+]
+
+
+# Sessions of the API documentation login (login/, logout/ and SchemaView).
+# SESSION_BACKEND is either 'cached_db' (core/user/sessions.py: sessions
+# are read from the cache and only written to the database when they
+# change), 'signed_cookies' (no server-side storage at all) or Django's
+# default 'db'. Purge expired database sessions with
+# `python manage.py purge_sessions`, e.g. from a CronJob.
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = {
+    'cached_db': 'core.user.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_BACKEND]
+# Unchanged sessions still have their database row rewritten after this many
+# seconds, to keep its expiry date up to date
+SESSION_WRITE_INTERVAL = 300
+# Seconds a session is read from the cache before the database is read
+# again: the cache is per pod, so a logout on one pod ends the session on
+# the others within this time
+SESSION_CACHE_TIMEOUT = 60
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -114,6 +192,34 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
+# Files collected to STATIC_ROOT are served by StaticFilesMiddleware from an
+# index built at startup. Files with hashed names (see
+# core.utils.staticfiles.CompressedManifestStaticFilesStorage) are cached
+# for a year; the others for MAX_AGE seconds. Compressed variants are made
+# by collectstatic, at the levels below, and only kept when at most
+# MIN_RATIO of the original size.
+STATIC_SERVING = {
+    'MAX_AGE': 60,
+    'MIN_RATIO': 0.95,
+    'GZIP_LEVEL': 9,
+    'BROTLI_QUALITY': 11,
+}
+
+
+# On-demand profiling of single requests (see core/utils/profiling.py):
+# requests with the header HEADER set to TOKEN (when TOKEN is set), and a
+# random SAMPLE_RATE share of all requests, have their stacks sampled every
+# INTERVAL seconds. The collapsed stacks go to DIR, which keeps the last
+# MAX_PROFILES of them, and are listed to staff users at api/profiles/.
+PROFILING = {
+    'TOKEN': os.getenv('PROFILING_TOKEN', ''),
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': float(os.getenv('PROFILING_SAMPLE_RATE', '0')),
+    'INTERVAL': 0.005,
+    'DIR': os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'django-profiles')),
+    'MAX_PROFILES': 100,
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -123,23 +229,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Declare what kind of authentication method to be used in RESTful API
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Same as rest_framework_simplejwt.authentication.JWTAuthentication,
+        # but caches verified tokens and their users (see AUTH_TOKEN_CACHE)
+        'core.user.authentication.CachedJWTAuthentication',
+        # For read-heavy internal services, use the following class instead
+        # to authorize from the token claims (staff flag, groups) alone,
+        # without a database lookup per request
+        # 'core.user.authentication.TokenClaimsAuthentication',
     ),
+    # Same output as rest_framework's JSON renderer/parser, but several
+    # times faster when orjson is installed (see core/services/renderers.py)
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-    )
-    # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    # 'PAGE_SIZE': 10
+        'core.services.renderers.FastJSONRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.services.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Keyset pagination: pages are fetched with a WHERE on the sort key
+    # instead of an OFFSET, so deep pages cost the same as the first one.
+    # Views set their sort key with a `cursor_ordering` attribute (see
+    # core/services/pagination.py); clients follow the next/previous links
+    # and may pass ?page_size= (up to 500).
+    'DEFAULT_PAGINATION_CLASS': 'core.services.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    # HTTP proxies in front of the pods which append the client address to
+    # X-Forwarded-For; throttles identify clients by the address the
+    # outermost one saw. With 0 (the LoadBalancer Service of the Kubernetes
+    # example adds no header), X-Forwarded-For is ignored and REMOTE_ADDR is
+    # used: a client could otherwise pick its address, and evade the per-IP
+    # limits, by sending the header itself.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # Sliding-window rate limits kept in THROTTLING['CACHE'] (see
+    # core/services/throttling.py). A rate of None disables a limit.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.services.throttling.AnonRateThrottle',
+        'core.services.throttling.UserRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Unauthenticated requests, per IP address
+        'anon': os.getenv('THROTTLE_ANON_RATE', '60/min'),
+        # Authenticated requests, per user
+        'user': os.getenv('THROTTLE_USER_RATE', '6000/min'),
+        # Attempts at api/token/ and login/auth/, per IP address and per
+        # username. Each attempt costs a password hash.
+        'login': os.getenv('THROTTLE_LOGIN_RATE', '30/min'),
+        'login_username': os.getenv('THROTTLE_LOGIN_USERNAME_RATE', '10/min'),
+    },
 }
 
+# Refresh token rotation, off unless TOKEN_ROTATION is set: it needs the
+# shared cache of TOKEN_REVOCATION['CACHE']
+TOKEN_ROTATION = os.getenv('TOKEN_ROTATION', 'false').lower() in ('1', 'true', 'yes')
+
 # JWT-based authentication configuration
 # See https://django-rest-framework-simplejwt.readthedocs.io/en/latest/settings.html
 SIMPLE_JWT = {
     # 'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'ACCESS_TOKEN_LIFETIME': timedelta(seconds=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
-    'BLACKLIST_AFTER_ROTATION': False,
+    # With TOKEN_ROTATION, every refresh returns a new refresh token and
+    # revokes the one it was given, in the cache-backed store of
+    # core/user/revocation.py (see TOKEN_REVOCATION) rather than the
+    # token_blacklist app's tables
+    'ROTATE_REFRESH_TOKENS': TOKEN_ROTATION,
+    'BLACKLIST_AFTER_ROTATION': TOKEN_ROTATION,
     'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
@@ -167,6 +322,55 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Cache of the table versions which validate the ETags of the viewsets using
+# ConditionalResponseMixin, and of the response bodies cached under them
+# (core/services/versions.py). It must be shared by all the pods: a change
+# saved on one pod must reach the versions every pod validates against.
+# Per-process and per-node caches are refused (system check services.E001)
+# unless ALLOW_LOCAL_CACHE is set, which only a single pod may do. Without
+# a suitable CACHE, responses are neither validated nor cached.
+TABLE_VERSIONS = {
+    'CACHE': 'versions',
+    'ALLOW_LOCAL_CACHE': False,
+}
+
+# Store of the refresh tokens revoked by rotation (core/user/revocation.py).
+# Revoked tokens are kept in CACHE until they expire, which takes two cache
+# entries per refresh over REFRESH_TOKEN_LIFETIME. CACHE must be a cache
+# alias of its own, shared by all the pods and which never culls entries
+# (see the production settings); with rotation on, refreshes fail until it
+# is. ALLOW_LOCAL_CACHE accepts any cache, for single-process setups only.
+# Cache alias of the rate limit counters. The limits hold across the
+# processes sharing it: with a cache local to each pod, like production's
+# default one, a client gets up to the number of replicas times each rate.
+THROTTLING = {
+    'CACHE': 'default',
+}
+
+# Each process checks revocations against a Bloom filter sized for CAPACITY
+# revocations per REFRESH_TOKEN_LIFETIME, which learns about the other
+# processes' revocations every SYNC_INTERVAL seconds.
+TOKEN_REVOCATION = {
+    'CACHE': None,
+    'ALLOW_LOCAL_CACHE': False,
+    'CAPACITY': 1000000,
+    'ERROR_RATE': 0.01,
+    'SYNC_INTERVAL': 1.0,
+}
+
+# Verified access tokens cached by CachedJWTAuthentication. Entries expire
+# with the token or after TIMEOUT seconds. The cache is per process, so a
+# deactivation or password change on one worker reaches the others within
+# TIMEOUT seconds at the latest.
+AUTH_TOKEN_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 300,
+}
+
+# Same as logging.config.dictConfig, but also wires the targets of the
+# non-blocking 'queue' handler below
+LOGGING_CONFIG = 'core.services.log.configure'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -177,6 +381,12 @@ LOGGING = {
         'simple': {
             'format': '%(levelname)s %(message)s'
         },
+        # Renders records from the core.services.log decorators as
+        # view/method/status/duration/size fields
+        'structured': {
+            '()': 'core.services.log.StructuredFormatter',
+            'format': '%(levelname)s %(message)s'
+        },
     },
     'handlers': {
         'console': {
@@ -190,13 +400,40 @@ LOGGING = {
             'filename': 'debug.log',
             'formatter': 'simple'
         },
+        'console_structured': {
+            'level': 'DEBUG',
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured'
+        },
+        # Non-blocking API logging: records are put on a bounded in-memory
+        # queue and formatted/written by a background listener thread.
+        # 'policy' is either 'drop' (discard records while the queue is full)
+        # or 'block' (wait up to 'timeout' seconds, None waits forever).
+        'queue': {
+            'level': 'DEBUG',
+            'class': 'core.services.log.QueueHandler',
+            'targets': [
+                'console_structured',
+                # Uncomment the following line if logs should also be written a file
+                # 'file',
+            ],
+            'maxsize': 10000,
+            'policy': 'drop',
+            'timeout': None,
+        },
     },
     'loggers': {
+        # Connection pool statistics (see core/utils/db/pool.py)
+        'core.utils.db': {
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': True,
+        },
         'core.services': {
             'handlers': [
-                'console',
-                # Uncomment the following line if logs should also be written a file
-                # 'file',
+                # Replace 'queue' with 'console' (and optionally 'file') to
+                # log synchronously on the request thread
+                'queue',
             ],
             'level': 'DEBUG',
             'propagate': True,
@@ -211,6 +448,61 @@ LOGGING = {
 #     for logger in LOGGING['loggers']:
 #         LOGGING['loggers'][logger]['handlers'] = ['console']
 
+# Per-request phase timings and SQL query counts of LoggedAPIView.
+# SAMPLE_RATE is the fraction of requests (0.0 - 1.0) which are timed.
+# Timings are logged and, if SERVER_TIMING_HEADER is set, sent to the
+# client in a Server-Timing header.
+API_TIMING = {
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING_HEADER': True,
+}
+
+# Latency histograms and request/error counters served at /metrics.
+# Each worker process writes to its own memory-mapped file in DIR, which
+# /metrics aggregates. DIR should be emptied when the container starts.
+METRICS = {
+    'DIR': os.getenv('METRICS_DIR', '/tmp/django-metrics'),
+    # Upper bounds (in seconds) of the latency histogram buckets
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    # Distinct (method, route) pairs tracked; any more are counted as "<other>"
+    'MAX_ROUTES': 256,
+}
+
+# Response compression (core/utils/compression.py). Brotli is used when the
+# optional brotli package is installed, gzip otherwise. Bodies smaller than
+# MIN_SIZE bytes are sent as they are. The levels favour speed, since most
+# responses are compressed on every request.
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+}
+
+# Work done by each process after it has started and before /ready answers
+# 200 (see core/utils/warmup.py): resolving the URLs (compiling the URL
+# patterns on their way) and compiling the templates of the first requests
+WARMUP = {
+    'ENABLED': os.getenv('WARMUP', 'true').lower() in ('1', 'true', 'yes'),
+    'URLS': (
+        '/api/token/',
+        '/api/token/refresh/',
+        '/api/token/verify/',
+        '/api/sample/',
+        '/api/users/',
+        '/api/groups/',
+        '/login/',
+        '/metrics',
+    ),
+    'TEMPLATES': (
+        'login.html',
+    ),
+}
+
+# Directory of the pre-rendered OpenAPI documents served at /api/docs.json,
+# /api/docs.yaml and /api/docs/?format=openapi. Fill it at build time with
+# `python manage.py build_schema`
+API_SCHEMA_ROOT = os.path.join(BASE_DIR, 'schema')
+
 # Specify custom Django login/logout endpoints in Swagger documenation
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': True,
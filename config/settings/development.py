@@ -22,7 +22,28 @@ DATABASES = {
         'PASSWORD': os.getenv('DBPASSWORD'),
         'HOST': os.getenv('DBHOST'),
         'PORT': 5432,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
     },
     
 
-}
\ No newline at end of file
+}
+
+# Cache shared by all the worker processes of a node (see core/utils/cache.py)
+CACHES = {
+    'default': {
+        'BACKEND': 'core.utils.cache.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/django-cache/cache.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 16 * 1024 * 1024,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# A single pod: the table versions (TABLE_VERSIONS) may live in its cache
+CACHES['versions'] = dict(CACHES['default'])
+TABLE_VERSIONS = dict(TABLE_VERSIONS, ALLOW_LOCAL_CACHE=True)
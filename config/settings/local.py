@@ -31,7 +31,21 @@ DATABASES = {
         'PASSWORD': os.getenv('DBPASSWORD'),
         'HOST': os.getenv('DBHOST'),
         'PORT': 5432,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
     },
     
 
-}
\ No newline at end of file
+}
+
+# Single-process development server: a per-process cache is enough
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# A single process: the table versions (TABLE_VERSIONS) may live in its cache
+CACHES['versions'] = dict(CACHES['default'])
+TABLE_VERSIONS = dict(TABLE_VERSIONS, ALLOW_LOCAL_CACHE=True)
@@ -4,11 +4,25 @@ DEBUG = False
 
 ALLOWED_HOSTS = []
 
+# Only time a small share of requests and keep timings out of responses
+API_TIMING = {
+    'SAMPLE_RATE': 0.01,
+    'SERVER_TIMING_HEADER': False,
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
 STATIC_URL = '/static/'
+# Filled at image build time by `python manage.py collectstatic --noinput`,
+# which also writes the hashed names and .br/.gz variants served by
+# core.utils.staticfiles.StaticFilesMiddleware
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+STATICFILES_DIRS = [
+    os.path.join(BASE_DIR, 'static'),
+]
+STATICFILES_STORAGE = 'core.utils.staticfiles.CompressedManifestStaticFilesStorage'
 
 
 
@@ -20,7 +34,56 @@ DATABASES = {
         'PASSWORD': os.getenv('DBPASSWORD'),
         'HOST': os.getenv('DBHOST'),
         'PORT': 5432,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
     },
     
 
-}
\ No newline at end of file
+}
+
+# Cache shared by all the worker processes of a node (see core/utils/cache.py).
+# It is local to the pod; LOCATION should be on a local (not network) disk.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.utils.cache.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/django-cache/cache.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'MAX_SIZE': 32 * 1024 * 1024,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Table versions and the responses they validate (TABLE_VERSIONS), in a
+# memcached shared by all the pods, e.g. VERSIONS_MEMCACHED=memcached:11211.
+# Without it, ETags and cached responses are off.
+if os.getenv('VERSIONS_MEMCACHED'):
+    CACHES['versions'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('VERSIONS_MEMCACHED'),
+        'TIMEOUT': 300,
+    }
+
+# Rate limit counters (THROTTLING), in a memcached shared by all the pods,
+# e.g. THROTTLE_MEMCACHED=memcached:11211. Without it each pod counts in its
+# own default cache, so the limits are multiplied by the replica count.
+if os.getenv('THROTTLE_MEMCACHED'):
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('THROTTLE_MEMCACHED'),
+    }
+    THROTTLING = dict(THROTTLING, CACHE='throttle')
+
+# Revoked refresh tokens (TOKEN_REVOCATION), in a memcached shared by all the
+# pods, e.g. TOKEN_REVOCATION_MEMCACHED=memcached:11211. Give it the memory
+# for two entries per refresh over REFRESH_TOKEN_LIFETIME, so that none is
+# evicted, and no other use.
+if os.getenv('TOKEN_REVOCATION_MEMCACHED'):
+    CACHES['token_revocation'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': os.getenv('TOKEN_REVOCATION_MEMCACHED'),
+    }
+    TOKEN_REVOCATION = dict(TOKEN_REVOCATION, CACHE='token_revocation')
@@ -1,3 +1,8 @@
 from config.settings.local import *
 
 # Insert test-specific config here
+
+# Password hashing is deliberately slow; tests only need it to work
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
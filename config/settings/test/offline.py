@@ -0,0 +1,41 @@
+import tempfile
+
+from config.settings.test.development import *
+
+# Self-contained settings for benchmarks (python manage.py benchmark) and
+# other checks which should not need a PostgreSQL server: a local SQLite
+# database and a per-process cache. Passwords are hashed with the fast
+# hasher of the test settings, so api/token/ benchmarks do not include the
+# cost of a production password hasher.
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['localhost', 'testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('OFFLINE_DB_NAME', os.path.join(tempfile.gettempdir(), 'django-offline.sqlite3')),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# A single process: revocations and table versions may live in the
+# per-process cache
+TOKEN_REVOCATION = dict(TOKEN_REVOCATION, CACHE='default', ALLOW_LOCAL_CACHE=True)
+CACHES['versions'] = dict(CACHES['default'])
+TABLE_VERSIONS = dict(TABLE_VERSIONS, ALLOW_LOCAL_CACHE=True)
+
+# Per-request log records would dominate the measurements
+LOGGING['loggers']['core.services']['level'] = 'WARNING'
+
+# Benchmarks send thousands of requests per second as a single user, from a
+# single address
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+    scope: None for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+}
@@ -13,29 +13,33 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView
-)
 from core.user.views import (
+    ClaimsTokenObtainPairView,
+    RevocationTokenVerifyView,
+    RotatingTokenRefreshView,
     login_view,
     login_authenticate_view,
     logout_view
 )
+from core.utils.urls import lazy_include
+from core.utils.views import metrics_view, ready_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Imported on first use, most processes never serve the admin
+    path('admin/', lazy_include('config.admin_urls', 'admin')),
     # API endpoints for token retrieval, refresh, verification
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/token/', ClaimsTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', RotatingTokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/verify/', RevocationTokenVerifyView.as_view(), name='token_verify'),
     # Sample API endpoints
     path('api/', include('core.services.urls')),
     # API documentation auth
     path('login/', login_view),
     path('login/auth/', login_authenticate_view),
     path('logout/', logout_view),
+    # Prometheus metrics of this instance
+    path('metrics', metrics_view),
+    # Readiness probe, answers 503 until the warm-up is done
+    path('ready', ready_view),
 ]
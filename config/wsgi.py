@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
 
 application = get_wsgi_application()
+
+# Readiness (the /ready view) waits for the warm-up, see core/utils/warmup.py
+from core.utils import warmup  # noqa: E402
+
+warmup.start()
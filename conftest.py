@@ -1 +1,157 @@
-# Insert pytest fixtures here
\ No newline at end of file
+# Insert pytest fixtures here
+import os
+import time
+from collections import namedtuple
+
+import pytest
+import requests
+from django.conf import settings
+from rest_framework.test import APIClient
+
+# pk is only known in process
+Credentials = namedtuple('Credentials', 'username password pk', defaults=(None,))
+
+USER1 = Credentials('user1', 'C@3vsRdNts8R5#N')
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--live', action='store_true',
+        help='Send the API tests to a running server at DJANGO_SERVER_HOST[:DJANGO_SERVER_PORT] '
+             '(localhost:8000 by default) instead of running them in process',
+    )
+
+
+def live_host():
+    srv_host, srv_port = os.getenv('DJANGO_SERVER_HOST'), os.getenv('DJANGO_SERVER_PORT')
+    if not srv_host:
+        return 'localhost:8000'
+    elif srv_port:
+        return f'{srv_host}:{srv_port}'
+    return srv_host
+
+
+class LiveClient:
+    """
+    Sends requests to a running server, over a single keep-alive session.
+    """
+
+    def __init__(self, host):
+        self.base_url = f'http://{host}'
+        self.session = requests.Session()
+
+    def get(self, path, headers=None):
+        return self.session.get(self.base_url + path, headers=headers)
+
+    def post(self, path, data=None, headers=None):
+        return self.session.post(self.base_url + path, data=data, headers=headers)
+
+
+class InProcessResponse:
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        self.text = response.content.decode()
+
+    def json(self):
+        return self.response.json()
+
+
+class InProcessClient:
+    """
+    Same interface as LiveClient, backed by DRF's APIClient.
+    """
+
+    def __init__(self):
+        self.client = APIClient()
+
+    def get(self, path, headers=None):
+        return InProcessResponse(self.client.get(path, **self._meta(headers)))
+
+    def post(self, path, data=None, headers=None):
+        return InProcessResponse(self.client.post(path, data, **self._meta(headers)))
+
+    @staticmethod
+    def _meta(headers):
+        return {'HTTP_' + name.upper().replace('-', '_'): value for name, value in (headers or {}).items()}
+
+
+@pytest.fixture(scope='session')
+def live(request):
+    return request.config.getoption('--live')
+
+
+@pytest.fixture
+def api(request, live):
+    """
+    Client for the API tests: in process by default, against a running
+    server with --live.
+    """
+    if live:
+        return LiveClient(live_host())
+    request.getfixturevalue('db')
+    return InProcessClient()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache(live):
+    # Table versions (core.services.versions) are bumped on commit, which
+    # never comes for tests run in a transaction, so responses cached by
+    # one test could be served to the next
+    if not live:
+        from django.core.cache import cache
+        cache.clear()
+
+
+@pytest.fixture(scope='session')
+def session_user1(request, live):
+    # Created once per session, outside of the tests' transactions. A live
+    # server is expected to have the user already.
+    if not live:
+        django_db_blocker = request.getfixturevalue('django_db_blocker')
+        request.getfixturevalue('django_db_setup')
+        with django_db_blocker.unblock():
+            return _ensure_user(USER1)
+    return USER1
+
+
+@pytest.fixture
+def user1(session_user1, live, api):
+    if not live:
+        # Tests using transactional_db empty the database after they run
+        return _ensure_user(session_user1)
+    return session_user1
+
+
+def _ensure_user(credentials):
+    from django.contrib.auth.models import User
+
+    user = User.objects.filter(username=credentials.username).first()
+    if user is None:
+        user = User.objects.create_user(credentials.username, password=credentials.password)
+    return credentials._replace(pk=user.pk)
+
+
+@pytest.fixture(scope='session')
+def _session_tokens():
+    # (username, pk) -> (tokens, obtained at)
+    return {}
+
+
+@pytest.fixture
+def tokens(api, user1, _session_tokens):
+    """
+    Access and refresh tokens of user1, obtained from api/token/ once and
+    reused for as long as the access token has at least half of its
+    lifetime left.
+    """
+    # A recreated user (see user1) has a new pk, and needs new tokens
+    key = (user1.username, user1.pk)
+    cached = _session_tokens.get(key)
+    max_age = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds() / 2
+    if cached is None or time.monotonic() - cached[1] > max_age:
+        res = api.post('/api/token/', data={'username': user1.username, 'password': user1.password})
+        cached = _session_tokens[key] = (res.json(), time.monotonic())
+    return cached[0]
+
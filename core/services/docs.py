@@ -0,0 +1,37 @@
+"""
+The API documentation views. They are imported on their first request (see
+core/services/urls.py), so that processes which never serve the
+documentation do not load drf_yasg.
+"""
+from django.http import HttpResponseRedirect
+from rest_framework import permissions, authentication
+from drf_yasg import openapi
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+from . import schema
+
+api_info = openapi.Info(
+   title="App API",
+   default_version='v1',
+   description="App API",
+   contact=openapi.Contact(email="cs@asklora.ai"),
+)
+
+_SchemaView = get_schema_view(
+   api_info,
+   # Comment the following line if the API documentation is open to public
+   authentication_classes=(authentication.SessionAuthentication,),
+   # Comment the following line if the API documentation is open to public
+   permission_classes=(permissions.IsAuthenticated,),
+)
+
+class SchemaView(_SchemaView):
+    def handle_exception(self, exc):
+        return HttpResponseRedirect('/login/')
+
+    def get(self, request, version='', format=None):
+        # Serve the pre-rendered schema (see core/services/schema.py). The
+        # authentication and permission checks above still apply.
+        if isinstance(request.accepted_renderer, _SpecRenderer):
+            return schema.schema_response(type(self), request, request.accepted_renderer)
+        return super().get(request, version, format)
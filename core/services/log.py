@@ -1,9 +1,123 @@
+import asyncio
+import functools
 import logging
-import json
+import logging.config
+import logging.handlers
+import os
+import queue
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
+class ApiRecord:
+    """
+    Small structured record captured by the logging decorators.
+
+    Only cheap attributes (view, method, path, user, status, duration, size)
+    and the short strings of the legacy ``;``-joined message are captured on
+    the request thread: the record keeps no reference to the request or the
+    response while it waits in the queue. The message is joined lazily in
+    ``__str__``, i.e. only when a handler actually formats the record, which
+    happens on the listener thread when the ``QueueHandler`` below is used.
+    """
+    __slots__ = (
+        'level', 'view', 'method', 'path', 'user', 'status', 'duration_ms', 'size',
+        'args', 'result', 'kwargs', 'deco_kwargs', 'with_result', 'started', 'timing',
+    )
+
+    def __init__(self, level, view, args, kwargs, deco_kwargs, with_result, started):
+        request = args[0] if args else None
+        user = getattr(request, 'user', None)
+        self.level = level
+        self.view = type(view).__name__
+        self.method = getattr(request, 'method', None)
+        self.path = getattr(request, 'path', None)
+        self.user = user.pk if user is not None and user.is_authenticated else None
+        self.status = None
+        self.duration_ms = None
+        self.size = None
+        self.args = [str(x) for x in args]
+        self.result = None
+        self.kwargs = [f"{k}:{str(v)}" for k, v in kwargs.items()]
+        self.deco_kwargs = deco_kwargs
+        self.with_result = with_result
+        self.started = started
+        # Phase timings of LoggedAPIView, when the request was sampled
+        self.timing = getattr(view, 'timing', None)
+
+    def schedule(self, result):
+        # Template responses (DRF's Response included) are rendered by Django
+        # after dispatch returns, so wait for rendering to know the body size.
+        # If the response is already rendered the callback runs immediately.
+        if hasattr(result, 'add_post_render_callback'):
+            result.add_post_render_callback(self.emit)
+        else:
+            self.emit(result)
+
+    def emit(self, result):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        self.status = getattr(result, 'status_code', None)
+        if result is not None and not getattr(result, 'streaming', True):
+            self.size = len(result.content)
+        if self.with_result:
+            self.result = str(result)
+        logger.log(self.level, self, extra=self.fields())
+
+    def fields(self):
+        fields = {
+            'api': self,
+            'view': self.view,
+            'method': self.method,
+            'path': self.path,
+            'user': self.user,
+            'status': self.status,
+            'duration_ms': self.duration_ms,
+            'size': self.size,
+        }
+        if self.timing is not None:
+            fields.update(self.timing.fields())
+        return fields
+
+    def __str__(self):
+        msg_parts = list(self.args)
+        if self.with_result:
+            msg_parts.append(self.result)
+        msg_parts.extend(self.kwargs)
+
+        if len(self.deco_kwargs):
+            msg_parts.extend([
+                f"{k}:{v}" if isinstance(v, str) else f"{k}:{str(v)}" for k, v in self.deco_kwargs.items()
+            ])
+        return ";".join(msg_parts)
+
+
+def _logged(level, deco_kwargs, with_result):
+    def _decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_object_method_wrapper(self, *args, **kwargs):
+                if not logger.isEnabledFor(level):
+                    return await func(self, *args, **kwargs)
+                started = time.perf_counter()
+                result = await func(self, *args, **kwargs)
+                ApiRecord(level, self, args, kwargs, deco_kwargs, with_result, started).schedule(result)
+                return result
+            return async_object_method_wrapper
+
+        @functools.wraps(func)
+        def object_method_wrapper(self, *args, **kwargs):
+            if not logger.isEnabledFor(level):
+                return func(self, *args, **kwargs)
+            started = time.perf_counter()
+            result = func(self, *args, **kwargs)
+            ApiRecord(level, self, args, kwargs, deco_kwargs, with_result, started).schedule(result)
+            return result
+        return object_method_wrapper
+    return _decorator
+
+
 def info(**deco_kwargs):
     """
 Basic definition of request method decorator for INFO-type logging
@@ -17,21 +131,7 @@ def get(self, request, *args, **kwargs):
     ...
 
     """
-    def _decorator(func):
-        def object_method_wrapper(self, *args, **kwargs):
-            result = func(self, *args, **kwargs)
-            msg_parts = [str(x) for x in args]
-            msg_parts.extend([f"{k}:{str(v)}" for k, v in kwargs.items()])
-
-            if len(deco_kwargs):
-                msg_parts.extend([
-                    f"{k}:{v}" if isinstance(v, str) else f"{k}:{str(v)}" for k, v in deco_kwargs.items()
-                ])
-
-            logger.info(";".join(msg_parts))
-            return result
-        return object_method_wrapper
-    return _decorator
+    return _logged(logging.INFO, deco_kwargs, with_result=False)
 
 def debug(**deco_kwargs):
     """
@@ -46,19 +146,162 @@ def get(self, request, *args, **kwargs):
     ...
 
     """
-    def _decorator(func):
-        def object_method_wrapper(self, *args, **kwargs):
-            result = func(self, *args, **kwargs)
-            msg_parts = [str(x) for x in args]
-            msg_parts.extend([str(result)])
-            msg_parts.extend([f"{k}:{str(v)}" for k, v in kwargs.items()])
+    return _logged(logging.DEBUG, deco_kwargs, with_result=True)
 
-            if len(deco_kwargs):
-                msg_parts.extend([
-                    f"{k}:{v}" if isinstance(v, str) else f"{k}:{str(v)}" for k, v in deco_kwargs.items()
-                ])
 
-            logger.debug(";".join(msg_parts))
-            return result
-        return object_method_wrapper
-    return _decorator
\ No newline at end of file
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records produced by the decorators above as one line of
+    structured fields. Any other record falls back to the regular format.
+    """
+    api_format = (
+        '%(levelname)s view=%(view)s method=%(method)s path=%(path)s status=%(status)s'
+        ' duration_ms=%(duration_ms).1f size=%(size)s user=%(user)s'
+    )
+
+    def format(self, record):
+        api = getattr(record, 'api', None)
+        if api is None or api.duration_ms is None:
+            return super().format(record)
+        line = self.api_format % record.__dict__
+        if api.timing is not None:
+            line += ' ' + ' '.join(
+                f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in api.timing.fields().items()
+            )
+        if api.deco_kwargs:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in api.deco_kwargs.items())
+        return line
+
+
+class _QueueListener(logging.handlers.QueueListener):
+
+    def __init__(self, source, *handlers):
+        super().__init__(source.queue, *handlers, respect_handler_level=True)
+        self.source = source
+        self.reported_drops = 0
+
+    def prepare(self, record):
+        # Runs on the listener thread, so reporting drops costs the request
+        # threads nothing.
+        dropped = self.source.dropped
+        if dropped != self.reported_drops:
+            warning = logging.makeLogRecord({
+                'name': logger.name,
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': '%d log records dropped, queue full',
+                'args': (dropped - self.reported_drops,),
+            })
+            self.reported_drops = dropped
+            for handler in self.handlers:
+                if warning.levelno >= handler.level:
+                    handler.handle(warning)
+        return record
+
+    def enqueue_sentinel(self):
+        # The stock implementation uses put_nowait(), which fails on a full
+        # bounded queue.
+        self.queue.put(self._sentinel)
+
+
+class QueueHandler(logging.Handler):
+    """
+    Hands log records to a bounded in-memory queue drained by a background
+    listener thread, so formatting and stream/file writes never happen on
+    the request thread.
+
+    ``targets`` are the names of handlers from the ``LOGGING`` dict which the
+    listener forwards records to. When the queue is full, ``policy`` decides
+    whether records are dropped ('drop') or the caller waits for up to
+    ``timeout`` seconds for room ('block').
+
+    Usage:
+    ---
+    'handlers': {
+        'queue': {
+            'class': 'core.services.log.QueueHandler',
+            'targets': ['console'],
+            'maxsize': 10000,
+            'policy': 'drop',
+        },
+    }
+    """
+    policies = ('drop', 'block')
+
+    def __init__(self, targets=('console',), maxsize=10000, policy='drop', timeout=None):
+        super().__init__()
+        if policy not in self.policies:
+            raise ValueError(f"policy must be one of {self.policies}, got {policy!r}")
+        self.targets = list(targets)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.timeout = timeout
+        self.handlers = []
+        self.queue = None
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def resolve_targets(self, handlers):
+        """
+        Binds the handlers named in ``targets`` from a name -> handler
+        mapping. Holding them here also keeps handlers which no logger
+        references directly from being garbage collected.
+        """
+        missing = [name for name in self.targets if name not in handlers]
+        if missing:
+            raise ValueError(f"Unknown logging handlers: {', '.join(missing)}")
+        self.handlers = [handlers[name] for name in self.targets]
+
+    def _start(self):
+        # Started on first use rather than at configuration time: a listener
+        # thread started before a pre-fork server forks its workers would not
+        # survive in the workers.
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.maxsize)
+            self.dropped = 0
+            self.listener = _QueueListener(self, *self.handlers)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def emit(self, record):
+        try:
+            if self._pid != os.getpid():
+                self._start()
+            if self.policy == 'block':
+                self.queue.put(record, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        with self._start_lock:
+            listener, self.listener = self.listener, None
+            if listener is not None and self._pid == os.getpid():
+                listener.stop()
+        super().close()
+
+
+class DictConfigurator(logging.config.DictConfigurator):
+
+    def configure(self):
+        super().configure()
+        # Handlers have been instantiated and stored back by name by now
+        handlers = self.config.get('handlers', {})
+        for handler in handlers.values():
+            if isinstance(handler, QueueHandler):
+                handler.resolve_targets(handlers)
+
+
+def configure(logging_settings):
+    """
+    Drop-in replacement for ``logging.config.dictConfig`` which also wires
+    ``QueueHandler`` targets. Enabled with ``LOGGING_CONFIG`` in settings.
+    """
+    DictConfigurator(logging_settings).configure()
@@ -0,0 +1,74 @@
+import datetime
+import io
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.services.parsers import FastJSONParser
+from core.services.renderers import FastJSONRenderer, orjson
+
+
+def sample_payload(rows):
+    """
+    A paginated list response shaped like the output of UserSerializer
+    (which renders dates as strings already).
+    """
+    joined = datetime.datetime(2021, 1, 1)
+    return {
+        'next': 'http://localhost:8000/api/users/?cursor=cD0yMDIxLTAxLTAx',
+        'previous': None,
+        'results': [
+            {
+                'url': f'http://localhost:8000/api/users/{i}/',
+                'username': f'user{i}',
+                'email': f'user{i}@example.com',
+                'first_name': 'Zoë',
+                'is_active': True,
+                'date_joined': (joined + datetime.timedelta(minutes=i)).isoformat() + 'Z',
+                'groups': [f'http://localhost:8000/api/groups/{g}/' for g in range(i % 4)],
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark of FastJSONRenderer/FastJSONParser against DRF's "
+        'JSONRenderer/JSONParser on a list response of --rows rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs')
+        parser.add_argument('--number', type=int, default=20, help='Calls per run')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed, FastJSONRenderer falls back to JSONRenderer')
+
+        data = sample_payload(options['rows'])
+        rendered = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != rendered:
+            self.stderr.write(self.style.ERROR('FastJSONRenderer output differs from JSONRenderer'))
+        body = json.dumps(data).encode()
+        self.stdout.write(f"{options['rows']} rows, {len(rendered)} bytes")
+
+        cases = [
+            ('render', JSONRenderer(), FastJSONRenderer(), lambda r: r.render(data)),
+            ('parse', JSONParser(), FastJSONParser(), lambda p: p.parse(io.BytesIO(body))),
+        ]
+        for name, baseline, fast, call in cases:
+            baseline_time = self.time(lambda: call(baseline), options)
+            fast_time = self.time(lambda: call(fast), options)
+            self.stdout.write(
+                f'{name:<7} {type(baseline).__name__:<12} {baseline_time * 1000:8.3f}ms  '
+                f'{type(fast).__name__:<16} {fast_time * 1000:8.3f}ms  x{baseline_time / fast_time:.1f}'
+            )
+
+    @staticmethod
+    def time(func, options):
+        return min(timeit.repeat(func, repeat=options['repeat'], number=options['number'])) / options['number']
@@ -0,0 +1,137 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.http import urlencode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.utils import loadtest
+from core.utils.loadtest import PROTOCOLS
+
+SCENARIOS = ('token', 'refresh', 'sample', 'users', 'mixed')
+USERNAME = 'benchmark'
+PASSWORD = 'C@3vsRdNts8R5#N'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks api/token/, api/token/refresh/, api/sample/ and api/users/ '
+        'in process under concurrent load, and saves throughput, latency '
+        'percentiles and queries per request as JSON (compare two runs with '
+        'benchmark_compare). Run offline with '
+        '--settings=config.settings.test.offline --setup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                            help='Defaults to all of them; mixed sends all the requests at once')
+        parser.add_argument('--protocol', choices=list(PROTOCOLS), default='wsgi')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario')
+        parser.add_argument('--warmup', type=float, default=0.5, help='Seconds per scenario')
+        parser.add_argument('--output', help='Defaults to benchmarks/<date>-<commit>.json')
+        parser.add_argument('--setup', action='store_true',
+                            help=f"Migrate the database and create the '{USERNAME}' staff user and --users users")
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--username', default=USERNAME, help='Staff user the requests are made as')
+        parser.add_argument('--password', default=PASSWORD)
+
+    def handle(self, *args, **options):
+        if options['setup']:
+            self.setup(options)
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get_by_natural_key(options['username'])
+        except user_model.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist, create it with --setup")
+
+        requests = self.requests(user, options)
+        get_application, run = PROTOCOLS[options['protocol']]
+        application = get_application()
+        counter = loadtest.QueryCounter()
+        counter.install()
+
+        results = {}
+        self.stdout.write(f"{'scenario':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}  statuses")
+        try:
+            for scenario in options['scenario'] or SCENARIOS:
+                scenario_requests = sum(requests.values(), []) if scenario == 'mixed' else requests[scenario]
+                if options['warmup']:
+                    run(application, scenario_requests, options['concurrency'], options['warmup'])
+                counter.count = 0
+                summary = run(application, scenario_requests, options['concurrency'], options['duration']).summary()
+                summary['queries_per_request'] = counter.count / summary['requests'] if summary['requests'] else None
+                results[scenario] = summary
+                self.stdout.write(
+                    f"{scenario:<10}{summary['throughput']:>9.1f}{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}"
+                    f"{summary['p99_ms']:>9.2f}{summary['queries_per_request']:>9.2f}  {summary['statuses']}"
+                )
+        finally:
+            counter.uninstall()
+
+        meta = self.meta(options)
+        output = options['output'] or os.path.join(
+            'benchmarks', f"{meta['created'][:19].replace(':', '')}-{meta['commit'] or 'nogit'}.json"
+        )
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({'meta': meta, 'scenarios': results}, f, indent=2)
+        self.stdout.write(f'Saved to {output}')
+
+    def setup(self, options):
+        call_command('migrate', verbosity=0, interactive=False)
+        user_model = get_user_model()
+        if not user_model.objects.filter(username=options['username']).exists():
+            user_model.objects.create_user(options['username'], password=options['password'], is_staff=True)
+        existing = user_model.objects.filter(username__startswith='benchmark-').count()
+        user_model.objects.bulk_create(
+            user_model(username=f'benchmark-{i}', email=f'benchmark-{i}@example.com')
+            for i in range(existing, options['users'])
+        )
+
+    def requests(self, user, options):
+        refresh = RefreshToken.for_user(user)
+        authorization = (('Authorization', f'Bearer {refresh.access_token}'),)
+        form = (('Content-Type', 'application/x-www-form-urlencoded'),)
+        return {
+            'token': [loadtest.Request('POST', '/api/token/', form, urlencode({
+                'username': options['username'], 'password': options['password'],
+            }).encode())],
+            # Refresh tokens are revoked once used (ROTATE_REFRESH_TOKENS), so
+            # every request sends a new one
+            'refresh': [loadtest.Request('POST', '/api/token/refresh/', form, lambda: urlencode({
+                'refresh': str(RefreshToken.for_user(user)),
+            }).encode())],
+            'sample': [loadtest.Request('GET', '/api/sample/', authorization)],
+            'users': [loadtest.Request('GET', '/api/users/', authorization)],
+        }
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': commit,
+            'settings': settings.SETTINGS_MODULE,
+            'database': settings.DATABASES['default']['ENGINE'],
+            # The test settings use a fast hasher, which changes the cost of
+            # api/token/ entirely
+            'password_hasher': settings.PASSWORD_HASHERS[0],
+            'protocol': options['protocol'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
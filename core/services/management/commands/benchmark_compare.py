@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Metric, whether higher is better
+METRICS = (
+    ('throughput', True),
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('p99_ms', False),
+    ('queries_per_request', False),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares two result files of the benchmark command and flags the '
+        'metrics which got worse by more than --threshold percent (or, for '
+        'queries per request, at all).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Percent, defaults to 10')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error status if anything regressed')
+
+    def handle(self, *args, **options):
+        baseline, current = self.load(options['baseline']), self.load(options['current'])
+        self.stdout.write(f"baseline: {self.describe(baseline)}")
+        self.stdout.write(f"current:  {self.describe(current)}")
+
+        regressions = []
+        self.stdout.write(f"{'scenario':<10}{'metric':<21}{'baseline':>11}{'current':>11}{'change':>10}")
+        for scenario, results in current['scenarios'].items():
+            before = baseline['scenarios'].get(scenario)
+            if before is None:
+                continue
+            for metric, higher_is_better in METRICS:
+                old, new = before.get(metric), results.get(metric)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old * 100 if old else (0.0 if new == old else float('inf'))
+                worse = change < 0 if higher_is_better else change > 0
+                if metric == 'queries_per_request':
+                    regressed = worse and abs(new - old) >= 0.01
+                else:
+                    regressed = worse and abs(change) > options['threshold']
+                line = f"{scenario:<10}{metric:<21}{old:>11.2f}{new:>11.2f}{change:>+9.1f}%"
+                if regressed:
+                    regressions.append(f'{scenario} {metric}')
+                    line = self.style.ERROR(line + '  regression')
+                self.stdout.write(line)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressions: {', '.join(regressions)}")
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def describe(self, results):
+        meta = results.get('meta', {})
+        return ', '.join(f'{key}={meta.get(key)}' for key in ('commit', 'created', 'protocol', 'concurrency', 'database'))
@@ -0,0 +1,26 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.services import schema
+from core.services.docs import SchemaView
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders the OpenAPI documents served by SchemaView, one directory per '
+        'combination of the is_staff and is_superuser flags, with gzip/brotli '
+        'variants, to API_SCHEMA_ROOT. Run it once per build/deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.API_SCHEMA_ROOT, help='Defaults to API_SCHEMA_ROOT')
+
+    def handle(self, *args, **options):
+        documents = schema.generate(SchemaView)
+        schema.write(documents, options['output'])
+        for variant, variant_documents in documents.items():
+            for name, document in variant_documents.items():
+                sizes = ', '.join(f"{coding or 'identity'} {len(content)}B" for coding, content in document.variants.items())
+                self.stdout.write(f"{os.path.join(options['output'], variant, name)}: {sizes}")
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.utils import loadtest
+from core.utils.loadtest import PROTOCOLS
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the throughput and latency of API endpoints served over WSGI '
+        'and ASGI, in process (see core/utils/loadtest.py). Requests are '
+        'authenticated with an access token of --username.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/api/sample/', '/api/sample/async/'])
+        parser.add_argument('--username', default='user1')
+        parser.add_argument('--protocol', choices=list(PROTOCOLS), action='append',
+                            help='Defaults to both')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get_by_natural_key(options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist, pick another one with --username")
+        headers = (('Authorization', f'Bearer {AccessToken.for_user(user)}'),)
+
+        self.stdout.write(
+            f"{'protocol':<9}{'path':<24}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses"
+        )
+        for protocol in options['protocol'] or list(PROTOCOLS):
+            get_application, run = PROTOCOLS[protocol]
+            application = get_application()
+            for path in options['paths']:
+                requests = [loadtest.Request('GET', path, headers)]
+                # Warm up (imports, token cache, connections)
+                run(application, requests, 1, 0.2)
+                summary = run(application, requests, options['concurrency'], options['duration']).summary()
+                self.stdout.write(
+                    f"{protocol:<9}{path:<24}{summary['throughput']:>9.0f}{summary['p50_ms']:>9.2f}"
+                    f"{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}  {summary['statuses']}"
+                )
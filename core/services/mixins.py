@@ -0,0 +1,279 @@
+import hashlib
+import itertools
+import math
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import relations, serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import versions
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import requested_fields
+
+
+class SparseFieldsetViewMixin:
+    """
+    For viewsets whose serializer uses serializers.SparseFieldsetMixin:
+    when ``?fields=`` is given, only the columns behind the requested
+    fields are selected, with ``.only()``.
+
+    If any requested field is not backed by a concrete column of the model
+    (e.g. a SerializerMethodField or a dotted source), the queryset is left
+    untouched, since deferring columns such a field reads would cost one
+    query per row.
+
+    The columns of the pagination's sort key (``cursor_ordering``, see
+    core.services.pagination) are always selected, the paginator reads them
+    from the page's rows to build its cursors.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if requested_fields(self.request) is None:
+            return queryset
+        columns = self.get_sparse_columns(queryset.model, self.get_serializer().fields)
+        if columns is None:
+            return queryset
+        return queryset.only(*columns, *self.get_ordering_columns(queryset.model))
+
+    def get_ordering_columns(self, model):
+        ordering = getattr(self, 'cursor_ordering', None) or getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        columns = set()
+        for name in ordering:
+            try:
+                model_field = model._meta.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                # 'pk', or a lookup through a relation
+                continue
+            if model_field.concrete:
+                columns.add(model_field.name)
+        return columns
+
+    def get_sparse_columns(self, model, fields):
+        # The primary key is always loaded, hyperlinks are built from it
+        columns = {model._meta.pk.name}
+        for field in fields.values():
+            if isinstance(field, relations.HyperlinkedIdentityField):
+                columns.add(field.lookup_field)
+                continue
+            if isinstance(field, relations.ManyRelatedField):
+                # Fetched by a separate query anyway
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            columns.add(model_field.name)
+        return columns
+
+
+class ConditionalResponseMixin:
+    """
+    For read-only viewsets: ``list`` and ``retrieve`` responses carry an
+    ETag and a Last-Modified derived from the version counters of
+    ``etag_models`` (see core.services.versions), so that clients
+    revalidating with If-None-Match or If-Modified-Since get a 304 without
+    a single row being queried or serialized.
+
+    With ``cache_responses``, rendered bodies are also kept in the cache of
+    the versions under their ETag. The ETag covers the table versions, the URL
+    (query string included), the renderer and ``get_cache_variant``, so any
+    change to the tables invalidates the cached bodies.
+
+    ``etag_models`` must list every model the serializer reads from, and
+    each of them must be tracked with ``versions.track``. Without a cache
+    shared by all the pods (see core.services.versions), responses are
+    neither validated nor cached.
+    """
+    etag_models = None
+    cache_responses = False
+    response_cache_timeout = 300
+
+    def get_etag_models(self):
+        return self.etag_models or (self.queryset.model,)
+
+    def get_cache_variant(self, request):
+        # What the body depends on besides the URL: by default, the flags
+        # the permissions of these viewsets check
+        user = request.user
+        return bool(getattr(user, 'is_staff', False)), bool(getattr(user, 'is_superuser', False))
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        cache = versions.get_cache()
+        if cache is None:
+            return handler(request, *args, **kwargs)
+        models = self.get_etag_models()
+        for model in models:
+            if not versions.is_tracked(model):
+                raise ImproperlyConfigured('%s is not tracked by core.services.versions' % model._meta.label)
+        table_versions = versions.get_versions(models)
+        key = repr((
+            [version for version, _ in table_versions],
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            self.get_cache_variant(request),
+        ))
+        etag = 'W/"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+        last_modified = math.ceil(max(modified for _, modified in table_versions))
+
+        response = get_conditional_response(request, etag, last_modified)
+        if response is None and self.cache_responses:
+            response = self.get_cached_response(cache, etag)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if self.cache_responses and isinstance(response, Response) and response.status_code == 200:
+                response.add_post_render_callback(lambda rendered: self.cache_response(cache, etag, rendered))
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # The body depends on the user, so only the client may keep it,
+            # and revalidates it every time
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def get_cached_response(self, cache, etag):
+        cached = cache.get('response:%s' % etag)
+        if cached is None:
+            return None
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def cache_response(self, cache, etag, response):
+        cache.set('response:%s' % etag, (response.content, response['Content-Type']), self.response_cache_timeout)
+
+
+class StreamingExportMixin:
+    """
+    Adds an ``export/`` action to a viewset, which streams the whole
+    (filtered) queryset as NDJSON, or as CSV with ``?format=csv`` or
+    ``Accept: text/csv``.
+
+    Rows are read with ``.iterator()`` (a server-side cursor on PostgreSQL)
+    and serialized and sent chunk by chunk, so memory use does not grow
+    with the size of the table. Prefetches, which ``.iterator()`` ignores,
+    are run per chunk instead.
+    """
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer], pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        fields = [name for name, field in serializer.fields.items() if not field.write_only]
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.render_stream(self.iter_export_rows(queryset, serializer), fields),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{renderer.format}"'
+        return response
+
+    def iter_export_rows(self, queryset, serializer):
+        prefetch = queryset._prefetch_related_lookups
+        instances = queryset.prefetch_related(None).iterator(chunk_size=self.export_chunk_size)
+        while True:
+            chunk = list(itertools.islice(instances, self.export_chunk_size))
+            if not chunk:
+                return
+            if prefetch:
+                prefetch_related_objects(chunk, *prefetch)
+            for instance in chunk:
+                yield serializer.to_representation(instance)
+
+
+class PrefetchPlanningMixin:
+    """
+    Applies the select_related/prefetch_related calls the viewset's
+    serializer needs, so that rendering a list costs a fixed number of
+    queries instead of one (or more) per row. The plan is derived from the
+    serializer's fields every time, so it follows changes to ``Meta.fields``
+    and ``?fields=``.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select, prefetch = plan_related(queryset.model, self.get_serializer().fields)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+def plan_related(model, fields, prefix='', prefetching=False, plan=None):
+    """
+    Returns the sorted (select_related, prefetch_related) lookups needed to
+    serialize instances of ``model`` with ``fields``.
+
+    To-one relations are joined, to-many ones are prefetched, as is
+    everything below a prefetched relation. Nested serializers are planned
+    recursively.
+    """
+    select, prefetch = plan = plan or (set(), set())
+    for field in fields.values():
+        if field.source == '*':
+            if isinstance(field, serializers.Serializer):
+                plan_related(model, field.fields, prefix, prefetching, plan)
+            continue
+
+        current, path, prefetch_path = model, prefix, prefetching
+        attrs = field.source_attrs
+        for index, attr in enumerate(attrs):
+            relation = _get_relation(current, attr)
+            if relation is None:
+                break
+            if index == len(attrs) - 1 and not _needs_related_object(field):
+                break
+            path += attr
+            if prefetch_path or relation.one_to_many or relation.many_to_many:
+                prefetch.add(path)
+                prefetch_path = True
+            else:
+                select.add(path)
+            current = relation.related_model
+            path += '__'
+        else:
+            if isinstance(field, serializers.ListSerializer):
+                plan_related(current, field.child.fields, path, prefetch_path, plan)
+            elif isinstance(field, serializers.Serializer):
+                plan_related(current, field.fields, path, prefetch_path, plan)
+    return sorted(select), sorted(prefetch)
+
+
+def _get_relation(model, name):
+    """
+    The relation of ``model`` accessed as attribute ``name``, including
+    reverse relations (e.g. ``user_set``), or None.
+    """
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        accessor = field.get_accessor_name() if not field.concrete and field.auto_created else field.name
+        if accessor == name:
+            return field
+    return None
+
+
+def _needs_related_object(field):
+    # Related fields rendered from the primary key alone (PrimaryKeyRelatedField,
+    # HyperlinkedRelatedField on pk) read the foreign key column, to-one
+    # relations do not have to be fetched for them
+    if isinstance(field, relations.RelatedField):
+        return not field.use_pk_only_optimization()
+    return True
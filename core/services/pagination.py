@@ -0,0 +1,130 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite, unique sort key such as
+    (date_joined, id). The cursor stores the key of the last row of a page
+    and the next page is fetched with a ``WHERE (key) < (cursor)`` style
+    filter, so with a matching index every page costs the same as the
+    first one. Unlike CursorPagination, no offset is ever needed since the
+    key is unique.
+
+    Views choose their sort key with a ``cursor_ordering`` attribute; the
+    primary key is appended to it when missing to make it unique.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (reverse, current_position) = (False, None)
+        else:
+            (_, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._after(current_position, reverse))
+
+        # Always fetch an extra item to know whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        has_following_position = len(results) > len(self.page)
+
+        # The links point just past the edges of the page: the previous page
+        # ends before its first item and the next one starts after its last
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+        # (or back to the cursor itself if the page is empty)
+        if self.has_next:
+            self.next_position = self._position(self.page[-1] if self.page else None, current_position)
+        if self.has_previous:
+            self.previous_position = self._position(self.page[0] if self.page else None, current_position)
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _after(self, position, reverse):
+        """
+        Filter for the rows strictly after ``position`` in the (possibly
+        reversed) ordering, expanded as
+        ``f1 > p1 OR (f1 = p1 AND f2 > p2) OR ...``, plus a ``f1 >= p1``
+        bound which lets the database range-scan the index.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        lookups = []
+        for field, value in zip(self.ordering, values):
+            attr = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            lookups.append((attr, lookup))
+            condition |= equal & Q(**{f'{attr}__{lookup}': value})
+            equal &= Q(**{attr: value})
+        attr, lookup = lookups[0]
+        return Q(**{f'{attr}__{lookup}e': values[0]}) & condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # Positions are unique, so the cursor never needs an offset
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def _position(self, instance, default):
+        if instance is None:
+            return default
+        return self._get_position_from_instance(instance, self.ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            attr = field.lstrip('-')
+            value = instance[attr] if isinstance(instance, dict) else getattr(instance, attr)
+            values.append(str(value))
+        return json.dumps(values, separators=(',', ':'))
+
@@ -0,0 +1,108 @@
+"""
+JSON renderer backed by orjson, when it is installed.
+
+The output is byte-for-byte the same as rest_framework's JSONRenderer with
+the default settings (UNICODE_JSON and COMPACT_JSON on): same separators,
+raw UTF-8, ``\\u2028``/``\\u2029`` escaped, and dates, decimals, lazy strings
+etc. converted by DRF's own encoder. The exceptions are floats which
+Python writes with an exponent (``1e-07`` vs ``1e-7``, same value) and,
+when STRICT_JSON is off, NaN and infinities, which orjson writes as null.
+
+Whenever orjson cannot encode the data (e.g. integers over 64 bits), or
+pretty-printing or ASCII output is requested, rendering falls back to
+JSONRenderer.
+
+NDJSONRenderer and CSVRenderer render rows one at a time for the streaming
+exports of core.services.mixins.StreamingExportMixin.
+"""
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    # Dates and times are left to DRF's encoder, whose format differs
+    # from orjson's (e.g. 'Z' instead of '+00:00')
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer, keep the output a strict javascript subset
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Newline-delimited JSON: one compact JSON document per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        return None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.render_stream(rows))
+
+    def render_stream(self, rows, fields=None):
+        for row in rows:
+            yield super().render(row) + b'\n'
+
+
+class _Line:
+    # File-like object for csv.writer, which hands back what it was given
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. Nested values (lists, objects) are written as
+    JSON, None as an empty cell.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return b''.join(self.render_stream(rows, fields))
+
+    def render_stream(self, rows, fields):
+        writer = csv.writer(_Line())
+        yield writer.writerow(fields).encode()
+        for row in rows:
+            yield writer.writerow([self.cell(row.get(field)) for field in fields]).encode()
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+        return value
@@ -0,0 +1,175 @@
+"""
+Pre-rendered OpenAPI documents for SchemaView.
+
+Generating the schema walks every view and serializer, so it is done once:
+either at build time with ``python manage.py build_schema``, which writes
+the documents and their gzip/brotli variants to API_SCHEMA_ROOT, or, if
+those files are missing, on the first request of each process. With DEBUG
+on the schema is regenerated on every request, so that it follows code
+changes.
+
+Each viewer gets the endpoints their permissions allow. Since the
+permissions of these views only check the is_staff and is_superuser flags,
+one document is generated per combination of them (see VARIANTS), for a
+stand-in user with those flags. Permissions depending on anything else
+would be evaluated for that stand-in user only.
+"""
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_yasg.renderers import OpenAPIRenderer, SwaggerJSONRenderer, SwaggerYAMLRenderer
+from rest_framework.request import Request
+
+from core.utils import encoding
+
+# File name of each spec renderer's document; the JSON of OpenAPIRenderer and
+# SwaggerJSONRenderer is identical, only their media types differ
+FILE_NAMES = {
+    SwaggerJSONRenderer.format: 'openapi.json',
+    OpenAPIRenderer.format: 'openapi.json',
+    SwaggerYAMLRenderer.format: 'openapi.yaml',
+}
+RENDERERS = {
+    'openapi.json': SwaggerJSONRenderer,
+    'openapi.yaml': SwaggerYAMLRenderer,
+}
+# Directory of the documents of each (is_staff, is_superuser) combination
+VARIANTS = {
+    (False, False): 'user',
+    (True, False): 'staff',
+    (False, True): 'superuser',
+    (True, True): 'staff-superuser',
+}
+
+
+def get_variant(user):
+    return bool(getattr(user, 'is_staff', False)), bool(getattr(user, 'is_superuser', False))
+
+
+def opaque_tag(etag):
+    # Weak and strong validators compare equal for If-None-Match
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+class SchemaDocument:
+    """
+    One rendered document and its compressed variants, keyed by content
+    coding (None being the identity encoding).
+    """
+
+    def __init__(self, variants):
+        self.variants = variants
+        self.etag = 'W/"%s"' % hashlib.sha256(variants[None]).hexdigest()[:32]
+
+    @classmethod
+    def from_content(cls, content):
+        variants = {None: content}
+        for coding in encoding.ENCODINGS:
+            variants[coding] = encoding.compress(content, coding)
+        return cls(variants)
+
+    @classmethod
+    def from_files(cls, path):
+        with open(path, 'rb') as f:
+            variants = {None: f.read()}
+        for coding in encoding.ENCODINGS:
+            try:
+                with open(path + encoding.SUFFIXES[coding], 'rb') as f:
+                    variants[coding] = f.read()
+            except FileNotFoundError:
+                pass
+        return cls(variants)
+
+    def write(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.variants[None])
+        for coding, content in self.variants.items():
+            if coding is not None:
+                with open(path + encoding.SUFFIXES[coding], 'wb') as f:
+                    f.write(content)
+
+    def response(self, request, content_type):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = {opaque_tag(etag) for etag in parse_etags(if_none_match)}
+            if '*' in etags or opaque_tag(self.etag) in etags:
+                response = HttpResponseNotModified()
+                response['ETag'] = self.etag
+                return response
+
+        coding = encoding.negotiate(request, [c for c in encoding.ENCODINGS if c in self.variants])
+        response = HttpResponse(self.variants[coding], content_type=content_type)
+        if coding is not None:
+            response['Content-Encoding'] = coding
+        response['ETag'] = self.etag
+        # The documentation requires a session, so only the browser may keep
+        # it, and must revalidate it (which is cheap thanks to the ETag)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding', 'Cookie'))
+        return response
+
+
+def generate_variant(view_class, variant):
+    """
+    Renders every document served by ``view_class`` to the users of
+    ``variant``, keyed by file name.
+    """
+    from .docs import api_info
+
+    is_staff, is_superuser = variant
+    request = Request(RequestFactory().get('/'))
+    request.user = get_user_model()(is_active=True, is_staff=is_staff, is_superuser=is_superuser)
+    generator = view_class.generator_class(api_info, '', None)
+    swagger = generator.get_schema(request=request, public=False)
+    return {
+        name: SchemaDocument.from_content(renderer().render(swagger))
+        for name, renderer in RENDERERS.items()
+    }
+
+
+def generate(view_class):
+    """
+    Renders the documents of every variant, keyed by variant directory, then
+    file name.
+    """
+    return {name: generate_variant(view_class, variant) for variant, name in VARIANTS.items()}
+
+
+def write(documents, root):
+    for variant, variant_documents in documents.items():
+        os.makedirs(os.path.join(root, variant), exist_ok=True)
+        for name, document in variant_documents.items():
+            document.write(os.path.join(root, variant, name))
+
+
+_documents = {}
+_lock = threading.Lock()
+
+
+def get_documents(view_class, variant):
+    if settings.DEBUG:
+        return generate_variant(view_class, variant)
+    if variant not in _documents:
+        with _lock:
+            if variant not in _documents:
+                root = os.path.join(settings.API_SCHEMA_ROOT, VARIANTS[variant])
+                if all(os.path.exists(os.path.join(root, name)) for name in RENDERERS):
+                    _documents[variant] = {
+                        name: SchemaDocument.from_files(os.path.join(root, name)) for name in RENDERERS
+                    }
+                else:
+                    _documents[variant] = generate_variant(view_class, variant)
+    return _documents[variant]
+
+
+def schema_response(view_class, request, renderer):
+    documents = get_documents(view_class, get_variant(request.user))
+    document = documents[FILE_NAMES[renderer.format]]
+    return document.response(request, f'{renderer.media_type}; charset={renderer.charset}')
@@ -1,8 +1,43 @@
 from django.contrib.auth.models import User, Group
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
 
+FIELDS_QUERY_PARAM = 'fields'
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+
+def requested_fields(request):
+    """
+    Field names listed in the ``?fields=`` query parameter, or None if the
+    parameter is absent.
+    """
+    if request is None or FIELDS_QUERY_PARAM not in request.query_params:
+        return None
+    value = request.query_params[FIELDS_QUERY_PARAM]
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Limits the output to the fields listed in ``?fields=name,email``.
+    Unknown names are ignored. Only applies to the top-level serializer of
+    the response, not to nested ones.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if root is not None:
+            return fields
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+        for name in list(fields):
+            if name not in requested:
+                del fields[name]
+        return fields
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model = User
         fields = []
@@ -10,9 +45,39 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         # fields = ['username', 'email', 'groups']
 
 
-class GroupSerializer(serializers.HyperlinkedModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Group
         fields = []
         # Uncomment the following line to display some of the fields for django.contrib.auth.models.Group
-        # fields = ['name', 'permissions']
\ No newline at end of file
+        # fields = ['name', 'permissions']
+
+
+# Serializers validating the rows of the bulk_import command. Uniqueness is
+# checked by the command one batch at a time, instead of with one query per
+# row by UniqueValidator.
+
+class UserImportSerializer(serializers.ModelSerializer):
+    # Group names, created if missing
+    groups = serializers.ListField(child=serializers.CharField(max_length=150), required=False)
+
+    class Meta:
+        model = User
+        fields = [
+            'username', 'email', 'first_name', 'last_name', 'password',
+            'is_active', 'is_staff', 'is_superuser', 'date_joined', 'groups',
+        ]
+        extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            # Either a Django password hash, stored as is, or a raw password
+            'password': {'required': False, 'allow_blank': True},
+        }
+
+
+class GroupImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ['name']
+        extra_kwargs = {
+            'name': {'validators': []},
+        }
@@ -0,0 +1,9 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+
+from . import versions
+
+# Models whose versions validate the responses of the viewsets using
+# core.services.mixins.ConditionalResponseMixin (see their etag_models)
+versions.track(get_user_model())
+versions.track(Group)
@@ -0,0 +1,32 @@
+"""
+Helpers for tests of the API.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+@contextmanager
+def assert_max_queries(limit, using=DEFAULT_DB_ALIAS):
+    """
+    Fails if more than ``limit`` queries are run in the block, listing the
+    queries which were run.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > limit:
+        queries = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, 1))
+        raise AssertionError(f'{len(context)} queries run, at most {limit} expected:\n{queries}')
+
+
+def assert_list_queries(client, url, limit, using=DEFAULT_DB_ALIAS):
+    """
+    GETs a list endpoint and fails if it runs more than ``limit`` queries.
+    Call it with enough rows in the table (more than ``limit``) for an N+1
+    query pattern to show up. Returns the response.
+    """
+    with assert_max_queries(limit, using):
+        response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    return response
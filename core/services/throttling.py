@@ -0,0 +1,194 @@
+"""
+Rate limiting backed by the cache THROTTLING['CACHE'] (the default one unless
+set). The limits hold across the processes sharing that cache: with a cache
+local to each pod, each pod counts on its own, and a client gets up to the
+number of replicas times each rate.
+
+SlidingWindowLimiter approximates a sliding window with two fixed-window
+counters per key: the count of the current window plus the count of the
+previous one, weighted by how much of it still overlaps the sliding window.
+Unlike DRF's SimpleRateThrottle, which keeps the timestamp of every request
+in the window, each key costs two integers however high the rate is, and a
+request costs one atomic ``incr`` and one ``get``.
+
+Rejected requests are counted too, so a client which keeps retrying stays
+limited instead of getting a request through whenever one slot frees up.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework import throttling
+
+DEFAULTS = {
+    'CACHE': 'default',
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'THROTTLING', {}).get(name, DEFAULTS[name])
+
+
+class SlidingWindowLimiter:
+    """
+    Allows ``num_requests`` hits per key in any ``duration`` seconds.
+    """
+
+    def __init__(self, num_requests, duration, cache=default_cache):
+        self.num_requests = num_requests
+        self.duration = duration
+        self.cache = cache
+
+    def hit(self, key, now=None):
+        """
+        Counts a hit on ``key``. Returns None if it is within the limit,
+        otherwise the number of seconds until the next hit would be.
+        """
+        if now is None:
+            now = time.time()
+        window, elapsed = divmod(now, self.duration)
+        window = int(window)
+        current = self._incr(f'{key}:{window}')
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        weight = 1 - elapsed / self.duration
+        if previous * weight + current <= self.num_requests:
+            return None
+        return self._wait(previous, current, elapsed)
+
+    def _incr(self, key):
+        # A window's counter is read until the end of the following window
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            if self.cache.add(key, 1, 2 * self.duration):
+                return 1
+            return self.cache.incr(key)
+
+    def _wait(self, previous, current, elapsed):
+        # Time until one more hit fits, provided that no other hit is made
+        if current < self.num_requests:
+            # Once enough of the previous window has slid out
+            free = (self.num_requests - current - 1) / previous
+            return max(self.duration * (1 - free) - elapsed, 0)
+        # Once the current window has become the previous one, and enough
+        # of it has slid out
+        free = (self.num_requests - 1) / current
+        return self.duration - elapsed + self.duration * (1 - free)
+
+
+class SlidingWindowThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle with a SlidingWindowLimiter. Subclasses set ``scope``
+    and implement ``get_cache_key`` like for SimpleRateThrottle. The
+    counters are kept in ``cache``, or the THROTTLING['CACHE'] cache if None.
+    """
+    cache = None
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self._wait = None
+        if self.cache is None:
+            self.cache = caches[get_setting('CACHE')]
+        if self.rate is not None:
+            self.limiter = SlidingWindowLimiter(self.num_requests, self.duration, self.cache)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self._wait = self.limiter.hit(key)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(SlidingWindowThrottle):
+    """
+    Limits unauthenticated requests per IP address.
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserRateThrottle(SlidingWindowThrottle):
+    """
+    Limits requests per user, or per IP address for unauthenticated ones.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginRateThrottle(SlidingWindowThrottle):
+    """
+    Limits login attempts per IP address. Checked before the credentials,
+    so rejected attempts never reach the password hasher.
+    """
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(SlidingWindowThrottle):
+    """
+    Limits login attempts per username, whichever addresses they come from.
+    """
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        # DRF requests parse every media type into .data, Django's only
+        # parse forms into .POST
+        data = request.data if hasattr(request, 'data') else request.POST
+        username = data.get(get_user_model().USERNAME_FIELD)
+        if not isinstance(username, str) or not username:
+            return None
+        # Hashed, as usernames may contain characters not allowed in keys
+        ident = hashlib.sha256(username.lower().encode()).hexdigest()[:32]
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+LOGIN_THROTTLE_CLASSES = (LoginRateThrottle, LoginUsernameRateThrottle)
+
+
+def throttle(*throttle_classes):
+    """
+    Applies DRF throttles to a regular Django view, answering requests
+    over the limit with 429 Too Many Requests.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            waits = []
+            for throttle_class in throttle_classes:
+                instance = throttle_class()
+                if not instance.allow_request(request, None):
+                    waits.append(instance.wait())
+            if waits:
+                response = HttpResponse('Too many requests, please try again later.', status=429)
+                waits = [wait for wait in waits if wait is not None]
+                if waits:
+                    response['Retry-After'] = str(math.ceil(max(waits)))
+                return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
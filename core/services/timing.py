@@ -0,0 +1,96 @@
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING_HEADER': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'API_TIMING', {}).get(name, DEFAULTS[name])
+
+
+def sampled():
+    rate = get_setting('SAMPLE_RATE')
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class RequestTiming:
+    """
+    Per-request timings of the phases of an API request plus the number and
+    total time of the SQL queries it ran.
+
+    Phases are named after the keys of ``phases``; durations are in
+    milliseconds.
+    """
+    phases = ('auth', 'perm', 'handler', 'render')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.db_queries = 0
+        self.db_time = 0.0
+        self._marks = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds * 1000
+
+    def start(self, name):
+        self._marks[name] = time.perf_counter()
+
+    def stop(self, name):
+        started = self._marks.pop(name, None)
+        if started is not None:
+            self.add(name, time.perf_counter() - started)
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    @contextmanager
+    def queries(self):
+        """
+        Counts the queries run on every configured database connection of
+        the current thread while the block is executing.
+        """
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self._execute_wrapper))
+            yield
+
+    @property
+    def total(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def fields(self):
+        fields = {f'{name}_ms': self.durations[name] for name in self.phases if name in self.durations}
+        fields['db_queries'] = self.db_queries
+        fields['db_ms'] = self.db_time * 1000
+        return fields
+
+    def header(self):
+        """
+        Value of the ``Server-Timing`` response header, see
+        https://www.w3.org/TR/server-timing/
+        """
+        metrics = [f'{name};dur={self.durations[name]:.2f}' for name in self.phases if name in self.durations]
+        metrics.append(f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries"')
+        metrics.append(f'total;dur={self.total:.2f}')
+        return ', '.join(metrics)
@@ -1,34 +1,265 @@
-from rest_framework import generics, views, viewsets, mixins
-from . import log
+import asyncio
 
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework import exceptions, generics, permissions, views, viewsets, mixins
+from . import log, timing
 
-class LoggedAPIView(views.APIView):
+# DRF permissions which only read request.user and request.method, and can
+# therefore be checked on the event loop
+NON_BLOCKING_PERMISSIONS = (
+    permissions.AllowAny,
+    permissions.IsAuthenticated,
+    permissions.IsAdminUser,
+    permissions.IsAuthenticatedOrReadOnly,
+)
+
+
+class TimedResponseMixin:
+    """
+    Times the handler and rendering phases of sampled requests (see
+    LoggedAPIView) and sends the timings back in a Server-Timing header.
+    """
+    timing = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.timing is None:
+            return super().finalize_response(request, response, *args, **kwargs)
+        self.timing.stop('handler')
+        response = super().finalize_response(request, response, *args, **kwargs)
+        self.timing.start('render')
+        # Responses are rendered by Django once dispatch has returned
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(self._finish_timing)
+        else:
+            self._finish_timing(response)
+        return response
+
+    def _finish_timing(self, response):
+        self.timing.stop('render')
+        if timing.get_setting('SERVER_TIMING_HEADER'):
+            response['Server-Timing'] = self.timing.header()
+
+
+class LoggedAPIView(TimedResponseMixin, views.APIView):
     """
     Since responses must go through dispatch method defined in views.APIView,
     the simplest way to do API logging is to hook the dispatch method with
     a logging decorator.
+
+    Sampled requests (see API_TIMING in settings) are also timed per phase
+    (authentication, permission checks, handler, rendering) and have their
+    SQL queries counted. The results are sent back in a Server-Timing header
+    and added to the log record as structured fields.
     """
+
     @log.debug()
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def dispatch(self, request, *args, **kwargs):
+        if not timing.sampled():
+            return super().dispatch(request, *args, **kwargs)
+        self.timing = timing.RequestTiming()
+        with self.timing.queries():
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        if self.timing is None:
+            return super().perform_authentication(request)
+        with self.timing.phase('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        if self.timing is None:
+            return super().check_permissions(request)
+        with self.timing.phase('perm'):
+            super().check_permissions(request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.timing is not None:
+            self.timing.start('handler')
+
+
+class AsyncAPIView(views.APIView):
+    """
+    APIView whose dispatch is a coroutine, so that under ASGI requests are
+    handled on the event loop instead of being handed to a worker thread.
+
+    Handlers (``get``, ``post``...) may be coroutines or plain functions,
+    which run on the event loop too: blocking code, ORM queries included,
+    must go through ``await self.run_sync(func, ...)``.
+
+    Authenticators are called through their ``authenticate_async`` method
+    when they have one (see core.user.authentication), in a thread
+    otherwise. Likewise for permissions and ``has_permission_async``, except
+    for NON_BLOCKING_PERMISSIONS which are checked on the event loop.
+
+    Under WSGI, Django runs these views with async_to_sync: they work, but
+    are slower than regular APIViews.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Django (before 4.1) only awaits views marked as coroutine functions
+        view._is_coroutine = asyncio.coroutines._is_coroutine
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if isinstance(request._request, ASGIRequest):
+            _render_on_loop(self.response)
+        return self.response
+
+    async def initial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.perform_authentication(request)
+        await self.check_permissions(request)
+        await self.check_throttles(request)
+
+    async def perform_authentication(self, request):
+        # Same as rest_framework.request.Request._authenticate
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'authenticate_async'):
+                    user_auth_tuple = await authenticator.authenticate_async(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def check_permissions(self, request):
+        for permission in self.get_permissions():
+            if hasattr(permission, 'has_permission_async'):
+                allowed = await permission.has_permission_async(request, self)
+            elif type(permission) in NON_BLOCKING_PERMISSIONS:
+                allowed = permission.has_permission(request, self)
+            else:
+                allowed = await sync_to_async(permission.has_permission)(request, self)
+            if not allowed:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None)
+                )
+
+    async def check_throttles(self, request):
+        if self.throttle_classes:
+            await sync_to_async(super().check_throttles)(request)
+
+    async def run_sync(self, func, *args, **kwargs):
+        """
+        Runs blocking code (e.g. ORM queries) in a thread.
+        """
+        return await sync_to_async(func)(*args, **kwargs)
+
+
+def _render_on_loop(response):
+    """
+    Renders a template response (DRF's Response included) on the event
+    loop, where rendering JSON is cheaper than a round trip to the thread
+    Django's ASGI handler would render it in, and hands Django an awaitable
+    no-op ``render`` instead.
+    """
+    if not hasattr(response, 'render') or response.is_rendered:
+        return
+    response.render()
+
+    async def render():
+        return response
+    response.render = render
+
+
+class LoggedAsyncAPIView(TimedResponseMixin, AsyncAPIView):
+    """
+    Counterpart of LoggedAPIView for AsyncAPIView. Only the SQL queries run
+    through ``run_sync`` are counted, the others run in threads the view
+    does not see.
+    """
+
+    @log.debug()
+    async def dispatch(self, request, *args, **kwargs):
+        if timing.sampled():
+            self.timing = timing.RequestTiming()
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def perform_authentication(self, request):
+        if self.timing is None:
+            return await super().perform_authentication(request)
+        with self.timing.phase('auth'):
+            await super().perform_authentication(request)
+
+    async def check_permissions(self, request):
+        if self.timing is None:
+            return await super().check_permissions(request)
+        with self.timing.phase('perm'):
+            await super().check_permissions(request)
+
+    async def initial(self, request, *args, **kwargs):
+        await super().initial(request, *args, **kwargs)
+        if self.timing is not None:
+            self.timing.start('handler')
+
+    async def run_sync(self, func, *args, **kwargs):
+        if self.timing is None:
+            return await super().run_sync(func, *args, **kwargs)
+
+        def counted():
+            with self.timing.queries():
+                return func(*args, **kwargs)
+        return await super().run_sync(counted)
 
 
-# The following definitions are not needed but
-# they are presented below to illustrate how
-# one can define custom View/ViewSet classes 
-# to enable API logging for specific endpoints
+# The following definitions are presented below to illustrate how
+# one can define custom View/ViewSet classes to enable API logging
+# for specific endpoints
 
-# class LoggedGenericAPIView(generics.GenericAPIView, LoggedAPIView):
-#     ...
+class LoggedGenericAPIView(generics.GenericAPIView, LoggedAPIView):
+    ...
 
-# class LoggedViewSet(viewsets.ViewSetMixin, LoggedAPIView):
-#     ...
+class LoggedViewSet(viewsets.ViewSetMixin, LoggedAPIView):
+    ...
 
-# class LoggedGenericViewSet(viewsets.ViewSetMixin, LoggedGenericAPIView):
-#     ...
+class LoggedGenericViewSet(viewsets.ViewSetMixin, LoggedGenericAPIView):
+    ...
 
-# class LoggedReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet, LoggedGenericViewSet):
-#     ...
+class LoggedReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet, LoggedGenericViewSet):
+    ...
     
-# class LoggedModelViewSet(viewsets.ModelViewSet, LoggedGenericViewSet):
-#     ...
+class LoggedModelViewSet(viewsets.ModelViewSet, LoggedGenericViewSet):
+    ...
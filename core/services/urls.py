@@ -1,5 +1,6 @@
 from django.urls import include, path, re_path
 from rest_framework import routers
+from core.utils.urls import lazy_view
 from . import views
 
 router = routers.DefaultRouter()
@@ -16,6 +17,11 @@ app_name = 'services'
 urlpatterns = [
     path('', include(router.urls)),
     path('sample/', views.SampleAPI1.as_view()),
-    re_path(r'^docs(?P<format>\.json|\.yaml)$', views.SchemaView.without_ui(cache_timeout=0), name='schema-json'),
-    re_path(r'^docs/$', views.SchemaView.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('sample/async/', views.AsyncSampleAPI.as_view()),
+    # Request profiles (see core/utils/profiling.py), staff only
+    path('profiles/', views.ProfileListAPI.as_view()),
+    re_path(r'^profiles/(?P<profile_id>\d{20}-[0-9a-f]{8})/$', views.ProfileDownloadAPI.as_view()),
+    # drf_yasg is only imported on the first request for the documentation
+    re_path(r'^docs(?P<format>\.json|\.yaml)$', lazy_view('core.services.docs.SchemaView', 'without_ui', cache_timeout=0), name='schema-json'),
+    re_path(r'^docs/$', lazy_view('core.services.docs.SchemaView', 'with_ui', 'swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Table-level version counters, kept in the cache of TABLE_VERSIONS['CACHE'].
+
+Every save, delete or many-to-many change of a tracked model bumps the
+model's counter and last modification time once the transaction commits,
+so all the workers of all the pods see the change together. Reading the
+versions of a few tables is one ``get_many``, which makes them a cheap
+validator for responses built from those tables (see
+core.services.mixins.ConditionalResponseMixin).
+
+This only holds if the cache is shared by all the pods: with a per-pod
+cache, a change saved on one pod would leave the others answering 304 with
+the old version. A per-process or per-node backend is therefore refused
+(system check services.E001) unless ALLOW_LOCAL_CACHE is set, which is only
+safe with a single pod. Without a suitable cache nothing is versioned, and
+ConditionalResponseMixin responds as if it was not there.
+
+QuerySet.update(), bulk_create() and raw SQL send no signals; call
+``bump(model)`` after them.
+"""
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from core.utils.cache import shared_cache_alias
+
+DEFAULTS = {
+    'CACHE': 'versions',
+    'ALLOW_LOCAL_CACHE': False,
+}
+
+KEY_FORMAT = 'table_version:%s'
+
+_tracked = set()
+
+
+def get_setting(name):
+    return getattr(settings, 'TABLE_VERSIONS', {}).get(name, DEFAULTS[name])
+
+
+def cache_alias():
+    """
+    TABLE_VERSIONS['CACHE']; raises ImproperlyConfigured unless all the
+    pods share its cache.
+    """
+    return shared_cache_alias(get_setting('CACHE'), "TABLE_VERSIONS['CACHE']", get_setting('ALLOW_LOCAL_CACHE'))
+
+
+def get_cache():
+    """
+    The cache of the versions (and of the responses they validate), None
+    when there is no suitable one.
+    """
+    try:
+        return caches[cache_alias()]
+    except ImproperlyConfigured:
+        return None
+
+
+@checks.register(checks.Tags.caches)
+def check_versions_cache(app_configs, **kwargs):
+    try:
+        cache_alias()
+    except ImproperlyConfigured as e:
+        return [checks.Error(
+            str(e), hint='Conditional responses are off until it is fixed, see core/services/versions.py',
+            id='services.E001',
+        )]
+    return []
+
+
+def _keys(model):
+    key = KEY_FORMAT % model._meta.label_lower
+    return key, key + ':modified'
+
+
+def _initial_version():
+    # A counter evicted from the cache starts over from the clock, and so
+    # never repeats a version seen before the eviction
+    return time.time_ns()
+
+
+def bump(model):
+    cache = get_cache()
+    if cache is None:
+        return
+    version_key, modified_key = _keys(model)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, _initial_version(), None)
+    cache.set(modified_key, time.time(), None)
+
+
+def get_versions(models):
+    """
+    Returns a (version, last modification time) pair per model. Needs a
+    cache (see get_cache()).
+    """
+    cache = get_cache()
+    keys = [_keys(model) for model in models]
+    values = cache.get_many([key for pair in keys for key in pair])
+    versions = []
+    for version_key, modified_key in keys:
+        if version_key not in values or modified_key not in values:
+            # Unknown (or evicted) tables count as just modified
+            values[version_key] = _initial_version()
+            values[modified_key] = time.time()
+            cache.add(version_key, values[version_key], None)
+            cache.add(modified_key, values[modified_key], None)
+        versions.append((values[version_key], values[modified_key]))
+    return versions
+
+
+def is_tracked(model):
+    return model._meta.concrete_model in _tracked
+
+
+def track(model):
+    """
+    Bumps the version of ``model`` whenever one of its rows changes.
+    """
+    model = model._meta.concrete_model
+    if model in _tracked:
+        return
+    _tracked.add(model)
+    uid = 'core.services.versions.%s' % model._meta.label_lower
+    post_save.connect(_on_change, sender=model, dispatch_uid=uid + '.save')
+    post_delete.connect(_on_change, sender=model, dispatch_uid=uid + '.delete')
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        m2m_changed.connect(_on_m2m_change, sender=through, dispatch_uid='%s.m2m.%s' % (uid, field.name))
+
+
+def _on_change(sender, using=None, **kwargs):
+    # Bumped after the commit, so that no one caches the old rows under
+    # the new version
+    transaction.on_commit(partial(bump, sender), using=using)
+
+
+def _on_m2m_change(sender, instance, model, action, using=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    # Both sides of the relation see the change
+    for changed in {type(instance)._meta.concrete_model, model._meta.concrete_model}:
+        if changed in _tracked:
+            transaction.on_commit(partial(bump, changed), using=using)
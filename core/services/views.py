@@ -1,59 +1,88 @@
+import os
 from django.contrib.auth.models import User, Group
-from django.http import HttpResponseRedirect
-from rest_framework import views, viewsets, permissions, authentication
+from django.http import FileResponse
+from rest_framework import exceptions, views, viewsets, permissions
 from rest_framework.response import Response
-from rest_framework_simplejwt import authentication as jwt_authentication
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
+from core.utils import profiling
+from .mixins import ConditionalResponseMixin, PrefetchPlanningMixin, SparseFieldsetViewMixin, StreamingExportMixin
 from .serializers import UserSerializer, GroupSerializer
-from .types import LoggedAPIView
-
-_SchemaView = get_schema_view(
-   openapi.Info(
-      title="App API",
-      default_version='v1',
-      description="App API",
-      contact=openapi.Contact(email="cs@asklora.ai"),
-   ),
-   # Comment the following line if the API documentation is open to public
-   authentication_classes=(authentication.SessionAuthentication,),
-   # Comment the following line if the API documentation is open to public
-   permission_classes=(permissions.IsAuthenticated,),
-)
-
-class SchemaView(_SchemaView):
-    def handle_exception(self, exc):
-        return HttpResponseRedirect('/login/')
+from .types import LoggedAPIView, LoggedAsyncAPIView
 
 class SampleAPI1(LoggedAPIView, views.APIView):
-    # Specify JWT authentication is the only authentication method allowed
-    # and the APIView is only accessible if a user sends a request with an
-    # access token.
-    authentication_classes = [jwt_authentication.JWTAuthentication]
+    # JWT authentication (REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'])
+    # is the only authentication method allowed and the APIView is only
+    # accessible if a user sends a request with an access token.
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, format=None):
         return Response([{'a': 'SampleAPI1'}])
 
-class UserViewSet(LoggedAPIView, viewsets.ReadOnlyModelViewSet):
+class AsyncSampleAPI(LoggedAsyncAPIView):
+    # Same as SampleAPI1, but under ASGI the whole request (authentication
+    # and permission checks included) is handled on the event loop. Use it
+    # as the base for I/O-bound endpoints, see AsyncAPIView.
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request, format=None):
+        return Response([{'a': 'AsyncSampleAPI'}])
+
+class UserViewSet(StreamingExportMixin, ConditionalResponseMixin, PrefetchPlanningMixin, SparseFieldsetViewMixin, LoggedAPIView, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = UserSerializer
+    # Sort key of the keyset pagination, backed by the index created in
+    # core/user/migrations/0001_user_date_joined_id_index.py
+    cursor_ordering = ('-date_joined', '-id')
+    # Tables the responses are built from, their versions make the ETags
+    # (see ConditionalResponseMixin); users may be rendered with their groups
+    etag_models = (User, Group)
+    cache_responses = True
 
-    # Specify JWT authentication is the only authentication method allowed
-    # and the APIViewSet is only accessible if a user sends a request with
-    # an access token.
-    authentication_classes = [jwt_authentication.JWTAuthentication]
+    # JWT authentication (REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'])
+    # is the only authentication method allowed and the APIViewSet is only
+    # accessible if a user sends a request with an access token.
     permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
 
-class GroupViewSet(LoggedAPIView, viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(StreamingExportMixin, ConditionalResponseMixin, PrefetchPlanningMixin, SparseFieldsetViewMixin, LoggedAPIView, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows groups to be viewed or edited.
     """
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    # Group names are unique (and indexed)
+    cursor_ordering = ('name',)
+    etag_models = (Group,)
+    cache_responses = True
+
+    permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
+
+class ProfileListAPI(views.APIView):
+    """
+    Request profiles saved by core.utils.profiling.ProfilerMiddleware,
+    newest first.
+    """
+    permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        profiles = profiling.list_profiles()
+        for profile in profiles:
+            profile['url'] = request.build_absolute_uri(f"{profile['id']}/")
+        return Response(profiles)
+
+class ProfileDownloadAPI(views.APIView):
+    """
+    Collapsed stacks of a request profile, for flamegraph.pl, inferno or
+    speedscope.
+    """
+    permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
 
-    authentication_classes = [jwt_authentication.JWTAuthentication]
-    permission_classes = [permissions.IsAdminUser, permissions.IsAuthenticated]
\ No newline at end of file
+    def get(self, request, profile_id, format=None):
+        path = profiling.profile_path(profile_id)
+        if path is None:
+            raise exceptions.NotFound()
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=os.path.basename(path),
+            content_type='text/plain; charset=utf-8',
+        )
@@ -0,0 +1,176 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTTokenUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TIMEOUT': 300,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'AUTH_TOKEN_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TokenCache:
+    """
+    Thread-safe, bounded LRU cache of authenticated (user, token) pairs keyed
+    by the signature of the raw token. Entries expire at the token's ``exp``
+    claim or after TIMEOUT seconds, whichever comes first.
+
+    The cache is per process: invalidations (see core.user.signals) only
+    reach the process which saved the user, other workers pick up the change
+    once their entry expires.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # user pk -> signatures of the tokens cached for that user
+        self._by_user = {}
+
+    def get(self, key, raw_token):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_raw_token, user, validated_token, expires_at = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                return None
+            # The signature alone is not trusted, the whole token must match
+            if entry_raw_token != raw_token:
+                return None
+            self._entries.move_to_end(key)
+            return user, validated_token
+
+    def set(self, key, raw_token, user, validated_token, expires_at):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (raw_token, user, validated_token, expires_at)
+            self._by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > get_setting('MAX_ENTRIES'):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_pk):
+        with self._lock:
+            for key in self._by_user.pop(user_pk, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, user, _, _ = self._entries.pop(key)
+        keys = self._by_user.get(user.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user.pk]
+
+
+token_cache = TokenCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Same as rest_framework_simplejwt's JWTAuthentication, but reuses the
+    validated token and the user it resolved to for as long as the token
+    stays valid, instead of verifying the signature and querying the user
+    table on every request.
+
+    ``authenticate_async`` is used by core.services.types.AsyncAPIView; only
+    the user lookup of a cache miss leaves the event loop.
+    """
+
+    def authenticate(self, request):
+        raw_token = self._get_raw_token(request)
+        if raw_token is None:
+            return None
+        cached = self._get_cached(raw_token)
+        if cached is not None:
+            return cached
+        validated_token = self.get_validated_token(raw_token)
+        return self._cache(raw_token, validated_token, self.get_user(validated_token))
+
+    async def authenticate_async(self, request):
+        raw_token = self._get_raw_token(request)
+        if raw_token is None:
+            return None
+        cached = self._get_cached(raw_token)
+        if cached is not None:
+            return cached
+        validated_token = self.get_validated_token(raw_token)
+        user = await sync_to_async(self.get_user)(validated_token)
+        return self._cache(raw_token, validated_token, user)
+
+    def _get_raw_token(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        return self.get_raw_token(header)
+
+    def _get_cached(self, raw_token):
+        cached = token_cache.get(raw_token.rpartition(b'.')[2], raw_token)
+        if cached is None:
+            return None
+        user, validated_token = cached
+        # Requests must not share (and mutate) the same instance
+        return copy.copy(user), validated_token
+
+    def _cache(self, raw_token, validated_token, user):
+        expires_at = time.time() + get_setting('TIMEOUT')
+        if 'exp' in validated_token:
+            expires_at = min(expires_at, validated_token['exp'])
+        token_cache.set(raw_token.rpartition(b'.')[2], raw_token, copy.copy(user), validated_token, expires_at)
+        return user, validated_token
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    Stateless user built from the claims added by
+    core.user.serializers.add_user_claims.
+    """
+
+    @cached_property
+    def group_names(self):
+        return frozenset(self.token.get('groups', ()))
+
+
+class TokenClaimsAuthentication(JWTTokenUserAuthentication):
+    """
+    Authenticates from the token claims alone, without loading the user
+    from the database. ``request.user`` is a ClaimsTokenUser whose
+    ``is_staff``/``is_superuser``/``group_names`` come from the token, which
+    is enough for permissions such as IsAuthenticated and IsAdminUser.
+
+    Since the user is not looked up, deactivation and privilege changes only
+    apply to tokens obtained from api/token/ afterwards; access tokens from
+    api/token/refresh/ keep the claims of their refresh token. Opt in by
+    listing this class in REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].
+    """
+
+    async def authenticate_async(self, request):
+        # No I/O at all, it can run on the event loop as is
+        return self.authenticate(request)
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        return ClaimsTokenUser(validated_token)
@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import connections
+from rest_framework.request import Request
+
+logger = logging.getLogger(__name__)
+
+
+class RehashWorker:
+    """
+    Re-hashes and saves passwords on a daemon thread, off the request path. Jobs are
+    dropped while MAXSIZE of them are waiting (e.g. everyone logging in
+    right after the hasher was changed); their users are rehashed on a
+    later login instead.
+    """
+    maxsize = 1000
+
+    def __init__(self):
+        self._queue = queue.Queue(self.maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, user_pk, encoded, raw_password=None, new_encoded=None):
+        """
+        Replaces the ``encoded`` password of a user by ``new_encoded``, or by
+        a new hash of ``raw_password`` computed on the worker thread.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((user_pk, encoded, raw_password, new_encoded))
+        except queue.Full:
+            logger.warning('Password rehash queue full, rehash of user %s skipped', user_pk)
+
+    def join(self):
+        """
+        Waits for the submitted jobs to be done.
+        """
+        self._queue.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='password-rehash', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                rehash(*job)
+            except Exception:
+                logger.exception('Password rehash of user %s failed', job[0])
+            finally:
+                # This thread has its own connections, which no request
+                # cycle would close
+                connections.close_all()
+                self._queue.task_done()
+
+
+def rehash(user_pk, encoded, raw_password=None, new_encoded=None):
+    if new_encoded is None:
+        new_encoded = make_password(raw_password)
+    # Only if the password was not changed in the meantime
+    get_user_model()._default_manager.filter(pk=user_pk, password=encoded).update(password=new_encoded)
+
+
+rehash_worker = RehashWorker()
+
+
+class BackgroundRehashBackend(ModelBackend):
+    """
+    Same as ModelBackend, except that when a password hashed with an older
+    hasher, or older cost parameters (see core.user.hashers), is upgraded,
+    the new hash is computed and saved on a background thread instead of
+    before the login returns.
+
+    Logins which may be followed by a session login (any request but the
+    API's, e.g. login/auth/ or the admin) are the exception: login() keys
+    the session to the user's password hash, and a session keyed to the old
+    hash would be flushed on the next request, once the new one is saved.
+    For them the new hash is computed during the login and set on the
+    returned user; only its save is deferred. The session cannot be re-keyed
+    from the background instead, SessionMiddleware saves it again at the end
+    of the request.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user (#20760).
+            UserModel().set_password(password)
+            return None
+
+        encoded = user.password
+
+        def setter(raw_password):
+            if session_login(request):
+                user.password = make_password(raw_password)
+                rehash_worker.submit(user.pk, encoded, new_encoded=user.password)
+            else:
+                rehash_worker.submit(user.pk, encoded, raw_password=raw_password)
+
+        if check_password(password, encoded, setter) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def session_login(request):
+    """
+    Whether a login may key a session to the user's password hash: the API's
+    logins (api/token/, through DRF's Request) only issue tokens.
+    """
+    return request is not None and not isinstance(request, Request)
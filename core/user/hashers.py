@@ -0,0 +1,126 @@
+"""
+Password hashers whose cost parameters come from settings.PASSWORD_HASHING,
+so that they can be tuned to the pods' CPU and memory limits (see the
+tune_hashers command) without code changes.
+
+Hashes are re-encoded with the current parameters the next time their user
+logs in; core.user.backends.BackgroundRehashBackend saves them after the
+login has been answered.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+DEFAULTS = {
+    'SCRYPT': {'N': 2 ** 14, 'R': 8, 'P': 1},
+    'ARGON2': {'TIME_COST': 2, 'MEMORY_COST': 16384, 'PARALLELISM': 1},
+}
+
+
+def get_setting(hasher, name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(hasher, {}).get(name, DEFAULTS[hasher][name])
+
+
+class ScryptPasswordHasher(hashers.BasePasswordHasher):
+    """
+    scrypt, from the standard library (OpenSSL 1.1+). Hashes use the same
+    format as Django 4.0's ScryptPasswordHasher, so they stay valid after
+    an upgrade.
+
+    Each hash needs 128 * N * R bytes of memory (16 MiB with the defaults),
+    per concurrent login.
+    """
+    algorithm = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return get_setting('SCRYPT', 'N')
+
+    @property
+    def block_size(self):
+        return get_setting('SCRYPT', 'R')
+
+    @property
+    def parallelism(self):
+        return get_setting('SCRYPT', 'P')
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            # OpenSSL refuses to use more than 32 MiB by default
+            maxmem=256 * n * r + 128 * r * p, dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def decode(self, encoded):
+        algorithm, work_factor, salt, block_size, parallelism, hash_ = encoded.split('$', 6)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(work_factor),
+            'salt': salt,
+            'block_size': int(block_size),
+            'parallelism': int(parallelism),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(
+            password, decoded['salt'], decoded['work_factor'], decoded['block_size'], decoded['parallelism'],
+        )
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): hashers.mask_hash(decoded['salt']),
+            _('hash'): hashers.mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (
+            decoded['work_factor'] != self.work_factor
+            or decoded['block_size'] != self.block_size
+            or decoded['parallelism'] != self.parallelism
+            or hashers.must_update_salt(decoded['salt'], self.salt_entropy)
+        )
+
+    def harden_runtime(self, password, encoded):
+        # scrypt's cost cannot be topped up the way PBKDF2's iterations can
+        pass
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Django's Argon2 hasher (which needs the optional argon2-cffi package)
+    with settings-driven costs. MEMORY_COST is in KiB; Django's default of
+    100 MiB would not fit many concurrent logins in a 128Mi pod.
+    """
+
+    @property
+    def time_cost(self):
+        return get_setting('ARGON2', 'TIME_COST')
+
+    @property
+    def memory_cost(self):
+        return get_setting('ARGON2', 'MEMORY_COST')
+
+    @property
+    def parallelism(self):
+        return get_setting('ARGON2', 'PARALLELISM')
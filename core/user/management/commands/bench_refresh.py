@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.utils.http import urlencode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.user.revocation import KEY_PREFIX, get_store
+from core.utils import loadtest
+
+FORM = (('Content-Type', 'application/x-www-form-urlencoded'),)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the throughput of api/token/refresh/ with and without '
+        'refresh token rotation, each client sending the refresh token it got '
+        'from its previous refresh, then the cost of a revocation check. Run '
+        'offline with --settings=config.settings.test.offline, after '
+        '`benchmark --setup`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds per mode')
+        parser.add_argument('--lookups', type=int, default=100000, help='Revocation checks timed')
+        parser.add_argument('--username', default='benchmark')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get_by_natural_key(options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist, create it with `benchmark --setup`")
+
+        application = get_wsgi_application()
+        counter = loadtest.QueryCounter()
+        counter.install()
+        self.stdout.write(f"{'mode':<12}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}  statuses")
+        try:
+            for mode, rotate in (('static', False), ('rotating', True)):
+                jwt = {**settings.SIMPLE_JWT, 'ROTATE_REFRESH_TOKENS': rotate, 'BLACKLIST_AFTER_ROTATION': rotate}
+                with override_settings(SIMPLE_JWT=jwt):
+                    counter.count = 0
+                    summary = self.run(application, user, options['concurrency'], options['duration']).summary()
+                queries = counter.count / summary['requests'] if summary['requests'] else 0
+                self.stdout.write(
+                    f"{mode:<12}{summary['throughput']:>9.1f}{summary['p50_ms']:>9.2f}{summary['p99_ms']:>9.2f}"
+                    f"{queries:>9.2f}  {summary['statuses']}"
+                )
+        finally:
+            counter.uninstall()
+
+        store = get_store()
+        jtis = [uuid.uuid4().hex for _ in range(options['lookups'])]
+        started = time.perf_counter()
+        for jti in jtis:
+            store.is_revoked(jti)
+        bloom = time.perf_counter() - started
+        started = time.perf_counter()
+        for jti in jtis:
+            store.cache.get(KEY_PREFIX + jti)
+        cache = time.perf_counter() - started
+        self.stdout.write(
+            f'\nRevocation check of a token never revoked: {bloom / len(jtis) * 1e6:.2f}µs '
+            f'(Bloom filter), against {cache / len(jtis) * 1e6:.2f}µs for a read of the '
+            f'{type(store.cache).__name__}'
+        )
+
+    def run(self, application, user, concurrency, duration):
+        result = loadtest.Result()
+        deadline = time.perf_counter() + duration
+
+        def client():
+            token = str(RefreshToken.for_user(user))
+            while time.perf_counter() < deadline:
+                request = loadtest.Request('POST', '/api/token/refresh/', FORM, urlencode({'refresh': token}).encode())
+                status = []
+                started = time.perf_counter()
+                response = application(loadtest.wsgi_environ(request), lambda s, headers, exc_info=None: status.append(s))
+                try:
+                    body = b''.join(response)
+                finally:
+                    response.close()
+                result.add(time.perf_counter() - started, int(status[0].split()[0]))
+                # Like a real client, keep the rotated token
+                token = json.loads(body).get('refresh', token)
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        result.elapsed = time.perf_counter() - started
+        return result
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes expired sessions from the database in small batches, each '
+        'in its own transaction, so that the session table is never locked '
+        'for long. Unlike clearsessions, it can run while the site is busy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.signed_cookies':
+            self.stdout.write('Sessions are stored in cookies, there is nothing to purge')
+            return
+        using = router.db_for_write(Session)
+        # Sessions which expire while this runs are left for the next run
+        now = timezone.now()
+        expired = Session.objects.using(using).filter(expire_date__lt=now)
+        deleted = 0
+        while True:
+            with transaction.atomic(using=using):
+                # Walks the expire_date index, oldest first
+                keys = list(expired.order_by('expire_date').values_list('session_key', flat=True)[:options['batch_size']])
+                if not keys:
+                    break
+                count, _ = Session.objects.using(using).filter(session_key__in=keys, expire_date__lt=now).delete()
+            deleted += count
+            if options['verbosity'] > 1:
+                self.stdout.write('%d sessions deleted' % deleted)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write('Deleted %d expired sessions' % deleted)
@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+from core.user.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+PASSWORD = 'C@3vsRdNts8R5#N'
+
+
+def measure(hasher, repeat, **params):
+    """
+    Median CPU time of one hash. CPU time rather than wall time, since a pod
+    with a CPU limit gets throttled on the CPU time it uses.
+    """
+    salt = hasher.salt()
+    timings = []
+    for _ in range(repeat):
+        started = time.thread_time()
+        hasher.encode(PASSWORD, salt, **params)
+        timings.append(time.thread_time() - started)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Picks the cost parameters of the password hashers for a target '
+        'login latency under a CPU limit, and prints them as PASSWORD_HASHING '
+        'settings. Run it on the hardware the pods run on.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', type=float, default=0.15,
+                            help='Seconds a hash may take in the pod (default: %(default)s)')
+        parser.add_argument('--cpu-limit', type=float, default=0.5,
+                            help='CPU limit of the pod in cores, e.g. 0.5 for 500m (default: %(default)s)')
+        parser.add_argument('--max-memory', type=int, default=16,
+                            help='MiB a single hash may use (default: %(default)s)')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        # A pod using its whole CPU limit is throttled down to it
+        budget = options['target'] * min(options['cpu_limit'], 1.0)
+        self.stdout.write('CPU time budget per hash: %.0fms' % (budget * 1000))
+        max_memory = options['max_memory'] * 1024 * 1024
+        repeat = options['repeat']
+
+        n, r, p = self.tune_scrypt(budget, max_memory, repeat)
+        self.stdout.write("'SCRYPT': {'N': 2 ** %d, 'R': %d, 'P': %d}," % (n.bit_length() - 1, r, p))
+
+        argon2 = self.tune_argon2(budget, max_memory, repeat)
+        if argon2 is None:
+            self.stdout.write('# argon2-cffi is not installed, Argon2 skipped')
+        else:
+            self.stdout.write("'ARGON2': {'TIME_COST': %d, 'MEMORY_COST': %d, 'PARALLELISM': 1}," % argon2)
+
+        iterations = self.tune_pbkdf2(budget, repeat)
+        self.stdout.write('# PBKDF2 for the same time: %d iterations (Django default: %d)' % (
+            iterations, PBKDF2PasswordHasher.iterations,
+        ))
+
+    def tune_scrypt(self, budget, max_memory, repeat):
+        # Memory hardness first: the largest N which fits in memory and in
+        # the budget, then as many rounds (P) as the remaining budget allows
+        hasher = ScryptPasswordHasher()
+        r = 8
+        n = 2 ** 10
+        while 128 * (n * 2) * r <= max_memory and measure(hasher, repeat, n=n * 2, r=r, p=1) <= budget:
+            n *= 2
+        elapsed = measure(hasher, repeat, n=n, r=r, p=1)
+        p = max(int(budget / elapsed), 1)
+        self.stdout.write('scrypt: %.0fms, %d MiB' % (measure(hasher, repeat, n=n, r=r, p=p) * 1000, 128 * n * r // 2 ** 20))
+        return n, r, p
+
+    def tune_argon2(self, budget, max_memory, repeat):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            return None
+        # Argon2 takes its memory cost in KiB and its parameters from
+        # settings, through properties overridden here
+        memory_cost = max_memory // 1024
+        time_cost = 1
+
+        def hasher_for(time_cost):
+            return type('TunedArgon2PasswordHasher', (Argon2PasswordHasher,), {
+                'time_cost': time_cost, 'memory_cost': memory_cost, 'parallelism': 1,
+            })()
+
+        while measure(hasher_for(time_cost + 1), repeat) <= budget:
+            time_cost += 1
+        self.stdout.write('argon2: %.0fms, %d MiB' % (measure(hasher_for(time_cost), repeat) * 1000, memory_cost // 1024))
+        return time_cost, memory_cost
+
+    def tune_pbkdf2(self, budget, repeat):
+        hasher = PBKDF2PasswordHasher()
+        elapsed = measure(hasher, repeat, iterations=100000)
+        return int(100000 * budget / elapsed)
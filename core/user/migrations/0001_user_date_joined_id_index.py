@@ -0,0 +1,30 @@
+from django.db import migrations
+
+INDEX_NAME = 'auth_user_date_joined_id_idx'
+
+
+def create_index(apps, schema_editor):
+    # Supports the (date_joined, id) keyset pagination of UserViewSet. On
+    # PostgreSQL the index is built concurrently so that the users table
+    # stays writable while it is created.
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON auth_user (date_joined, id)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index, elidable=True),
+    ]
@@ -0,0 +1,251 @@
+"""
+Revoked refresh tokens, kept in a cache until they expire.
+
+With ROTATE_REFRESH_TOKENS, every refresh at api/token/refresh/ returns a
+new refresh token and revokes the one it was given, so that a token can only
+be used once. simplejwt's token_blacklist app records both tokens in the
+database on every refresh (and looks them up on every refresh and verify);
+this store only keeps the revoked ``jti``s, as cache entries which expire
+with their token, and claims them with an atomic cache.add(): of two
+concurrent refreshes with the same token, only one succeeds.
+
+Revocations are also appended to a log in the cache, which each process
+replays, at most every SYNC_INTERVAL seconds, into an in-process Bloom
+filter. ``is_revoked()`` answers from the filter alone for the tokens it has
+never seen revoked, which is nearly all of them, and only reads the cache
+for the others (false positives included). A revocation made by another
+process may therefore go unnoticed by is_revoked() for up to SYNC_INTERVAL
+seconds; claim() is always exact.
+
+Every refresh adds two small entries to the cache, which live as long as
+REFRESH_TOKEN_LIFETIME: size the cache (MAX_ENTRIES) for two entries per
+refresh over that lifetime, since a revocation evicted early makes its token
+usable again.
+
+The store is as shared as its cache, and a revocation culled from it makes
+its token usable again. TOKEN_REVOCATION['CACHE'] must therefore name a
+cache of its own, shared by all the pods and which does not cull entries
+(e.g. a memcached sized for them); the refreshes fail until it does.
+Per-process, per-node and culling backends, and the 'default' cache which
+also holds responses, are refused unless ALLOW_LOCAL_CACHE is set, which is
+only safe with a single process (tests, benchmarks).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from core.utils.cache import NODE_LOCAL_BACKENDS, shared_cache_alias
+
+DEFAULTS = {
+    'CACHE': None,
+    'ALLOW_LOCAL_CACHE': False,
+    # Revocations per REFRESH_TOKEN_LIFETIME the filter is sized for; past
+    # that, false positives (i.e. cache reads) become more frequent
+    'CAPACITY': 1000000,
+    'ERROR_RATE': 0.01,
+    'SYNC_INTERVAL': 1.0,
+}
+
+KEY_PREFIX = 'revoked:'
+SEQUENCE_KEY = KEY_PREFIX + 'seq'
+LOG_KEY_PREFIX = KEY_PREFIX + 'log:'
+# Log entries read per cache call
+SYNC_BATCH_SIZE = 1000
+
+# Backends whose entries are local to a process or a node, or culled past
+# MAX_ENTRIES
+LOCAL_BACKENDS = NODE_LOCAL_BACKENDS + ('django.core.cache.backends.db.DatabaseCache',)
+
+
+def get_setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+def cache_alias():
+    """
+    TOKEN_REVOCATION['CACHE']; raises ImproperlyConfigured unless its cache
+    is fit to hold revocations (see above).
+    """
+    alias = shared_cache_alias(
+        get_setting('CACHE'), "TOKEN_REVOCATION['CACHE']", get_setting('ALLOW_LOCAL_CACHE'), LOCAL_BACKENDS,
+    )
+    if not get_setting('ALLOW_LOCAL_CACHE'):
+        if alias == 'default':
+            raise ImproperlyConfigured("TOKEN_REVOCATION['CACHE'] must not be the 'default' cache")
+        if 'MAX_ENTRIES' in settings.CACHES[alias].get('OPTIONS', {}):
+            raise ImproperlyConfigured(f"TOKEN_REVOCATION['CACHE'] '{alias}' culls entries")
+    return alias
+
+
+def get_cache():
+    return caches[cache_alias()]
+
+
+def rotation_enabled():
+    return settings.SIMPLE_JWT.get('ROTATE_REFRESH_TOKENS') and settings.SIMPLE_JWT.get('BLACKLIST_AFTER_ROTATION')
+
+
+@checks.register(checks.Tags.security)
+def check_revocation_cache(app_configs, **kwargs):
+    if not rotation_enabled():
+        return []
+    try:
+        cache_alias()
+    except ImproperlyConfigured as e:
+        return [checks.Error(str(e), hint='See core/user/revocation.py', id='user.E001')]
+    return []
+
+
+class BloomFilter:
+    """
+    Set of strings which may answer "maybe" (with probability ``error_rate``
+    once ``capacity`` items were added) for items it does not hold, but
+    never "no" for items it holds.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item):
+        # Double hashing: the k indexes are derived from two 64-bit hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return range(h1, h1 + self.hashes * h2, h2)
+
+    def add(self, item):
+        size = self.size
+        for index in self._indexes(item):
+            index %= size
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, item):
+        bits, size = self.bits, self.size
+        for index in self._indexes(item):
+            index %= size
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+
+class ExpiringBloomFilter:
+    """
+    Bloom filters bucketed by the expiry time of their items: evict() drops
+    the buckets whose items have all expired. With
+    buckets ``span`` seconds wide and items expiring within ``span`` seconds,
+    at most two buckets are alive at once.
+    """
+
+    def __init__(self, span, capacity, error_rate):
+        self.span = max(1, int(span))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._buckets = {}
+
+    def add(self, item, expires_at):
+        bucket = int(expires_at) // self.span
+        if bucket not in self._buckets:
+            self._buckets[bucket] = BloomFilter(self.capacity, self.error_rate)
+        self._buckets[bucket].add(item)
+
+    def __contains__(self, item):
+        for bloom in self._buckets.values():
+            if item in bloom:
+                return True
+        return False
+
+    def evict(self, now=None):
+        oldest = int(time.time() if now is None else now) // self.span
+        for bucket in [bucket for bucket in self._buckets if bucket < oldest]:
+            del self._buckets[bucket]
+
+
+class RevocationStore:
+    """
+    Revoked ``jti``s in ``cache`` (TOKEN_REVOCATION['CACHE'] by default),
+    fronted by an in-process ExpiringBloomFilter.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or get_cache()
+        self._lock = threading.Lock()
+        self._bloom = ExpiringBloomFilter(
+            settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds(),
+            get_setting('CAPACITY'), get_setting('ERROR_RATE'),
+        )
+        self._sync_interval = get_setting('SYNC_INTERVAL')
+        # Last log entry replayed, and when
+        self._sequence = 0
+        self._synced_at = 0.0
+
+    def claim(self, jti, expires_at):
+        """
+        Revokes the token ``jti``, which expires at the timestamp
+        ``expires_at``. Returns False if it was revoked already.
+        """
+        timeout = expires_at - time.time()
+        if timeout <= 0:
+            # Expired tokens are rejected anyway
+            return True
+        if not self.cache.add(KEY_PREFIX + jti, 1, timeout):
+            return False
+        self._log(jti, expires_at, timeout)
+        return True
+
+    def is_revoked(self, jti):
+        self._sync()
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+        return self.cache.get(KEY_PREFIX + jti) is not None
+
+    def _log(self, jti, expires_at, timeout):
+        try:
+            sequence = self.cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            self.cache.add(SEQUENCE_KEY, 0, None)
+            sequence = self.cache.incr(SEQUENCE_KEY)
+        self.cache.set(f'{LOG_KEY_PREFIX}{sequence}', (jti, expires_at), timeout)
+        with self._lock:
+            self._bloom.add(jti, expires_at)
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        with self._lock:
+            if now - self._synced_at < self._sync_interval:
+                return
+            self._synced_at = now
+            self._bloom.evict()
+            sequence = self.cache.get(SEQUENCE_KEY) or 0
+            if sequence < self._sequence:
+                # The cache was cleared, the filter still holds what it had
+                self._sequence = sequence
+            for start in range(self._sequence + 1, sequence + 1, SYNC_BATCH_SIZE):
+                keys = [f'{LOG_KEY_PREFIX}{n}' for n in range(start, min(start + SYNC_BATCH_SIZE, sequence + 1))]
+                # Entries which expired with their token are simply missing
+                for jti, expires_at in self.cache.get_many(keys).values():
+                    self._bloom.add(jti, expires_at)
+            self._sequence = sequence
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RevocationStore()
+    return _store
@@ -0,0 +1,77 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt import settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from .revocation import get_store
+
+
+def add_user_claims(token, user):
+    """
+    Embeds the claims TokenClaimsAuthentication needs to authorize requests
+    without loading the user from the database.
+    """
+    token['username'] = user.get_username()
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token['groups'] = list(user.groups.values_list('name', flat=True))
+    return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Token pair whose claims describe the user (see ``add_user_claims``).
+    Access tokens minted from the refresh token at api/token/refresh/ copy
+    these claims, so they are as current as the last login.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class RotatingTokenRefreshSerializer(serializers.Serializer):
+    """
+    Same as simplejwt's TokenRefreshSerializer, except that with
+    BLACKLIST_AFTER_ROTATION the refresh token is revoked in the cache-backed
+    store of core.user.revocation instead of the token_blacklist app's
+    tables. The token is claimed before anything is minted, so a token used
+    twice, even concurrently, only gets one new pair.
+    """
+    refresh = serializers.CharField()
+    access = serializers.CharField(read_only=True)
+
+    def validate(self, attrs):
+        # Read at each call: simplejwt replaces it when SIMPLE_JWT changes
+        api_settings = jwt_settings.api_settings
+        refresh = RefreshToken(attrs['refresh'])
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            if not get_store().claim(refresh[api_settings.JTI_CLAIM], refresh['exp']):
+                raise TokenError(_('Token is blacklisted'))
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class RevocationTokenVerifySerializer(serializers.Serializer):
+    """
+    Same as simplejwt's TokenVerifySerializer, checking revocations in the
+    store of core.user.revocation rather than the token_blacklist app's
+    tables. Only refresh tokens are ever revoked.
+    """
+    token = serializers.CharField()
+
+    def validate(self, attrs):
+        api_settings = jwt_settings.api_settings
+        token = UntypedToken(attrs['token'])
+        if api_settings.BLACKLIST_AFTER_ROTATION and token.get(api_settings.TOKEN_TYPE_CLAIM) == RefreshToken.token_type:
+            if get_store().is_revoked(token[api_settings.JTI_CLAIM]):
+                raise serializers.ValidationError(_('Token is blacklisted'))
+        return {}
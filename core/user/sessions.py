@@ -0,0 +1,119 @@
+"""
+Cached, database-backed sessions with a write-behind policy.
+
+Like django.contrib.sessions.backends.cached_db, sessions are read from the
+cache and only fall back to the database when the cache lost them. Saves
+always update the cache, but only reach the database when the session data
+differs from what was last written there, or when the last write is more
+than SESSION_WRITE_INTERVAL seconds old (so that the expiry date of the
+database row keeps up with sliding expiry, e.g. with
+SESSION_SAVE_EVERY_REQUEST). The row may therefore expire up to
+SESSION_WRITE_INTERVAL seconds before the cached session; keep the interval
+well below SESSION_COOKIE_AGE.
+
+Sessions stay in the cache for at most SESSION_CACHE_TIMEOUT seconds, then
+are read from the database again. Unless SESSION_CACHE_ALIAS is shared by
+all the pods, a session deleted (e.g. by a logout) on one pod is still
+accepted by the others until then.
+
+Usage:
+---
+SESSION_ENGINE = 'core.user.sessions'
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+KEY_PREFIX = 'core.user.sessions'
+
+
+def get_write_interval():
+    return getattr(settings, 'SESSION_WRITE_INTERVAL', 300)
+
+
+def get_cache_timeout():
+    return getattr(settings, 'SESSION_CACHE_TIMEOUT', 60)
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # What the database holds: (fingerprint of the data, time written)
+        self._persisted = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _fingerprint(self, data):
+        return hashlib.sha256(self.serializer().dumps(data)).hexdigest()
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends (e.g. memcache) raise an exception on invalid
+            # cache keys, same as cached_db
+            entry = None
+
+        if entry is not None:
+            data, self._persisted = entry
+            return data
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        # The row was written when its expiry date was set, which is only
+        # known for the default expiry; otherwise the next save writes
+        written = 0 if '_session_expiry' in data else s.expire_date.timestamp() - settings.SESSION_COOKIE_AGE
+        self._persisted = (self._fingerprint(data), written)
+        self._cache.set(self.cache_key, (data, self._persisted), self._cache_timeout(s.expire_date))
+        return data
+
+    def exists(self, session_key):
+        return session_key and (self.cache_key_prefix + session_key) in self._cache or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            # Creates a key, then saves again with must_create
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        fingerprint = self._fingerprint(data)
+        now = time.time()
+        if (
+            must_create
+            or self._persisted is None
+            or self._persisted[0] != fingerprint
+            or now - self._persisted[1] > get_write_interval()
+        ):
+            super().save(must_create)
+            self._persisted = (fingerprint, now)
+        self._cache.set(self.cache_key, (data, self._persisted), self._cache_timeout())
+
+    def _cache_timeout(self, expiry=None):
+        return min(self.get_expiry_age(expiry=expiry), get_cache_timeout())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._persisted = None
+
+    def cycle_key(self):
+        # The new key has no database row yet
+        self._persisted = None
+        super().cycle_key()
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import token_cache
+
+# Fields which affect whether a cached token may still authenticate its
+# user, or what the cached user is authorized to do (e.g. IsAdminUser)
+AUTH_FIELDS = {'password', 'is_active', 'is_staff', 'is_superuser'}
+
+
+@receiver(post_save, sender=get_user_model(), dispatch_uid='core.user.invalidate_token_cache_on_save')
+def invalidate_token_cache_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTH_FIELDS.intersection(update_fields):
+        return
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model(), dispatch_uid='core.user.invalidate_token_cache_on_delete')
+def invalidate_token_cache_on_delete(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
@@ -1,6 +1,9 @@
 from django.shortcuts import render
 from django.http.response import HttpResponseRedirect
 from django.contrib.auth import authenticate, login, logout
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+from core.services.throttling import LOGIN_THROTTLE_CLASSES, throttle
+from .serializers import ClaimsTokenObtainPairSerializer, RevocationTokenVerifySerializer, RotatingTokenRefreshSerializer
 
 # Create your views here.
 def login_view(request):
@@ -8,6 +11,7 @@ def login_view(request):
         return HttpResponseRedirect('/api/docs/')
     return render(request, 'login.html')
 
+@throttle(*LOGIN_THROTTLE_CLASSES)
 def login_authenticate_view(request):
     username = request.POST['username']
     password = request.POST['password']
@@ -21,3 +25,27 @@ def login_authenticate_view(request):
 def logout_view(request):
     logout(request)
     return HttpResponseRedirect('/login/')
+
+class ClaimsTokenObtainPairView(TokenObtainPairView):
+    """
+    Same as TokenObtainPairView, but the tokens carry the user's staff and
+    group claims for TokenClaimsAuthentication.
+    """
+    serializer_class = ClaimsTokenObtainPairSerializer
+    # Every attempt runs the password hasher, so they are limited per IP
+    # address and per username instead of by the default throttles
+    throttle_classes = LOGIN_THROTTLE_CLASSES
+
+class RotatingTokenRefreshView(TokenRefreshView):
+    """
+    Same as TokenRefreshView, with refresh token rotation backed by
+    core.user.revocation instead of the token_blacklist app.
+    """
+    serializer_class = RotatingTokenRefreshSerializer
+
+class RevocationTokenVerifyView(TokenVerifyView):
+    """
+    Same as TokenVerifyView, rejecting the refresh tokens revoked by
+    RotatingTokenRefreshView.
+    """
+    serializer_class = RevocationTokenVerifySerializer
@@ -0,0 +1,273 @@
+"""
+SQLite cache backend shared by all the worker processes of a node.
+
+The database runs in WAL mode, so readers never block the (single) writer
+and vice versa, and the OS page cache keeps hot entries in memory for every
+process at once. Entries are evicted least-recently-used first once
+MAX_ENTRIES entries or MAX_SIZE bytes of values are exceeded.
+
+Usage:
+---
+CACHES = {
+    'default': {
+        'BACKEND': 'core.utils.cache.SQLiteCache',
+        'LOCATION': '/tmp/django-cache/cache.sqlite3',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 32 * 1024 * 1024,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+-- Entry count and total value size, kept up to date by triggers so that
+-- checking the limits does not scan the table
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE stats SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE stats SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE stats SET size = size - OLD.size + NEW.size;
+END;
+"""
+
+# Last access times are only rewritten when older than this many seconds,
+# so that reads of hot keys do not turn into writes every time
+ACCESS_RESOLUTION = 1.0
+
+# Backends whose entries are only seen by one process, or by the processes
+# of one node (pod)
+NODE_LOCAL_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'core.utils.cache.SQLiteCache',
+)
+
+
+def shared_cache_alias(alias, setting, allow_local=False, local_backends=NODE_LOCAL_BACKENDS):
+    """
+    Returns ``alias`` (named by the setting ``setting``, for the messages)
+    if it names a cache of CACHES which all the pods share; raises
+    ImproperlyConfigured otherwise. ``allow_local`` accepts any cache, for
+    single-pod setups.
+    """
+    if not alias:
+        raise ImproperlyConfigured(f'{setting} is not set')
+    if alias not in settings.CACHES:
+        raise ImproperlyConfigured(f"{setting} '{alias}' is not in CACHES")
+    if not allow_local and settings.CACHES[alias]['BACKEND'] in local_backends:
+        raise ImproperlyConfigured(
+            f"{setting} '{alias}' is local to a process or node; use a cache shared by all "
+            f"the pods, such as memcached"
+        )
+    return alias
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._max_size = options.get('MAX_SIZE')
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5.0)
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads, nor be
+        # inherited by forked worker processes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._location,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(f'BEGIN IMMEDIATE; {SCHEMA} COMMIT;')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection):
+        # IMMEDIATE takes the write lock up front, which makes
+        # read-modify-write sequences (add, incr) atomic across processes
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        connection = self._connection
+        with self._transaction(connection):
+            now = time.time()
+            if self._get_row(connection, key, now) is not None:
+                return False
+            self._set(connection, key, pickled, self._expires(timeout), now)
+            return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        connection = self._connection
+        now = time.time()
+        row = self._get_row(connection, key, now)
+        if row is None:
+            return default
+        value, accessed = row
+        if now - accessed > ACCESS_RESOLUTION:
+            connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(value)
+
+    def _get_row(self, connection, key, now):
+        row = connection.execute(
+            'SELECT value, accessed, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, accessed, expires = row
+        if expires is not None and expires <= now:
+            return None
+        return value, accessed
+
+    def _set(self, connection, key, pickled, expires, now):
+        connection.execute(
+            'INSERT INTO cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, size = excluded.size, expires = excluded.expires, accessed = excluded.accessed',
+            (key, pickled, len(pickled), expires, now),
+        )
+        entries, size = connection.execute('SELECT entries, size FROM stats').fetchone()
+        if entries > self._max_entries or (self._max_size is not None and size > self._max_size):
+            self._cull(connection, now)
+
+    def _cull(self, connection, now):
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        entries, size = connection.execute('SELECT entries, size FROM stats').fetchone()
+        while entries > self._max_entries or (self._max_size is not None and size > self._max_size):
+            # Same as Django's other backends: evict 1/CULL_FREQUENCY of the
+            # entries (all of them for 0), least recently used first
+            count = entries // self._cull_frequency if self._cull_frequency else entries
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(count, entries - self._max_entries, 1),),
+            )
+            entries, size = connection.execute('SELECT entries, size FROM stats').fetchone()
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        connection = self._connection
+        with self._transaction(connection):
+            self._set(connection, key, pickled, self._expires(timeout), time.time())
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection
+        expires = self._expires(timeout)
+        with self._transaction(connection):
+            now = time.time()
+            for key, value in data.items():
+                key = self.make_key(key, version=version)
+                self.validate_key(key)
+                self._set(connection, key, pickle.dumps(value, self.pickle_protocol), expires, now)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        cursor = self._connection.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), now, key, now),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        connection = self._connection
+        with self._transaction(connection):
+            now = time.time()
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value, expires = row
+            new_value = pickle.loads(value) + delta
+            pickled = pickle.dumps(new_value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? WHERE key = ?',
+                (pickled, len(pickled), now, key),
+            )
+        return new_value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._get_row(self._connection, key, time.time()) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Django closes caches at the end of every request; the connection
+        # is kept open for the next one instead
+        pass
@@ -0,0 +1,149 @@
+"""
+Response compression with gzip or, when the ``brotli`` package is
+installed, brotli.
+
+Unlike django.middleware.gzip.GZipMiddleware, streaming responses are
+compressed chunk by chunk as they are sent, and static files served as
+FileResponse (staticfiles in DEBUG, the drf_yasg Swagger UI assets...) are
+replaced by their pre-compressed ``.br``/``.gz`` variants when those exist
+next to them, so that they are not compressed again on every request.
+"""
+import asyncio
+import os
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+from . import encoding
+
+DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+}
+
+# Media types worth compressing, besides text/*
+COMPRESSIBLE_TYPES = ('json', 'javascript', 'xml', 'yaml', 'svg', 'openapi')
+
+
+def get_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+def compressible(response):
+    if response.has_header('Content-Encoding') or response.status_code < 200 or response.status_code == 204:
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    return compressible_type(response.get('Content-Type', ''))
+
+
+def compressible_type(content_type):
+    content_type = content_type.split(';')[0].strip().lower()
+    return content_type.startswith('text/') or any(name in content_type for name in COMPRESSIBLE_TYPES)
+
+
+def level(coding):
+    return get_setting('BROTLI_QUALITY') if coding == 'br' else get_setting('GZIP_LEVEL')
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of compressible media types with the best
+    encoding the client accepts, unless they are smaller than MIN_SIZE
+    bytes. Should be placed above any middleware which reads or changes
+    the response body.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django to await this middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not compressible(response):
+            return response
+        if isinstance(response, FileResponse) and self._use_precompressed(request, response):
+            return response
+
+        coding = encoding.negotiate(request)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            length = response.get('Content-Length')
+            if length is not None and int(length) < get_setting('MIN_SIZE'):
+                return response
+            compressor = encoding.StreamCompressor(coding, level(coding))
+            response.streaming_content = compressor.iterate(response.streaming_content)
+            # The length is unknown until the end of the stream
+            del response['Content-Length']
+        else:
+            if len(response.content) < get_setting('MIN_SIZE'):
+                return response
+            compressed = encoding.compress(response.content, coding, level(coding))
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        self._set_headers(response, coding)
+        return response
+
+    def _use_precompressed(self, request, response):
+        path = getattr(response.file_to_stream, 'name', None)
+        if not isinstance(path, str):
+            return False
+        available = []
+        for coding in encoding.ENCODINGS:
+            variant = path + encoding.SUFFIXES[coding]
+            try:
+                # Stale variants, older than the file, are ignored
+                if os.stat(variant).st_mtime >= os.stat(path).st_mtime:
+                    available.append(coding)
+            except OSError:
+                pass
+        if not available:
+            return False
+        # The variants exist, so the response varies even if the client
+        # takes the identity encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = encoding.negotiate(request, available)
+        if coding is None:
+            return True
+        variant = path + encoding.SUFFIXES[coding]
+        # Sent with sendfile() where the server supports it, like the file
+        # itself; the original file is closed with the response. Setting it
+        # runs FileResponse.set_headers() again, which would derive the type
+        # and the download name from the variant's file name.
+        headers = {
+            name: response[name] for name in ('Content-Type', 'Content-Disposition')
+            if response.has_header(name)
+        }
+        response.streaming_content = open(variant, 'rb')
+        for name, value in headers.items():
+            response[name] = value
+        response['Content-Length'] = str(os.path.getsize(variant))
+        self._set_headers(response, coding)
+        return True
+
+    @staticmethod
+    def _set_headers(response, coding):
+        response['Content-Encoding'] = coding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # The compressed body differs from the identity one byte for byte
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
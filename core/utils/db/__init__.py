@@ -0,0 +1,4 @@
+"""
+PostgreSQL backend with connection health checks and an optional
+in-process connection pool. See base.py.
+"""
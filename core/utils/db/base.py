@@ -0,0 +1,114 @@
+"""
+Same as django.db.backends.postgresql, plus two opt-in features configured
+in the DATABASES entry:
+
+CONN_HEALTH_CHECKS: True
+    Persistent connections (CONN_MAX_AGE > 0) are checked with a
+    ``SELECT 1`` before their first use in each request, and transparently
+    reopened if the server closed them, instead of failing the request.
+    Same setting as in Django 4.1+.
+
+POOL: {'MIN_SIZE': 0, 'MAX_SIZE': 10, 'IDLE_TIMEOUT': 300, ...}
+    Connections are taken from, and given back to, a pool shared by the
+    threads of the process instead of being opened and closed (see
+    pool.DEFAULTS for every option). Meant for CONN_MAX_AGE = 0, where
+    Django "closes" the connection at the end of every request, e.g. under
+    ASGI, where requests are not bound to a thread. Pool statistics are
+    logged by the core.utils.db.pool logger.
+"""
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+from .pool import ConnectionPool, PoolTimeout, get_pool
+
+Database = base.Database
+
+
+def reset_connection(connection):
+    """
+    Rolls back whatever a released connection left in progress. Returns
+    False if the connection is broken.
+    """
+    if connection.closed:
+        return False
+    try:
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Database.Error:
+        return False
+    return True
+
+
+def check_connection(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return reset_connection(connection)
+    except Database.Error:
+        return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        return get_pool(self.alias, lambda: ConnectionPool(
+            self.alias,
+            reset=reset_connection,
+            check=check_connection if self.health_checks else None,
+            **options,
+        ))
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connection = pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+        # As in the parent class, for connections created earlier
+        self.isolation_level = self.settings_dict['OPTIONS'].get('isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        # A new (or pooled and already checked) connection
+        self.health_check_done = True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        # Called by Django when a request starts and ends
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None and self.health_checks
+                and not self.health_check_done and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                try:
+                    self.close()
+                except OperationalError:
+                    self.connection = None
+        super().ensure_connection()
@@ -0,0 +1,214 @@
+"""
+Thread-safe pool of database connections, one per process and database
+alias.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Idle connections kept open regardless of IDLE_TIMEOUT
+    'MIN_SIZE': 0,
+    # Connections open at once (idle and in use)
+    'MAX_SIZE': 10,
+    # Seconds after which an idle connection above MIN_SIZE is closed
+    'IDLE_TIMEOUT': 300,
+    # Seconds after which a connection is closed instead of being reused,
+    # None to keep connections forever
+    'MAX_LIFETIME': 3600,
+    # Seconds to wait for a connection when MAX_SIZE are in use
+    'TIMEOUT': 10,
+    # Seconds between two pool statistics log records, None to disable them
+    'STATS_INTERVAL': 60,
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    ``acquire(connect)`` hands out an idle connection, or opens a new one
+    with ``connect()``. ``reset(connection)`` prepares a
+    released connection for reuse (e.g. rolls back its transaction) and
+    returns False if it must be discarded instead; ``check(connection)``
+    does the same for an idle connection about to be handed out.
+
+    Connections handed out and never released are not lost: they are
+    tracked by weak reference, so they stop counting towards MAX_SIZE once
+    garbage collected (e.g. along with the thread that held them).
+    """
+
+    def __init__(self, name, reset, check=None, **options):
+        self.name = name
+        self.pid = os.getpid()
+        self.options = {**DEFAULTS, **{k.upper(): v for k, v in options.items()}}
+        self._reset = reset
+        self._check = check
+        self._condition = threading.Condition()
+        # (connection, created, released) tuples, most recently released last
+        self._idle = deque()
+        self._created = weakref.WeakKeyDictionary()
+        self._in_use = weakref.WeakSet()
+        self._opening = 0
+        self._waiting = 0
+        self._stats_logged = time.monotonic()
+        self.counters = dict.fromkeys(('created', 'reused', 'discarded', 'timeouts'), 0)
+
+    def acquire(self, connect):
+        deadline = time.monotonic() + self.options['TIMEOUT']
+        while True:
+            with self._condition:
+                connection, created = self._take_idle()
+                if connection is None:
+                    while len(self._in_use) + len(self._idle) + self._opening >= self.options['MAX_SIZE']:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.counters['timeouts'] += 1
+                            raise PoolTimeout(
+                                f"No connection available in pool '{self.name}' after "
+                                f"{self.options['TIMEOUT']}s (MAX_SIZE={self.options['MAX_SIZE']})"
+                            )
+                        self._waiting += 1
+                        try:
+                            self._condition.wait(remaining)
+                        finally:
+                            self._waiting -= 1
+                        connection, created = self._take_idle()
+                        if connection is not None:
+                            break
+                    else:
+                        self._opening += 1
+
+            if connection is not None:
+                # Checked outside of the lock, it may be a round trip
+                if self._check is None or self._check(connection):
+                    with self._condition:
+                        self._in_use.add(connection)
+                        self.counters['reused'] += 1
+                    return connection
+                self._discard(connection)
+                continue
+
+            try:
+                connection = connect()
+            except BaseException:
+                with self._condition:
+                    self._opening -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._opening -= 1
+                self._created[connection] = time.monotonic()
+                self._in_use.add(connection)
+                self.counters['created'] += 1
+            return connection
+
+    def release(self, connection):
+        reusable = self._reset(connection)
+        now = time.monotonic()
+        with self._condition:
+            self._in_use.discard(connection)
+            created = self._created.get(connection, now)
+            max_lifetime = self.options['MAX_LIFETIME']
+            if reusable and (max_lifetime is None or now - created < max_lifetime):
+                self._idle.append((connection, created, now))
+                connection = None
+            self._condition.notify()
+        if connection is not None:
+            self._discard(connection)
+        self._log_stats(now)
+
+    def close(self):
+        """
+        Closes the idle connections. Connections in use are closed when
+        released.
+        """
+        with self._condition:
+            idle = [connection for connection, _, _ in self._idle]
+            self._idle.clear()
+            self.options['MAX_SIZE'] = 0
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': len(self._in_use) + len(self._idle),
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                **self.counters,
+            }
+
+    def _take_idle(self):
+        # Expire idle connections from the least recently used end, but
+        # hand out the most recently used one, whose server process and
+        # caches are warm
+        now = time.monotonic()
+        expired = []
+        while len(self._idle) > self.options['MIN_SIZE'] and now - self._idle[0][2] >= self.options['IDLE_TIMEOUT']:
+            expired.append(self._idle.popleft()[0])
+        for connection in expired:
+            # Closing is fast (no round trip), it can be done under the lock
+            self._discard(connection, locked=True)
+        if not self._idle:
+            return None, None
+        connection, created, _ = self._idle.pop()
+        return connection, created
+
+    def _discard(self, connection, locked=False):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        if locked:
+            self.counters['discarded'] += 1
+            self._condition.notify()
+        else:
+            with self._condition:
+                self.counters['discarded'] += 1
+                self._condition.notify()
+
+    def _log_stats(self, now):
+        interval = self.options['STATS_INTERVAL']
+        if interval is None or now - self._stats_logged < interval:
+            return
+        self._stats_logged = now
+        stats = self.stats()
+        logger.info(
+            'pool=%s pid=%d ' + ' '.join(f'{name}=%d' for name in stats),
+            self.name, os.getpid(), *stats.values(),
+        )
+
+
+_pools = {}
+# Pools of the parent process after a fork. Their connections share sockets
+# with the parent, so they are never closed (nor garbage collected, which
+# would close them) in the child.
+_inherited = []
+_pools_lock = threading.Lock()
+
+
+def get_pool(name, factory):
+    """
+    Returns this process' pool called ``name``, creating it with
+    ``factory()`` if needed.
+    """
+    pid = os.getpid()
+    pool = _pools.get(name)
+    if pool is not None and pool.pid == pid:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None or pool.pid != pid:
+            if pool is not None:
+                _inherited.append(pool)
+            pool = _pools[name] = factory()
+    return pool
@@ -0,0 +1,105 @@
+"""
+Content-Encoding negotiation and compression helpers.
+
+Brotli support is optional: it is used when the ``brotli`` package is
+installed and silently skipped otherwise.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# File name suffixes of pre-compressed variants
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def parse_accept_encoding(header):
+    """
+    Returns the set of content codings accepted by an Accept-Encoding
+    header, leaving out the ones explicitly refused with ``q=0``.
+    """
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def negotiate(request, available=ENCODINGS):
+    """
+    Picks the preferred encoding among ``available`` which the client
+    accepts, or None for the identity encoding.
+    """
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for encoding in available:
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=None):
+    """
+    Compresses ``data`` whole. ``level`` defaults to the slowest, smallest
+    setting, which suits content compressed once at build time.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and thus any ETag derived from it, stable
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f'Unsupported encoding {encoding!r}')
+
+
+class StreamCompressor:
+    """
+    Compresses a stream chunk by chunk. Every chunk is flushed, so what has
+    been produced so far can be decoded by the client without waiting for
+    the end of the stream.
+    """
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        elif encoding == 'gzip':
+            # wbits 16 + 15: gzip container, with a zero mtime
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        else:
+            raise ValueError(f'Unsupported encoding {encoding!r}')
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+    def iterate(self, chunks):
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield self.compress(chunk)
+        yield self.finish()
+
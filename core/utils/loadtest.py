@@ -0,0 +1,246 @@
+"""
+In-process load generator for the project's WSGI and ASGI applications.
+
+Requests are fed straight to the application callables, without sockets or
+an HTTP server, so the results measure the cost of Django, DRF and the
+project's code under each protocol: WSGI requests are issued by a pool of
+threads (like a threaded WSGI server), ASGI requests by tasks on a single
+event loop (like uvicorn).
+"""
+import asyncio
+import io
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# ``body`` may also be a function returning the body, called for every
+# request before it is timed (e.g. to send a refresh token only once)
+Request = namedtuple('Request', 'method path headers body', defaults=('GET', '/', (), b''))
+
+HOST = 'localhost'
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Result:
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.elapsed = None
+        self._lock = threading.Lock()
+
+    def add(self, latency, status):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] += 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies),
+            'throughput': len(latencies) / self.elapsed if self.elapsed else 0.0,
+            'p50_ms': _ms(percentile(latencies, 50)),
+            'p95_ms': _ms(percentile(latencies, 95)),
+            'p99_ms': _ms(percentile(latencies, 99)),
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+class QueryCounter:
+    """
+    Counts the SQL queries run by every thread, including the load
+    generator's and sync_to_async's worker threads: it is installed as an
+    execute wrapper on each database connection as it is opened.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection_created.connect(self._connection_created)
+        for connection in connections.all():
+            self._add(connection)
+
+    def uninstall(self):
+        connection_created.disconnect(self._connection_created)
+
+    def _connection_created(self, sender, connection, **kwargs):
+        self._add(connection)
+
+    def _add(self, connection):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+def prepare(request):
+    return request._replace(body=request.body()) if callable(request.body) else request
+
+
+def _split(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+def wsgi_environ(request):
+    path, query = _split(request.path)
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': HOST,
+        'CONTENT_LENGTH': str(len(request.body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(request.body),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers:
+        name = name.upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        environ[name] = value
+    return environ
+
+
+def asgi_scope(request):
+    path, query = _split(request.path)
+    headers = [(b'host', HOST.encode()), (b'content-length', str(len(request.body)).encode())]
+    headers += [(name.lower().encode(), value.encode()) for name, value in request.headers]
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': request.method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': (HOST, 80),
+    }
+
+
+def run_wsgi(application, requests, concurrency, duration):
+    """
+    Sends ``requests`` (cycling through them) from ``concurrency`` threads
+    for ``duration`` seconds.
+    """
+    result = Result()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            request = prepare(requests[index % len(requests)])
+            index += 1
+            status = []
+            started = time.perf_counter()
+            response = application(wsgi_environ(request), lambda s, headers, exc_info=None: status.append(s))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+            result.add(time.perf_counter() - started, int(status[0].split()[0]))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_asgi(application, requests, concurrency, duration):
+    """
+    Sends ``requests`` (cycling through them) from ``concurrency`` tasks
+    for ``duration`` seconds.
+    """
+    return asyncio.run(_run_asgi(application, requests, concurrency, duration))
+
+
+async def asgi_request(application, request):
+    """
+    Sends one request to an ASGI application, returns its status and body.
+    """
+    status = None
+    body = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': request.body, 'more_body': False}
+        # Only reached once the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            body.append(message.get('body', b''))
+
+    await application(asgi_scope(request), receive, send)
+    return status, b''.join(body)
+
+
+async def _run_asgi(application, requests, concurrency, duration):
+    result = Result()
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            request = prepare(requests[index % len(requests)])
+            index += 1
+            started = time.perf_counter()
+            status, _ = await asgi_request(application, request)
+            result.add(time.perf_counter() - started, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+# Application factory and load generator of each protocol
+PROTOCOLS = {
+    'wsgi': (get_wsgi_application, run_wsgi),
+    'asgi': (get_asgi_application, run_asgi),
+}
@@ -0,0 +1,103 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.services import versions
+from core.utils import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads users or groups from a CSV or NDJSON file, in batches of one '
+        'transaction each. An interrupted import resumes from the last '
+        'committed batch when run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=list(bulk.IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Defaults to the extension of the file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--update', action='store_true',
+                            help='Update existing rows (matched by username or name) instead of skipping them')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Insert with bulk_create() even on PostgreSQL, instead of COPY')
+        parser.add_argument('--max-errors', type=int, default=0,
+                            help='Number of invalid rows to skip before giving up')
+        parser.add_argument('--checkpoint', help='Defaults to <path>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or bulk.detect_format(path)
+        if format is None:
+            raise CommandError('Cannot tell the format of %s, pass --format' % path)
+        try:
+            checkpoint = bulk.Checkpoint(options['checkpoint'] or path + '.checkpoint', path)
+        except FileNotFoundError:
+            raise CommandError('%s does not exist' % path)
+        state = None
+        if not options['restart']:
+            try:
+                state = checkpoint.load()
+            except ValueError as exc:
+                raise CommandError('%s, pass --restart to start over' % exc)
+
+        importer = bulk.IMPORTERS[options['model']](
+            update=options['update'], use_copy=not options['no_copy'], using=options['database'],
+        )
+        totals = dict.fromkeys(('created', 'updated', 'skipped', 'invalid'), 0)
+        rows = 0
+        started = time.perf_counter()
+
+        with open(path, 'rb') as f:
+            if state is not None:
+                f.seek(state['offset'])
+                rows = state['rows']
+                self.stdout.write('Resuming after row %d' % rows)
+            reader = bulk.RowReader(f, format, state['header'] if state else None)
+            resumed_rows = rows
+            batch = []
+            try:
+                for row in reader:
+                    rows += 1
+                    batch.append((rows, row))
+                    if len(batch) == options['batch_size']:
+                        self.load(importer, batch, totals, options)
+                        checkpoint.save(reader.offset, rows, reader.header)
+                        self.progress(rows, rows - resumed_rows, started, totals)
+                        batch = []
+            except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+                raise CommandError('Row %d: %s' % (rows, exc))
+            if batch or rows == resumed_rows:
+                self.load(importer, batch, totals, options)
+                self.progress(rows, rows - resumed_rows, started, totals)
+        checkpoint.clear()
+
+    def load(self, importer, batch, totals, options):
+        valid, errors = importer.validate(batch)
+        for number, detail in errors:
+            self.stderr.write('Row %d: %s' % (number, json.dumps(detail)))
+        totals['invalid'] += len(errors)
+        if totals['invalid'] > options['max_errors']:
+            raise CommandError('Too many invalid rows (%d), the last batch was not loaded' % totals['invalid'])
+        with transaction.atomic(using=options['database']):
+            created, updated, skipped = importer.write(valid)
+        totals['created'] += created
+        totals['updated'] += updated
+        totals['skipped'] += skipped
+        # bulk_create(), bulk_update() and COPY send no signals
+        for model in (importer.model, *importer.related_models):
+            versions.bump(model)
+
+    def progress(self, rows, loaded, started, totals):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            '%d rows: %d created, %d updated, %d skipped, %d invalid (%.0f rows/s)' % (
+                rows, totals['created'], totals['updated'], totals['skipped'], totals['invalid'],
+                loaded / elapsed if elapsed else 0,
+            )
+        )
@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, since this one has imported everything already.
+# Phase markers go to stderr, between the -X importtime lines of each phase.
+CHILD = '''
+import json, os, resource, sys, time
+
+phases = []
+
+def rss():
+    # ru_maxrss would include the parent's memory, which it inherits on fork
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def phase(name, func):
+    sys.stderr.write('phase: %s\\n' % name)
+    started = time.perf_counter()
+    func()
+    phases.append((name, time.perf_counter() - started, rss()))
+
+def load_urlconf():
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+def load_handler():
+    from django.core.handlers.wsgi import WSGIHandler
+    WSGIHandler()
+
+def warm_up():
+    from core.utils import warmup
+    warmup.run()
+
+phase('import django', lambda: __import__('django'))
+phase('django.setup()', lambda: __import__('django').setup(set_prefix=False))
+phase('URLconf', load_urlconf)
+phase('middleware', load_handler)
+if sys.argv[1:] == ['--warmup']:
+    phase('warm-up', warm_up)
+print(json.dumps(phases))
+'''
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Project packages, reported per app rather than as a whole
+LOCAL_PACKAGES = ('core', 'config')
+
+
+def package(module):
+    parts = module.split('.')
+    return '.'.join(parts[:2] if parts[0] in LOCAL_PACKAGES else parts[:1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Starts Django in a fresh interpreter and reports the time and memory '
+        'of each startup phase, the slowest imports and the import time per '
+        'package. Run it with the settings and on the hardware of the pods.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Number of imports and packages listed')
+        parser.add_argument('--warmup', action='store_true', help='Also time the warm-up (core/utils/warmup.py)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs, the fastest one is reported')
+
+    def handle(self, *args, **options):
+        best = None
+        for _ in range(max(options['repeat'], 1)):
+            run = self.run_child(options['warmup'])
+            if best is None or run['total'] < best['total']:
+                best = run
+
+        self.stdout.write(f"{'phase':<20} {'time':>10} {'RSS after':>10}")
+        for name, seconds, rss in best['phases']:
+            self.stdout.write(f'{name:<20} {seconds * 1000:>8.1f}ms {rss / 2 ** 20:>7.1f}MiB')
+        self.stdout.write(f"{'total (process)':<20} {best['total'] * 1000:>8.1f}ms")
+
+        imports = best['imports']
+        self.stdout.write(f"\nSlowest imports (cumulative, including the modules they import)")
+        self.stdout.write(f"{'cumulative':>10} {'self':>9}  {'phase':<16} module")
+        for module, (own, cumulative, phase) in sorted(imports.items(), key=lambda item: -item[1][1])[:options['top']]:
+            self.stdout.write(f'{cumulative / 1000:>8.1f}ms {own / 1000:>7.1f}ms  {phase:<16} {module}')
+
+        packages = defaultdict(lambda: [0, 0])
+        for module, (own, _, _) in imports.items():
+            packages[package(module)][0] += own
+            packages[package(module)][1] += 1
+        self.stdout.write(f"\nImport time per package (own modules only)")
+        self.stdout.write(f"{'time':>10} {'modules':>8}  package")
+        for name, (own, count) in sorted(packages.items(), key=lambda item: -item[1][0])[:options['top']]:
+            self.stdout.write(f'{own / 1000:>8.1f}ms {count:>8}  {name}')
+
+    def run_child(self, warmup):
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+        if 'DJANGO_SETTINGS_MODULE' not in env:
+            raise CommandError('DJANGO_SETTINGS_MODULE is not set, pass --settings')
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD] + (['--warmup'] if warmup else []),
+            env=env, capture_output=True, text=True,
+        )
+        total = time.perf_counter() - started
+        if process.returncode:
+            raise CommandError(f'Django failed to start:\n{process.stderr[-4000:]}')
+
+        # module: (self µs, cumulative µs, phase)
+        imports = {}
+        phase = 'interpreter'
+        for line in process.stderr.splitlines():
+            if line.startswith('phase: '):
+                phase = line[len('phase: '):]
+                continue
+            match = IMPORT_TIME.match(line)
+            if match:
+                own, cumulative, _, module = match.groups()
+                imports[module] = (int(own), int(cumulative), phase)
+        return {'phases': json.loads(process.stdout.splitlines()[-1]), 'imports': imports, 'total': total}
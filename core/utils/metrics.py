@@ -0,0 +1,378 @@
+"""
+In-process HTTP latency histograms and request/error counters.
+
+Every worker process writes its counters to its own memory-mapped file in
+METRICS['DIR'], so no locking is needed between processes. The /metrics view
+sums the files of all workers and renders them in the Prometheus text format.
+When a worker starts, the files of the workers which have exited are added
+to a single merged file and deleted, so that counters stay monotonic while
+the directory does not grow with every recycled worker.
+
+The directory should be emptied when the pod/container starts, e.g. by
+mounting an emptyDir volume on it.
+"""
+import asyncio
+import bisect
+import fcntl
+import glob
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'django-metrics'),
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    'MAX_ROUTES': 256,
+}
+
+MAGIC = b'DJMETR01'
+# magic, number of buckets, number of used slots
+HEADER = struct.Struct('<8sII')
+KEY_SIZE = 128
+# Slot 0 collects everything once MAX_ROUTES distinct routes have been seen
+OVERFLOW_KEY = 'OTHER <other>'
+UNMATCHED_ROUTE = '<unmatched>'
+# Counter layout within a slot; bucket counts (non-cumulative, the last one
+# being +Inf) follow
+REQUESTS, ERRORS, DURATION_SUM, FIRST_BUCKET = range(4)
+# Counters of the workers which have exited
+MERGED_FILE = 'metrics_merged.db'
+# Held exclusively while files are merged, shared while they are collected
+LOCK_FILE = 'metrics.lock'
+
+
+def get_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+class MetricsFile:
+    """
+    Fixed-size memory-mapped file holding ``max_routes`` slots. Each slot
+    has a ``METHOD route`` key and an array of float64 counters which is
+    accessed through a memoryview, so recording a request allocates nothing.
+    """
+
+    def __init__(self, path, buckets, max_routes, writable=True):
+        self.path = path
+        self.buckets = tuple(buckets)
+        self.max_routes = max_routes
+        self.slot_size = FIRST_BUCKET + len(self.buckets) + 1
+        self.keys_offset = HEADER.size
+        self.counters_offset = self.keys_offset + max_routes * KEY_SIZE
+        # Keep the float64 array 8-byte aligned
+        self.counters_offset += -self.counters_offset % 8
+        size = self.counters_offset + max_routes * self.slot_size * 8
+
+        if writable:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self.mmap = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            magic, _, used = HEADER.unpack_from(self.mmap)
+            if magic != MAGIC:
+                used = 0
+                HEADER.pack_into(self.mmap, 0, MAGIC, len(self.buckets), used)
+        else:
+            with open(path, 'rb') as f:
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.mmap) < size:
+                self.mmap.close()
+                raise ValueError(f'{path} does not match the configured layout')
+        self._view = memoryview(self.mmap)
+        self.counters = self._view[self.counters_offset:size].cast('d')
+        self.slots = {key: index for index, key in enumerate(self.keys())}
+
+    def keys(self):
+        magic, nbuckets, used = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or nbuckets != len(self.buckets):
+            return []
+        keys = []
+        for index in range(min(used, self.max_routes)):
+            offset = self.keys_offset + index * KEY_SIZE
+            keys.append(self.mmap[offset:offset + KEY_SIZE].rstrip(b'\0').decode(errors='ignore'))
+        return keys
+
+    def slot(self, key):
+        index = self.slots.get(key)
+        if index is None:
+            index = self._add_slot(key)
+        return index * self.slot_size
+
+    def _add_slot(self, key):
+        used = len(self.slots)
+        if not used:
+            self._write_key(0, OVERFLOW_KEY)
+            used = 1
+        if key in self.slots:
+            return self.slots[key]
+        if used >= self.max_routes:
+            self.slots[key] = 0
+            return 0
+        self._write_key(used, key)
+        return used
+
+    def _write_key(self, index, key):
+        encoded = key.encode()[:KEY_SIZE]
+        offset = self.keys_offset + index * KEY_SIZE
+        self.mmap[offset:offset + len(encoded)] = encoded
+        # Publish the slot to readers only once its key is in place
+        HEADER.pack_into(self.mmap, 0, MAGIC, len(self.buckets), index + 1)
+        self.slots[key] = index
+
+    def observe(self, key, duration, error):
+        base = self.slot(key)
+        counters = self.counters
+        counters[base + REQUESTS] += 1
+        if error:
+            counters[base + ERRORS] += 1
+        counters[base + DURATION_SUM] += duration
+        counters[base + FIRST_BUCKET + bisect.bisect_left(self.buckets, duration)] += 1
+
+    def add(self, totals):
+        """
+        Adds {key: [counters...]}, as returned by read(), to this file.
+        """
+        for key, values in totals.items():
+            base = self.slot(key)
+            for i, value in enumerate(values):
+                self.counters[base + i] += value
+
+    def read(self):
+        """
+        Returns {key: [counters...]} for every used slot.
+        """
+        result = {}
+        for index, key in enumerate(self.keys()):
+            base = index * self.slot_size
+            result[key] = self.counters[base:base + self.slot_size].tolist()
+        return result
+
+    def close(self):
+        self.counters.release()
+        self._view.release()
+        self.mmap.close()
+
+
+class Registry:
+    """
+    Per-process entry point. The metrics file is (re)opened lazily whenever
+    the process id changes, so workers forked from a preloaded master each
+    get their own file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+
+    def _open(self):
+        directory = get_setting('DIR')
+        os.makedirs(directory, exist_ok=True)
+        merge_exited_workers()
+        self._file = MetricsFile(
+            os.path.join(directory, f'metrics_{os.getpid()}.db'),
+            get_setting('BUCKETS'),
+            get_setting('MAX_ROUTES'),
+        )
+        self._pid = os.getpid()
+
+    def observe(self, method, route, duration, error):
+        # Threaded workers share the file, so the read-modify-write of the
+        # counters is done under a lock
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            self._file.observe(f'{method} {route}', duration, error)
+
+
+registry = Registry()
+
+
+class _DirectoryLock:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        directory = get_setting('DIR')
+        os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT)
+        fcntl.flock(self.fd, self.operation)
+
+    def __exit__(self, *exc_info):
+        # Closing the file releases the lock
+        os.close(self.fd)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, as another user
+        pass
+    return True
+
+
+def merge_exited_workers():
+    """
+    Adds the counters of the workers which have exited to MERGED_FILE, then
+    deletes their files.
+    """
+    directory = get_setting('DIR')
+    buckets = get_setting('BUCKETS')
+    max_routes = get_setting('MAX_ROUTES')
+    with _DirectoryLock(fcntl.LOCK_EX):
+        exited = []
+        for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+            pid = os.path.basename(path)[len('metrics_'):-len('.db')]
+            if pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid)):
+                exited.append(path)
+        if not exited:
+            return
+        merged = MetricsFile(os.path.join(directory, MERGED_FILE), buckets, max_routes)
+        try:
+            for path in exited:
+                try:
+                    metrics_file = MetricsFile(path, buckets, max_routes, writable=False)
+                except ValueError:
+                    # Never written to
+                    pass
+                else:
+                    try:
+                        merged.add(metrics_file.read())
+                    finally:
+                        metrics_file.close()
+                os.unlink(path)
+        finally:
+            merged.close()
+
+
+def collect():
+    """
+    Sums the counters of every worker's metrics file.
+    """
+    with _DirectoryLock(fcntl.LOCK_SH):
+        return _collect()
+
+
+def _collect():
+    buckets = get_setting('BUCKETS')
+    max_routes = get_setting('MAX_ROUTES')
+    totals = {}
+    for path in glob.glob(os.path.join(get_setting('DIR'), 'metrics_*.db')):
+        try:
+            metrics_file = MetricsFile(path, buckets, max_routes, writable=False)
+        except (OSError, ValueError):
+            # Empty or truncated file of a worker which is just starting
+            continue
+        try:
+            for key, counters in metrics_file.read().items():
+                total = totals.setdefault(key, [0.0] * len(counters))
+                for i, value in enumerate(counters):
+                    total[i] += value
+        finally:
+            metrics_file.close()
+    return totals
+
+
+def _labels(**labels):
+    escaped = (
+        (k, str(v).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for k, v in labels.items()
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(totals):
+    """
+    Renders collected counters in the Prometheus text exposition format.
+    """
+    buckets = get_setting('BUCKETS')
+    requests, errors, histogram = [], [], []
+    for key, counters in sorted(totals.items()):
+        if not counters[REQUESTS]:
+            continue
+        method, _, route = key.partition(' ')
+        labels = dict(method=method, route=route)
+        requests.append(f'http_requests_total{_labels(**labels)} {_number(counters[REQUESTS])}')
+        errors.append(f'http_request_errors_total{_labels(**labels)} {_number(counters[ERRORS])}')
+        cumulative = 0.0
+        for bound, count in zip(list(buckets) + ['+Inf'], counters[FIRST_BUCKET:]):
+            cumulative += count
+            histogram.append(
+                f'http_request_duration_seconds_bucket{_labels(**labels, le=bound)} {_number(cumulative)}'
+            )
+        histogram.append(f'http_request_duration_seconds_sum{_labels(**labels)} {repr(counters[DURATION_SUM])}')
+        histogram.append(f'http_request_duration_seconds_count{_labels(**labels)} {_number(counters[REQUESTS])}')
+
+    lines = [
+        '# HELP http_requests_total Total number of HTTP requests.',
+        '# TYPE http_requests_total counter',
+        *requests,
+        '# HELP http_request_errors_total Total number of HTTP requests answered with a 5xx status.',
+        '# TYPE http_request_errors_total counter',
+        *errors,
+        '# HELP http_request_duration_seconds HTTP request latency.',
+        '# TYPE http_request_duration_seconds histogram',
+        *histogram,
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and outcome of every request, labelled by HTTP
+    method and URL route. Should be the first entry in MIDDLEWARE so the
+    time spent in other middleware is included.
+
+    Works both under WSGI and ASGI; under ASGI it does not force Django to
+    run the rest of the chain in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django to await this middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            self._observe(request, started, 500)
+            raise
+        self._observe(request, started, response.status_code)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            self._observe(request, started, 500)
+            raise
+        self._observe(request, started, response.status_code)
+        return response
+
+    def _observe(self, request, started, status):
+        match = request.resolver_match
+        route = match.route if match is not None else UNMATCHED_ROUTE
+        registry.observe(request.method, route, time.perf_counter() - started, status >= 500)
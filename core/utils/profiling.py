@@ -0,0 +1,235 @@
+"""
+On-demand sampling profiler for single requests.
+
+ProfilerMiddleware profiles the requests which carry the secret
+PROFILING['TOKEN'] in the PROFILING['HEADER'] header, plus a random
+PROFILING['SAMPLE_RATE'] share of all requests. While such a request is
+handled, a helper thread records the call stack of the thread handling it
+every INTERVAL seconds. The counts of each distinct stack are saved in the
+collapsed ("folded") format of flamegraph.pl, inferno or speedscope, one
+``frame;frame;frame count`` line per stack, root first.
+
+Profiles are kept in PROFILING['DIR'] (one ``.folded`` file and one ``.json``
+file of metadata each), the oldest being deleted once there are more than
+MAX_PROFILES of them. Staff users list and download them at api/profiles/.
+
+With no token and a zero sample rate the middleware removes itself from
+the middleware chain; otherwise a request which is not profiled costs one
+header lookup and, with a sample rate, one random number.
+
+Only the thread handling the request is sampled: the streaming of a
+streaming response's body, and under ASGI the views running on the event
+loop (see core.services.types.AsyncAPIView), are not profiled.
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.crypto import constant_time_compare
+
+DEFAULTS = {
+    'TOKEN': '',
+    'HEADER': 'X-Profile',
+    'SAMPLE_RATE': 0.0,
+    'INTERVAL': 0.005,
+    'DIR': os.path.join(tempfile.gettempdir(), 'django-profiles'),
+    'MAX_PROFILES': 100,
+}
+
+# Frames recorded per sample, innermost first
+MAX_DEPTH = 256
+
+PROFILE_ID = re.compile(r'^\d{20}-[0-9a-f]{8}$')
+
+
+def get_setting(name):
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+_locations = {}
+
+
+def location(code):
+    """
+    Frame name of a code object: function and file, relative to the
+    sys.path entry it was imported from, and the line of its definition.
+    """
+    try:
+        return _locations[code]
+    except KeyError:
+        pass
+    filename = code.co_filename
+    for path in sys.path:
+        if path and filename.startswith(path + os.sep):
+            filename = filename[len(path) + 1:]
+            break
+    name = f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+    _locations[code] = name
+    return name
+
+
+class StackSampler:
+    """
+    Counts the call stacks of the thread ``thread_id``, sampled every
+    ``interval`` seconds from a helper thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(location(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.stacks[';'.join(stack)] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+_last_ns = 0
+_ids_lock = threading.Lock()
+
+
+def new_profile_id():
+    """
+    Ids sort by creation time: nanoseconds since the epoch, strictly
+    increasing within a process, and a random suffix against clashes
+    between processes.
+    """
+    global _last_ns
+    with _ids_lock:
+        _last_ns = max(time.time_ns(), _last_ns + 1)
+        ns = _last_ns
+    return f'{ns:020d}-{uuid.uuid4().hex[:8]}'
+
+
+def save(sampler, meta):
+    """
+    Writes a profile to the ring, then deletes the oldest ones beyond
+    MAX_PROFILES. Returns its id.
+    """
+    directory = get_setting('DIR')
+    os.makedirs(directory, exist_ok=True)
+    profile_id = new_profile_id()
+    meta = dict(meta, id=profile_id, samples=sampler.samples, interval=sampler.interval)
+    for suffix, content in (('.folded', sampler.collapsed()), ('.json', json.dumps(meta))):
+        path = os.path.join(directory, profile_id + suffix)
+        with open(path + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+
+    for old in profile_ids()[get_setting('MAX_PROFILES'):]:
+        for suffix in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except FileNotFoundError:
+                # Deleted by another process
+                pass
+    return profile_id
+
+
+def profile_ids():
+    """
+    Ids of the saved profiles, newest first.
+    """
+    try:
+        names = os.listdir(get_setting('DIR'))
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-len('.json')] for name in names if name.endswith('.json')), reverse=True)
+
+
+def list_profiles():
+    profiles = []
+    for profile_id in profile_ids():
+        try:
+            with open(os.path.join(get_setting('DIR'), profile_id + '.json')) as f:
+                profiles.append(json.load(f))
+        except FileNotFoundError:
+            pass
+    return profiles
+
+
+def profile_path(profile_id):
+    """
+    Path of the collapsed stacks of a profile, None if there is no such
+    profile.
+    """
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(get_setting('DIR'), profile_id + '.folded')
+    return path if os.path.exists(path) else None
+
+
+class ProfilerMiddleware:
+    """
+    Profiles the requests selected by PROFILING (see above) and adds the id
+    of their profile in an X-Profile-Id response header. Should be placed
+    near the top of the middleware chain, so that the time spent in the
+    middleware below it is profiled too.
+    """
+
+    def __init__(self, get_response):
+        self.token = get_setting('TOKEN')
+        self.sample_rate = get_setting('SAMPLE_RATE')
+        if not self.token and self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + get_setting('HEADER').upper().replace('-', '_')
+
+    def __call__(self, request):
+        if not self.profiled(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), get_setting('INTERVAL'))
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration = time.perf_counter() - started
+        response['X-Profile-Id'] = save(sampler, {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'method': request.method,
+            # The query string is left out, it may hold secrets
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+        })
+        return response
+
+    def profiled(self, request):
+        value = request.META.get(self.header)
+        if value is not None and self.token and constant_time_compare(value, self.token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
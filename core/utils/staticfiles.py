@@ -0,0 +1,249 @@
+"""
+Serving of collected static files (STATIC_ROOT) by the application itself.
+
+CompressedManifestStaticFilesStorage is Django's ManifestStaticFilesStorage,
+which copies every file under a name carrying a hash of its content
+(``css/base.1a2b3c4d5e6f.css``), plus pre-compressed ``.br``/``.gz`` variants
+of the text files, made once by ``collectstatic`` at the slowest, smallest
+compression settings by default.
+
+StaticFilesMiddleware walks STATIC_ROOT once, when the process starts, and
+answers requests under STATIC_URL from that index: no finder, no os.stat()
+and no compression per request. Files are sent as FileResponse, which WSGI
+servers supporting wsgi.file_wrapper (gunicorn, uWSGI) send with sendfile().
+Hashed names never change content, so they are cached by clients for a year
+without revalidation; other names get a short MAX_AGE and an ETag.
+
+Files collected after the process started are not served until it restarts,
+which is the case anyway for a container built with them.
+"""
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import compression, encoding
+
+DEFAULTS = {
+    # Seconds, for the files whose names do not carry a hash
+    'MAX_AGE': 60,
+    # Variants are kept when at most this share of the original size
+    'MIN_RATIO': 0.95,
+    # Compression levels of collectstatic
+    'GZIP_LEVEL': 9,
+    'BROTLI_QUALITY': 11,
+}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def get_setting(name):
+    return getattr(settings, 'STATIC_SERVING', {}).get(name, DEFAULTS[name])
+
+
+def content_type(path):
+    type_, coding = mimetypes.guess_type(path)
+    if type_ is None or coding is not None:
+        return 'application/octet-stream'
+    if type_.startswith('text/') or type_ in ('application/javascript', 'application/json'):
+        return type_ + '; charset=utf-8'
+    return type_
+
+
+def write_variants(path, compressed=None):
+    """
+    Writes the compressed variants of the file at ``path``, if it is of a
+    compressible type and large enough, or removes outdated ones. Variants
+    newer than the file are left as they are. ``compressed`` may be a dict
+    shared between calls, in which the variants are kept by content digest:
+    the original and hashed copies of a file usually have the same content.
+    """
+    if not compression.compressible_type(content_type(path)):
+        return
+    if compressed is None:
+        compressed = {}
+    mtime = os.stat(path).st_mtime
+    content = digest = None
+    for coding in encoding.ENCODINGS:
+        variant = path + encoding.SUFFIXES[coding]
+        try:
+            if os.stat(variant).st_mtime >= mtime:
+                continue
+        except FileNotFoundError:
+            pass
+        if content is None:
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).digest()
+        if (coding, digest) not in compressed:
+            data = b''
+            if len(content) >= compression.get_setting('MIN_SIZE'):
+                data = encoding.compress(content, coding, build_level(coding))
+            # Empty when not worth it
+            compressed[coding, digest] = data if len(data) <= len(content) * get_setting('MIN_RATIO') else b''
+        if compressed[coding, digest]:
+            with open(variant, 'wb') as f:
+                f.write(compressed[coding, digest])
+        else:
+            try:
+                os.remove(variant)
+            except FileNotFoundError:
+                pass
+
+
+def build_level(coding):
+    return get_setting('BROTLI_QUALITY') if coding == 'br' else get_setting('GZIP_LEVEL')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage which also writes the ``.br``/``.gz`` variants
+    of the collected files (hashed or not), for StaticFilesMiddleware.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.add(name)
+                if hashed_name:
+                    names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        compressed = {}
+        for name in sorted(names):
+            if self.exists(name):
+                write_variants(self.path(name), compressed)
+
+
+class StaticFile:
+    """
+    Headers and variants of one file, found when the index was built.
+    """
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.content_type = content_type(path)
+        # Whole seconds, as compared with If-(Un)Modified-Since
+        self.last_modified = int(stat.st_mtime)
+        self.etag = '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else 'public, max-age=%d' % get_setting('MAX_AGE')
+        # Content coding: (path, size), preferred first
+        self.variants = {}
+        for coding in encoding.ENCODINGS:
+            variant = path + encoding.SUFFIXES[coding]
+            try:
+                variant_stat = os.stat(variant)
+            except FileNotFoundError:
+                continue
+            if variant_stat.st_mtime >= stat.st_mtime:
+                self.variants[coding] = (variant, variant_stat.st_size)
+
+
+class StaticFileResponse(FileResponse):
+    """
+    FileResponse whose headers were set from the index, instead of from a
+    stat() of the open file.
+    """
+
+    def set_headers(self, filelike):
+        pass
+
+
+def build_index(root, url):
+    """
+    Maps the URL paths of the files under ``root`` to their StaticFile.
+    Variants are only listed under their original file.
+    """
+    hashed = set()
+    try:
+        with open(os.path.join(root, ManifestStaticFilesStorage.manifest_name)) as f:
+            hashed.update(json.load(f).get('paths', {}).values())
+    except (FileNotFoundError, ValueError):
+        pass
+    suffixes = tuple(encoding.SUFFIXES.values())
+    index = {}
+    for directory, _, files in os.walk(root, followlinks=True):
+        for file in files:
+            path = os.path.join(directory, file)
+            if file.endswith(suffixes) and os.path.exists(os.path.splitext(path)[0]):
+                continue
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            index[url + name] = StaticFile(path, name in hashed)
+    return index
+
+
+class StaticFilesMiddleware:
+    """
+    Answers GET and HEAD requests under STATIC_URL from the files collected
+    in STATIC_ROOT, and lets any other request through. Turned off when
+    DEBUG is on (the development server serves static files itself, from
+    the apps' directories) or when STATIC_ROOT is not set.
+
+    Should be placed above CompressionMiddleware, since the responses are
+    already compressed when they can be.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Tells Django to await this middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.url = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.index = build_index(settings.STATIC_ROOT, self.url)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        file = self.lookup(request)
+        if file is not None:
+            return self.serve(request, file)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        file = self.lookup(request)
+        if file is not None:
+            return self.serve(request, file)
+        return await self.get_response(request)
+
+    def lookup(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.url):
+            return self.index.get(posixpath.normpath(request.path_info))
+        return None
+
+    def serve(self, request, file):
+        coding = encoding.negotiate(request, tuple(file.variants)) if file.variants else None
+        path, size = file.variants[coding] if coding else (file.path, file.size)
+
+        response = get_conditional_response(request, etag=file.etag, last_modified=file.last_modified)
+        if response is None:
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=file.content_type)
+            else:
+                response = StaticFileResponse(open(path, 'rb'), content_type=file.content_type)
+            response['Content-Length'] = str(size)
+            response['Last-Modified'] = http_date(file.last_modified)
+            if coding:
+                response['Content-Encoding'] = coding
+        response['ETag'] = file.etag if coding is None else 'W/' + file.etag
+        response['Cache-Control'] = file.cache_control
+        response['X-Content-Type-Options'] = 'nosniff'
+        if file.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,44 @@
+"""
+URLconf helpers which defer imports from startup to first use, for parts of
+the site that most processes never serve (the admin, the API documentation).
+"""
+import threading
+
+from django.utils.module_loading import import_string
+
+
+def lazy_view(dotted_path, factory=None, *args, **kwargs):
+    """
+    View which imports ``dotted_path`` on its first request. It is either a
+    view function, or a view class whose ``factory`` class method (e.g.
+    'as_view') is called with ``args`` and ``kwargs`` to build the view.
+
+    Attributes of the actual view, such as csrf_exempt, are not known to the
+    middleware before the first request, so the view is not exempted from
+    CSRF checks.
+    """
+    view = None
+    lock = threading.Lock()
+
+    def load():
+        nonlocal view
+        with lock:
+            if view is None:
+                target = import_string(dotted_path)
+                view = getattr(target, factory)(*args, **kwargs) if factory else target
+        return view
+
+    def wrapper(request, *view_args, **view_kwargs):
+        return (view or load())(request, *view_args, **view_kwargs)
+
+    wrapper.load = load
+    return wrapper
+
+
+def lazy_include(urlconf, app_name=None, namespace=None):
+    """
+    Same as include('dotted.path.to.urlconf'), except that the module is
+    imported when a URL under it is first resolved, or when any URL is first
+    reversed, instead of with the URLconf including it.
+    """
+    return urlconf, app_name, namespace or app_name
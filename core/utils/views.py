@@ -1,3 +1,24 @@
+from django.http import HttpResponse
 from django.shortcuts import render
+from . import metrics, warmup
 
 # Create your views here.
+def metrics_view(request):
+    """
+    Latency histograms and request/error counters of all the workers of
+    this instance, in the Prometheus text exposition format.
+    """
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def ready_view(request):
+    """
+    Readiness probe: 503 until the warm-up of this process (see
+    core/utils/warmup.py) is done.
+    """
+    if not warmup.is_ready():
+        return HttpResponse('warming up', status=503, content_type='text/plain')
+    return HttpResponse('ready', content_type='text/plain')
@@ -0,0 +1,86 @@
+"""
+Warm-up of a freshly started process, before it reports ready.
+
+The first requests of a process pay for work which is done once and then
+cached: compiling the URL patterns they traverse, loading and compiling the
+templates they render. config/wsgi.py and config/asgi.py start the warm-up
+on a background thread once the application is loaded; the /ready view
+answers 503 until it is done, so a Kubernetes readiness probe keeps traffic
+away from the pod meanwhile.
+
+Only URLs are resolved, none is reversed: reversing builds the lookup tables
+of the whole URLconf, which would import the lazily included parts (the
+admin, the API documentation) too.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'URLS': (),
+    'TEMPLATES': (),
+}
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread = None
+
+
+def get_setting(name):
+    return getattr(settings, 'WARMUP', {}).get(name, DEFAULTS[name])
+
+
+def run():
+    """
+    Warms up this process, returns the time it took in seconds.
+    """
+    started = time.perf_counter()
+    for path in get_setting('URLS'):
+        try:
+            resolve(path)
+        except Resolver404:
+            logger.warning('Warm-up URL %s does not resolve', path)
+    for name in get_setting('TEMPLATES'):
+        try:
+            # Kept compiled by the cached template loader (DEBUG off)
+            get_template(name)
+        except TemplateDoesNotExist:
+            logger.warning('Warm-up template %s does not exist', name)
+    _ready.set()
+    return time.perf_counter() - started
+
+
+def _run():
+    try:
+        logger.info('Warm-up done in %.3fs', run())
+    except Exception:
+        # A failed warm-up only makes the first requests slower
+        logger.exception('Warm-up failed')
+        _ready.set()
+
+
+def start():
+    """
+    Starts the warm-up on a background thread, once per process. With
+    WARMUP['ENABLED'] off, the process is ready at once.
+    """
+    global _thread
+    if not get_setting('ENABLED'):
+        _ready.set()
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name='warmup', daemon=True)
+            _thread.start()
+
+
+def is_ready():
+    return _ready.is_set()
@@ -0,0 +1,64 @@
+import pytest
+from django.contrib.auth.models import Group, User
+from rest_framework.test import APIClient
+
+from core.services import views
+from core.user.authentication import CachedJWTAuthentication, TokenClaimsAuthentication, token_cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+PASSWORD = 'C@3vsRdNts8R5#N'
+
+
+@pytest.fixture
+def staff_token(db):
+    user = User.objects.create_user('staff1', password=PASSWORD, is_staff=True)
+    user.groups.add(Group.objects.create(name='ops'))
+    res = APIClient().post('/api/token/', {'username': 'staff1', 'password': PASSWORD})
+    return res.json()['access']
+
+
+@pytest.fixture
+def use_authentication(monkeypatch):
+    # authentication_classes are read from settings when the views are defined
+    def _use(authentication_class):
+        token_cache.clear()
+        for view in (views.SampleAPI1, views.UserViewSet, views.GroupViewSet):
+            monkeypatch.setattr(view, 'authentication_classes', [authentication_class])
+    return _use
+
+
+def test_token_carries_claims(staff_token):
+    validated_token = JWTAuthentication().get_validated_token(staff_token.encode())
+    assert validated_token['is_staff'] is True
+    assert validated_token['groups'] == ['ops']
+
+
+@pytest.mark.parametrize('authentication_class, queries', [
+    (JWTAuthentication, 1),
+    (TokenClaimsAuthentication, 0),
+])
+def test_queries_per_request(staff_token, use_authentication, django_assert_num_queries, authentication_class, queries):
+    use_authentication(authentication_class)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {staff_token}')
+    with django_assert_num_queries(queries):
+        assert client.get('/api/sample/').status_code == 200
+
+
+def test_cached_authentication_queries_once(staff_token, use_authentication, django_assert_num_queries):
+    use_authentication(CachedJWTAuthentication)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {staff_token}')
+    with django_assert_num_queries(1):
+        client.get('/api/sample/')
+    with django_assert_num_queries(0):
+        assert client.get('/api/sample/').status_code == 200
+
+
+def test_admin_permission_from_claims(staff_token, use_authentication, django_assert_num_queries):
+    use_authentication(TokenClaimsAuthentication)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {staff_token}')
+    # Only the query listing the groups themselves
+    with django_assert_num_queries(1):
+        assert client.get('/api/groups/').status_code == 200
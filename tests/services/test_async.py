@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.services import log
+from core.user.authentication import token_cache
+from core.utils.loadtest import Request, asgi_request
+
+
+def test_log_decorator_awaits_coroutines(caplog):
+    class View:
+        @log.info(tag='async')
+        async def dispatch(self, request):
+            return 'done'
+
+    assert asyncio.iscoroutinefunction(View.dispatch)
+    with caplog.at_level(logging.INFO, logger='core.services.log'):
+        assert asyncio.run(View().dispatch('request')) == 'done'
+    assert caplog.records[-1].view == 'View'
+
+
+@pytest.fixture
+def call():
+    application = get_asgi_application()
+    return lambda path, headers=(): asyncio.run(asgi_request(application, Request('GET', path, headers)))
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/api/sample/', b'[{"a":"SampleAPI1"}]'),
+    ('/api/sample/async/', b'[{"a":"AsyncSampleAPI"}]'),
+])
+def test_async_view_over_asgi(transactional_db, call, path, body):
+    token = AccessToken.for_user(User.objects.create_user('async1'))
+    token_cache.clear()
+    assert call(path, [('Authorization', f'Bearer {token}')]) == (200, body)
+    assert call(path) == (401, b'{"detail":"Authentication credentials were not provided."}')
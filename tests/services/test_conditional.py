@@ -0,0 +1,66 @@
+import pytest
+from django.contrib.auth.models import Group, User
+from rest_framework.test import APIClient
+
+from core.services import versions
+
+
+@pytest.fixture
+def client(db):
+    admin = User.objects.create_user('admin1', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+def test_not_modified(client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    Group.objects.create(name='group1')
+    res = client.get('/api/groups/')
+    etag = res['ETag']
+    assert res['Last-Modified']
+
+    with django_assert_num_queries(0):
+        res = client.get('/api/groups/', HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 304
+    assert res['ETag'] == etag
+    # Other URLs have other ETags
+    assert client.get('/api/groups/?page_size=1', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Group.objects.create(name='group2')
+    res = client.get('/api/groups/', HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 200
+    assert res['ETag'] != etag
+    assert len(res.json()['results']) == 2
+
+
+def test_cached_body(client, django_assert_num_queries, django_capture_on_commit_callbacks):
+    group = Group.objects.create(name='group1')
+    body = client.get('/api/groups/').content
+    with django_assert_num_queries(0):
+        assert client.get('/api/groups/').content == body
+
+    # Many-to-many changes bump both sides
+    user = User.objects.get(username='admin1')
+    version, _ = versions.get_versions([User])[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        user.groups.add(group)
+    assert versions.get_versions([User])[0][0] > version
+    with django_capture_on_commit_callbacks(execute=True):
+        group.delete()
+    assert client.get('/api/groups/').json()['results'] == []
+
+
+def test_versions_cache_must_be_shared(client, settings):
+    settings.CACHES = dict(settings.CACHES, versions={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'})
+    settings.TABLE_VERSIONS = {'CACHE': 'versions'}
+    assert [error.id for error in versions.check_versions_cache(None)] == ['services.E001']
+    # Neither validated nor cached, rather than stale on the other pods
+    assert versions.get_cache() is None
+    res = client.get('/api/groups/')
+    assert res.status_code == 200 and 'ETag' not in res
+
+    settings.CACHES = dict(settings.CACHES, versions={
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': 'memcached:11211',
+    })
+    assert versions.check_versions_cache(None) == []
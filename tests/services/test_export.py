@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import Group, User
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core.services import views
+from core.services.serializers import SparseFieldsetMixin
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['username', 'email', 'groups']
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(views.UserViewSet, 'serializer_class', UserSerializer)
+    monkeypatch.setattr(views.UserViewSet, 'export_chunk_size', 4)
+    admin = User.objects.create_user('admin1', email='admin1@example.com', is_staff=True)
+    group = Group.objects.create(name='group1')
+    for i in range(10):
+        User.objects.create_user(f'user{i}', email=f'user{i}@example.com').groups.add(group)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+def content(response):
+    assert response.streaming
+    return b''.join(response.streaming_content).decode()
+
+
+def test_export_ndjson(client, django_assert_max_num_queries):
+    response = client.get('/api/users/export/')
+    assert response['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+    # One query for the users, plus one prefetch of the groups per chunk
+    with django_assert_max_num_queries(1 + 3):
+        rows = [json.loads(line) for line in content(response).splitlines()]
+    assert len(rows) == 11
+    assert {'username': 'user0', 'email': 'user0@example.com', 'groups': [Group.objects.get().pk]} in rows
+
+
+def test_export_csv(client):
+    response = client.get('/api/users/export/?format=csv')
+    assert response['Content-Disposition'] == 'attachment; filename="user.csv"'
+    rows = list(csv.reader(io.StringIO(content(response))))
+    assert rows[0] == ['username', 'email', 'groups']
+    assert len(rows) == 12
+    assert ['user0', 'user0@example.com', f'[{Group.objects.get().pk}]'] in rows
+
+
+def test_export_sparse_fields(client):
+    response = client.get('/api/users/export/?fields=username', HTTP_ACCEPT='text/csv')
+    assert content(response).splitlines()[:2] == ['username', 'user9']
+
+
+def test_export_requires_staff(db):
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user('user1'))
+    assert client.get('/api/users/export/').status_code == 403
@@ -0,0 +1,139 @@
+import gc
+import logging
+import threading
+import weakref
+
+import pytest
+
+from core.services import log
+
+
+@pytest.fixture(autouse=True)
+def debug_level():
+    # Regardless of the level configured by the settings
+    level = log.logger.level
+    log.logger.setLevel(logging.DEBUG)
+    yield
+    log.logger.setLevel(level)
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.append(threading.get_ident())
+
+
+class _View:
+    @log.debug(custom_message='abc')
+    def dispatch(self, request, *args, **kwargs):
+        return _Response()
+
+
+class _Request:
+    method = 'GET'
+    path = '/api/users/'
+
+    def __str__(self):
+        return '<Request GET>'
+
+
+class _Response:
+    status_code = 200
+    streaming = False
+    content = b'[]'
+
+    def __str__(self):
+        return '<Response 200>'
+
+
+def _queue_handler(target, **kwargs):
+    handler = log.QueueHandler(targets=['target'], **kwargs)
+    handler.resolve_targets({'target': target})
+    return handler
+
+
+def test_queue_handler_formats_on_listener_thread():
+    target = _Capture()
+    handler = _queue_handler(target)
+    log.logger.addHandler(handler)
+    try:
+        _View().dispatch(_Request())
+    finally:
+        log.logger.removeHandler(handler)
+        handler.close()
+    assert target.records == ['<Request GET>;<Response 200>;custom_message:abc']
+    assert target.threads[0] != threading.get_ident()
+
+
+def test_structured_formatter():
+    target = _Capture()
+    target.setFormatter(log.StructuredFormatter('%(levelname)s %(message)s'))
+    log.logger.addHandler(target)
+    try:
+        _View().dispatch(_Request())
+        log.logger.debug('plain')
+    finally:
+        log.logger.removeHandler(target)
+    assert target.records[0].startswith('DEBUG view=_View method=GET path=/api/users/ status=200 duration_ms=')
+    assert target.records[0].endswith(' size=2 user=None custom_message=abc')
+    assert target.records[1] == 'DEBUG plain'
+
+
+def test_queued_records_hold_no_request_or_response():
+    release = threading.Event()
+
+    class _Blocked(_Capture):
+        def emit(self, record):
+            release.wait()
+            super().emit(record)
+
+    responses = []
+
+    class _ResponseView:
+        @log.debug()
+        def dispatch(self, request, *args, **kwargs):
+            response = _Response()
+            responses.append(weakref.ref(response))
+            return response
+
+    target = _Blocked()
+    handler = _queue_handler(target)
+    log.logger.addHandler(handler)
+    try:
+        # The first record blocks the listener, the second waits in the queue
+        _ResponseView().dispatch(_Request())
+        request = _Request()
+        request_ref = weakref.ref(request)
+        _ResponseView().dispatch(request)
+        del request
+        gc.collect()
+        assert request_ref() is None and responses[1]() is None
+    finally:
+        release.set()
+        log.logger.removeHandler(handler)
+        handler.close()
+    assert target.records[1] == '<Request GET>;<Response 200>'
+
+
+def test_queue_handler_drop_policy():
+    release = threading.Event()
+
+    class _Slow(_Capture):
+        def emit(self, record):
+            release.wait()
+            super().emit(record)
+
+    target = _Slow()
+    handler = _queue_handler(target, maxsize=1, policy='drop')
+    record = logging.makeLogRecord({'msg': 'x'})
+    for _ in range(5):
+        handler.handle(record)
+    release.set()
+    handler.close()
+    assert handler.dropped >= 3
+    assert 'log records dropped, queue full' in ' '.join(target.records)
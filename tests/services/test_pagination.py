@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.services.serializers import UserSerializer
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(UserSerializer.Meta, 'fields', ['username', 'email'])
+    admin = User.objects.create_user('admin1', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+@pytest.fixture
+def users(client):
+    # Several users share a date_joined, so that id breaks the ties
+    joined = timezone.now() - timedelta(days=1)
+    for i in range(7):
+        User.objects.create_user(f'user{i}', email=f'user{i}@example.com', date_joined=joined + timedelta(hours=i // 3))
+    return list(User.objects.order_by('-date_joined', '-id').values_list('username', flat=True))
+
+
+def test_pages_follow_date_joined_then_id(client, users):
+    seen = []
+    url = '/api/users/?page_size=3'
+    while url:
+        page = client.get(url).json()
+        seen += [user['username'] for user in page['results']]
+        url = page['next']
+    assert seen == users
+
+    # And back again
+    last = client.get('/api/users/?page_size=3').json()
+    second = client.get(last['next']).json()
+    first = client.get(second['previous']).json()
+    assert [u['username'] for u in first['results']] == users[:3]
+
+
+def test_deep_page_query_is_keyset(client, users, django_assert_num_queries):
+    page = client.get('/api/users/?page_size=2').json()
+    page = client.get(page['next']).json()
+    with django_assert_num_queries(1) as context:
+        client.get(page['next'])
+    sql = context.captured_queries[0]['sql']
+    assert 'OFFSET' not in sql
+    assert '"date_joined" <' in sql
+
+
+def test_sparse_fieldset(client, users, django_assert_num_queries):
+    with django_assert_num_queries(1) as context:
+        page = client.get('/api/users/?fields=username').json()
+    assert set(page['results'][0]) == {'username'}
+    sql = context.captured_queries[0]['sql']
+    assert '"email"' not in sql and '"password"' not in sql
+
+
+def test_sparse_fieldset_pages(client, users, django_assert_num_queries):
+    # The cursors are built from the sort key of the last row, which must
+    # not be deferred
+    with django_assert_num_queries(1) as context:
+        page = client.get('/api/users/?fields=username&page_size=2').json()
+    assert '"email"' not in context.captured_queries[0]['sql']
+    with django_assert_num_queries(1):
+        page = client.get(page['next']).json()
+    assert [user['username'] for user in page['results']] == users[2:4]
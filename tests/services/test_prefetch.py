@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth.models import Group, Permission, User
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core.services import views
+from core.services.mixins import plan_related
+from core.services.testing import assert_list_queries
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ['name', 'permissions']
+
+
+class UserSerializer(serializers.ModelSerializer):
+    groups = GroupSerializer(many=True)
+
+    class Meta:
+        model = User
+        fields = ['username', 'groups', 'user_permissions']
+
+
+class PermissionSerializer(serializers.ModelSerializer):
+    app_label = serializers.CharField(source='content_type.app_label')
+
+    class Meta:
+        model = Permission
+        fields = ['codename', 'content_type', 'app_label']
+
+
+def test_plan_related():
+    assert plan_related(User, UserSerializer().fields) == (
+        [], ['groups', 'groups__permissions', 'user_permissions'],
+    )
+    # The content_type field only needs the foreign key column, app_label
+    # needs the related row
+    assert plan_related(Permission, PermissionSerializer().fields) == (['content_type'], [])
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(views.UserViewSet, 'serializer_class', UserSerializer)
+    admin = User.objects.create_user('admin1', is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    return client
+
+
+def test_user_list_queries_do_not_grow(client):
+    permissions = list(Permission.objects.all()[:3])
+    for i in range(10):
+        group = Group.objects.create(name=f'group{i}')
+        group.permissions.set(permissions)
+        user = User.objects.create_user(f'user{i}')
+        user.groups.add(group)
+    # Users, their groups, the groups' permissions and the users' own ones
+    response = assert_list_queries(client, '/api/users/', 4)
+    assert response.json()['results'][0]['groups'][0]['permissions'] == [p.pk for p in permissions]
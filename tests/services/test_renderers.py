@@ -0,0 +1,75 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict, namedtuple
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.services.parsers import FastJSONParser
+from core.services.renderers import FastJSONRenderer
+
+Point = namedtuple('Point', 'x y')
+
+PAYLOADS = [
+    # Shapes checked by tests/api/test_jwt.py
+    {'username': [ErrorDetail('This field is required.', code='required')],
+     'password': [ErrorDetail('This field is required.', code='required')]},
+    {'detail': ErrorDetail('Given token not valid for any token type', code='token_not_valid'),
+     'code': 'token_not_valid',
+     'messages': [{'token_class': 'AccessToken', 'token_type': 'access', 'message': 'Token is invalid or expired'}]},
+    [{'a': 'SampleAPI1'}],
+    ReturnList([ReturnDict([('id', 1), ('name', 'ops')], serializer=None)], serializer=None),
+    {
+        'aware': timezone.make_aware(datetime.datetime(2021, 11, 5, 8, 30, 1, 123456), timezone.utc),
+        'naive': datetime.datetime(2021, 11, 5, 8, 30),
+        'date': datetime.date(2021, 11, 5),
+        'time': datetime.time(8, 30),
+        'duration': datetime.timedelta(hours=1, microseconds=5),
+        'decimal': decimal.Decimal('1.10'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'lazy': gettext_lazy('Authentication credentials were not provided.'),
+        'unicode': 'héllo 世界    "quoted" \\ \n\t\x00',
+        'numbers': [0, -1, 2 ** 63 - 1, 1.5, 0.1, True, False, None],
+        'ordered': OrderedDict([('b', 1), ('a', 2)]),
+        'tuple': (1, 2),
+        'namedtuple': Point(1, 2),
+        'set': {1},
+        'bytes': b'raw',
+        1: 'int key',
+        None: 'none key',
+    },
+    {'big': 2 ** 64},
+]
+
+
+@pytest.mark.parametrize('data', PAYLOADS)
+def test_render_identical(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_render_indent_falls_back():
+    data = {'a': [1, 2]}
+    media_type = 'application/json; indent=4'
+    assert FastJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
+
+
+@pytest.mark.parametrize('body', [b'{"a": [1, 2.5, "\xc3\xa9"]}', b'{"a": 18446744073709551616}'])
+def test_parse_identical(body):
+    expected = JSONParser().parse(io.BytesIO(body))
+    assert repr(FastJSONParser().parse(io.BytesIO(body))) == repr(expected)
+
+
+@pytest.mark.parametrize('body', [b'{"a": }', b'[NaN]'])
+def test_parse_error_message(body):
+    with pytest.raises(ParseError) as expected:
+        JSONParser().parse(io.BytesIO(body))
+    with pytest.raises(ParseError) as error:
+        FastJSONParser().parse(io.BytesIO(body))
+    assert str(error.value) == str(expected.value)
@@ -0,0 +1,60 @@
+import gzip
+import json
+
+import pytest
+from django.contrib.auth.models import User
+
+from core.services import schema
+
+
+@pytest.fixture
+def prebuilt_schema(settings, tmp_path, monkeypatch):
+    settings.DEBUG = False
+    settings.API_SCHEMA_ROOT = str(tmp_path)
+    monkeypatch.setattr(schema, '_documents', {})
+    from core.services.docs import SchemaView
+    schema.write(schema.generate(SchemaView), str(tmp_path))
+    return tmp_path
+
+
+def test_schema_requires_session(client, prebuilt_schema):
+    res = client.get('/api/docs.json')
+    assert res.status_code == 302
+    assert res['Location'] == '/login/'
+
+
+def test_schema_served_with_etag(admin_client, prebuilt_schema):
+    res = admin_client.get('/api/docs.json')
+    assert res.status_code == 200
+    assert res['Content-Type'] == 'application/json; charset=utf-8'
+    assert '/sample/' in json.loads(res.content)['paths']
+    etag = res['ETag']
+
+    res = admin_client.get('/api/docs.json', HTTP_IF_NONE_MATCH=etag)
+    assert res.status_code == 304
+    assert res.content == b''
+
+
+def test_schema_precompressed(admin_client, prebuilt_schema):
+    res = admin_client.get('/api/docs/', {'format': 'openapi'}, HTTP_ACCEPT_ENCODING='gzip')
+    assert res['Content-Encoding'] == 'gzip'
+    assert res['Content-Type'] == 'application/openapi+json; charset=utf-8'
+    assert 'Accept-Encoding' in res['Vary']
+    assert gzip.decompress(res.content) == (prebuilt_schema / 'staff-superuser' / 'openapi.json').read_bytes()
+
+
+def test_schema_follows_permissions(client, admin_client, prebuilt_schema):
+    client.force_login(User.objects.create_user('docs-user'))
+    paths = json.loads(client.get('/api/docs.json').content)['paths']
+    assert '/sample/' in paths
+    assert not any(path.startswith(('/users/', '/profiles/')) for path in paths)
+
+    paths = json.loads(admin_client.get('/api/docs.json').content)['paths']
+    assert '/users/' in paths and '/profiles/' in paths
+
+
+def test_schema_strong_etag_matches(admin_client, prebuilt_schema):
+    etag = admin_client.get('/api/docs.json')['ETag']
+    assert etag.startswith('W/"')
+    res = admin_client.get('/api/docs.json', HTTP_IF_NONE_MATCH=etag[2:])
+    assert res.status_code == 304
@@ -0,0 +1,107 @@
+import pytest
+from django.core.cache import cache, caches
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from core.services.throttling import LoginRateThrottle, SlidingWindowLimiter, SlidingWindowThrottle
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    # THROTTLE_RATES is read from settings when the throttles are defined
+    cache.clear()
+    rates = {'anon': None, 'user': None, 'login': '100/min', 'login_username': '3/min'}
+    monkeypatch.setattr(SlidingWindowThrottle, 'THROTTLE_RATES', rates)
+    yield rates
+    cache.clear()
+
+
+def test_sliding_window():
+    cache.clear()
+    limiter = SlidingWindowLimiter(10, 60, cache)
+    for _ in range(10):
+        assert limiter.hit('k', now=600) is None
+    # The 11th hit counts too: it is 11 * (1 - 10.9 / 60) + 1 <= 10 again
+    # 10.9s into the next window
+    assert limiter.hit('k', now=630) == pytest.approx(30 + 60 * 2 / 11)
+
+    # Halfway through the next window, half of the previous one still counts
+    limiter = SlidingWindowLimiter(10, 60, cache)
+    for _ in range(10):
+        assert limiter.hit('k2', now=601) is None
+    for _ in range(5):
+        assert limiter.hit('k2', now=690) is None
+    assert limiter.hit('k2', now=690) is not None
+    # Other keys are counted separately
+    assert limiter.hit('k3', now=690) is None
+
+
+def test_token_endpoint_per_username(db, rates):
+    client = APIClient()
+    for _ in range(3):
+        res = client.post('/api/token/', {'username': 'user2', 'password': '1'})
+        assert res.status_code == 401
+    res = client.post('/api/token/', {'username': 'user2', 'password': '1'})
+    assert res.status_code == 429
+    assert int(res['Retry-After']) > 0
+    # Usernames are limited separately, whatever the address
+    res = client.post('/api/token/', {'username': 'user3', 'password': '1'})
+    assert res.status_code == 401
+
+
+def test_token_endpoint_per_address(db, rates):
+    rates['login'] = '2/min'
+    client = APIClient()
+    for username in ('user2', 'user3'):
+        assert client.post('/api/token/', {'username': username, 'password': '1'}).status_code == 401
+    assert client.post('/api/token/', {'username': 'user4', 'password': '1'}).status_code == 429
+
+
+def test_forwarded_for_is_not_trusted(db, rates, settings):
+    rates['login'] = '2/min'
+    settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, NUM_PROXIES=0)
+    client = APIClient()
+    for i, username in enumerate(('user2', 'user3', 'user4')):
+        res = client.post('/api/token/', {'username': username, 'password': '1'}, HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+    assert res.status_code == 429
+
+
+def test_forwarded_for_behind_proxy(db, rates, settings):
+    rates['login'] = '2/min'
+    settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+    client = APIClient()
+    # The address appended by the proxy counts, not what the client sent
+    for username in ('user2', 'user3'):
+        res = client.post('/api/token/', {'username': username, 'password': '1'}, HTTP_X_FORWARDED_FOR=f'{username}, 10.0.0.1')
+        assert res.status_code == 401
+    res = client.post('/api/token/', {'username': 'user4', 'password': '1'}, HTTP_X_FORWARDED_FOR='spoofed, 10.0.0.1')
+    assert res.status_code == 429
+    res = client.post('/api/token/', {'username': 'user4', 'password': '1'}, HTTP_X_FORWARDED_FOR='10.0.0.2')
+    assert res.status_code == 401
+
+
+def test_login_view(db, rates):
+    client = APIClient()
+    for _ in range(3):
+        res = client.post('/login/auth/', {'username': 'user2', 'password': '1'})
+        assert res.status_code == 302
+    res = client.post('/login/auth/', {'username': 'user2', 'password': '1'})
+    assert res.status_code == 429
+    assert 'Retry-After' in res
+
+
+def test_counters_cache(settings, rates):
+    rates['login'] = '1/min'
+    settings.CACHES = dict(settings.CACHES, throttle={
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'throttle',
+    })
+    settings.THROTTLING = {'CACHE': 'throttle'}
+    request = RequestFactory().post('/api/token/')
+    assert LoginRateThrottle().cache is caches['throttle']
+    assert LoginRateThrottle().allow_request(request, None)
+    assert not LoginRateThrottle().allow_request(request, None)
+
+    # Nothing was counted in the default cache
+    settings.THROTTLING = {}
+    assert LoginRateThrottle().allow_request(request, None)
+    caches['throttle'].clear()
@@ -0,0 +1,27 @@
+from core.services import timing
+
+
+def test_request_timing_header_and_fields():
+    request_timing = timing.RequestTiming()
+    with request_timing.phase('auth'):
+        pass
+    request_timing.start('handler')
+    request_timing.stop('handler')
+    request_timing._execute_wrapper(lambda *args: None, 'SELECT 1', (), False, {})
+
+    header = request_timing.header()
+    assert header.startswith('auth;dur=')
+    assert ', handler;dur=' in header
+    assert 'db;dur=' in header and 'desc="1 queries"' in header
+    assert 'render' not in header
+
+    fields = request_timing.fields()
+    assert set(fields) == {'auth_ms', 'handler_ms', 'db_queries', 'db_ms'}
+    assert fields['db_queries'] == 1
+
+
+def test_sampling(settings):
+    settings.API_TIMING = {'SAMPLE_RATE': 0}
+    assert not any(timing.sampled() for _ in range(100))
+    settings.API_TIMING = {'SAMPLE_RATE': 1.0}
+    assert all(timing.sampled() for _ in range(100))
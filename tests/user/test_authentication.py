@@ -0,0 +1,58 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import User
+
+from core.user.authentication import TokenCache, token_cache
+
+
+def _user(pk):
+    return SimpleNamespace(pk=pk)
+
+
+def test_token_cache_lru_eviction(settings):
+    settings.AUTH_TOKEN_CACHE = {'MAX_ENTRIES': 2}
+    cache = TokenCache()
+    expires_at = time.time() + 60
+    cache.set(b'a', b'x.a', _user(1), 'token-a', expires_at)
+    cache.set(b'b', b'x.b', _user(2), 'token-b', expires_at)
+    # Touch 'a' so that 'b' is the least recently used entry
+    assert cache.get(b'a', b'x.a')[1] == 'token-a'
+    cache.set(b'c', b'x.c', _user(3), 'token-c', expires_at)
+    assert cache.get(b'b', b'x.b') is None
+    assert cache.get(b'a', b'x.a') is not None
+    assert len(cache) == 2
+
+
+def test_token_cache_expiry_and_mismatch():
+    cache = TokenCache()
+    cache.set(b'a', b'x.a', _user(1), 'token-a', time.time() - 1)
+    assert cache.get(b'a', b'x.a') is None
+    assert len(cache) == 0
+
+    cache.set(b'a', b'x.a', _user(1), 'token-a', time.time() + 60)
+    # Same signature with a different payload is never served from the cache
+    assert cache.get(b'a', b'y.a') is None
+
+
+def test_token_cache_invalidate_user():
+    cache = TokenCache()
+    expires_at = time.time() + 60
+    cache.set(b'a', b'x.a', _user(1), 'token-a', expires_at)
+    cache.set(b'b', b'x.b', _user(1), 'token-b', expires_at)
+    cache.set(b'c', b'x.c', _user(2), 'token-c', expires_at)
+    cache.invalidate_user(1)
+    assert cache.get(b'a', b'x.a') is None
+    assert cache.get(b'b', b'x.b') is None
+    assert cache.get(b'c', b'x.c') is not None
+
+
+@pytest.mark.parametrize('field', ['password', 'is_active', 'is_staff', 'is_superuser'])
+def test_token_cache_invalidated_on_auth_field_change(db, field):
+    user = User.objects.create_user('cached-user', password='secret')
+    token_cache.set(b'a', b'x.a', user, 'token-a', time.time() + 60)
+    user.save(update_fields=['last_login'])
+    assert token_cache.get(b'a', b'x.a') is not None
+    user.save(update_fields=[field])
+    assert token_cache.get(b'a', b'x.a') is None
@@ -0,0 +1,84 @@
+import threading
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.test import Client
+
+from core.user import backends
+from core.user.backends import rehash_worker
+from core.user.hashers import ScryptPasswordHasher
+
+PASSWORD = 'C@3vsRdNts8R5#N'
+FAST_SCRYPT = {'SCRYPT': {'N': 2 ** 10, 'R': 8, 'P': 1}}
+
+
+def test_scrypt(settings):
+    settings.PASSWORD_HASHING = FAST_SCRYPT
+    hasher = ScryptPasswordHasher()
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+    assert encoded.startswith('scrypt$1024$')
+    assert hasher.verify(PASSWORD, encoded)
+    assert not hasher.verify('wrong', encoded)
+    assert not hasher.must_update(encoded)
+
+    settings.PASSWORD_HASHING = {'SCRYPT': {'N': 2 ** 11, 'R': 8, 'P': 1}}
+    assert hasher.must_update(encoded)
+    # Older parameters still verify
+    assert hasher.verify(PASSWORD, encoded)
+
+
+def test_rehash_after_login(transactional_db, settings):
+    settings.PASSWORD_HASHERS = [
+        'core.user.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    settings.PASSWORD_HASHING = FAST_SCRYPT
+    user = User.objects.create(username='user1', password=make_password(PASSWORD, hasher='md5'))
+
+    assert authenticate(username='user1', password=PASSWORD) == user
+    rehash_worker.join()
+    user.refresh_from_db()
+    assert user.password.startswith('scrypt$')
+    assert check_password(PASSWORD, user.password)
+
+    # Wrong passwords are not rehashed
+    assert authenticate(username='user1', password='wrong') is None
+
+
+def test_login_survives_rehash(transactional_db, settings):
+    settings.PASSWORD_HASHERS = [
+        'core.user.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    settings.PASSWORD_HASHING = FAST_SCRYPT
+    User.objects.create(username='user1', password=make_password(PASSWORD, hasher='md5'))
+
+    client = Client()
+    assert client.post('/login/auth/', {'username': 'user1', 'password': PASSWORD}).status_code == 302
+    rehash_worker.join()
+    assert User.objects.get(username='user1').password.startswith('scrypt$')
+    # Still logged in: redirected to the docs
+    assert client.get('/login/').status_code == 302
+
+
+def test_token_login_hashes_in_background(transactional_db, settings, monkeypatch):
+    settings.PASSWORD_HASHERS = [
+        'core.user.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    settings.PASSWORD_HASHING = FAST_SCRYPT
+    User.objects.create(username='user1', password=make_password(PASSWORD, hasher='md5'))
+    threads = []
+
+    def recording_make_password(password):
+        threads.append(threading.current_thread().name)
+        return make_password(password)
+
+    monkeypatch.setattr(backends, 'make_password', recording_make_password)
+    response = Client().post('/api/token/', {'username': 'user1', 'password': PASSWORD})
+    assert response.status_code == 200
+    rehash_worker.join()
+    assert threads == ['password-rehash']
+    assert check_password(PASSWORD, User.objects.get(username='user1').password)
+    assert User.objects.get(username='user1').password.startswith('scrypt$')
@@ -0,0 +1,85 @@
+import time
+import uuid
+
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from core.user.revocation import BloomFilter, ExpiringBloomFilter, RevocationStore, check_revocation_cache, get_cache
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_expiring_bloom_filter():
+    bloom = ExpiringBloomFilter(60, 100, 0.01)
+    now = time.time()
+    bloom.add('a', now + 30)
+    bloom.add('b', now + 90)
+    assert 'a' in bloom and 'b' in bloom
+    bloom.evict(now + 120)
+    assert 'a' not in bloom
+    bloom.evict(now + 180)
+    assert 'b' not in bloom
+
+
+def test_claim_is_atomic():
+    store = RevocationStore(cache)
+    expires_at = time.time() + 60
+    assert store.claim('jti-1', expires_at)
+    assert not store.claim('jti-1', expires_at)
+    assert store.is_revoked('jti-1')
+    assert not store.is_revoked('jti-2')
+
+
+def test_revocations_of_other_processes(settings):
+    settings.TOKEN_REVOCATION = {'SYNC_INTERVAL': 0}
+    store, other = RevocationStore(cache), RevocationStore(cache)
+    assert not store.is_revoked('jti-1')
+    other.claim('jti-1', time.time() + 60)
+    assert store.is_revoked('jti-1')
+    # Revoked entries expire with their token
+    cache.delete('revoked:jti-1')
+    assert not store.is_revoked('jti-1')
+
+
+def test_revocation_cache_must_be_shared(settings):
+    settings.SIMPLE_JWT = dict(settings.SIMPLE_JWT, ROTATE_REFRESH_TOKENS=True, BLACKLIST_AFTER_ROTATION=True)
+    settings.CACHES = dict(settings.CACHES, shared={
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': 'memcached:11211',
+    }, local={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'})
+    for alias in (None, 'missing', 'default', 'local'):
+        settings.TOKEN_REVOCATION = {'CACHE': alias}
+        with pytest.raises(ImproperlyConfigured):
+            get_cache()
+        assert [error.id for error in check_revocation_cache(None)] == ['user.E001']
+    settings.TOKEN_REVOCATION = {'CACHE': 'shared'}
+    assert check_revocation_cache(None) == []
+    settings.TOKEN_REVOCATION = {'CACHE': 'local', 'ALLOW_LOCAL_CACHE': True}
+    assert check_revocation_cache(None) == []
+
+
+def test_refresh_rotation(api, user1, live, settings):
+    if live:
+        pytest.skip('Rotation is only enabled in process')
+    settings.SIMPLE_JWT = dict(settings.SIMPLE_JWT, ROTATE_REFRESH_TOKENS=True, BLACKLIST_AFTER_ROTATION=True)
+    settings.TOKEN_REVOCATION = dict(settings.TOKEN_REVOCATION, CACHE='default', ALLOW_LOCAL_CACHE=True)
+    # Not the session's tokens, their refresh token gets revoked
+    tokens = api.post('/api/token/', data={'username': user1.username, 'password': user1.password}).json()
+    res = api.post('/api/token/refresh/', data={'refresh': tokens['refresh']})
+    assert res.status_code == 200
+    rotated = res.json()['refresh']
+    assert rotated != tokens['refresh']
+    # The token it was exchanged for cannot be used again
+    res = api.post('/api/token/refresh/', data={'refresh': tokens['refresh']})
+    assert res.status_code == 401
+    assert api.post('/api/token/verify/', data={'token': tokens['refresh']}).status_code == 400
+    assert api.post('/api/token/verify/', data={'token': rotated}).status_code == 200
+    assert api.post('/api/token/refresh/', data={'refresh': rotated}).status_code == 200
@@ -0,0 +1,90 @@
+import datetime
+import time
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.user.sessions import SessionStore
+
+
+def test_write_behind(db, django_assert_num_queries, settings):
+    session = SessionStore()
+    session['user'] = 1
+    session.save()
+    key = session.session_key
+
+    session = SessionStore(key)
+    with django_assert_num_queries(0):
+        assert session['user'] == 1
+        # Unchanged data is not written again
+        session['user'] = 1
+        session.save()
+
+    session['user'] = 2
+    session.save()
+    assert SessionStore().decode(Session.objects.get(pk=key).session_data) == {'user': 2}
+
+    # Rewritten once the last write is too old
+    settings.SESSION_WRITE_INTERVAL = -1
+    session = SessionStore(key)
+    session['user'] = 2
+    with CaptureQueriesContext(connection) as queries:
+        session.save()
+    assert any('UPDATE' in query['sql'] for query in queries)
+
+
+def test_falls_back_to_database(db):
+    session = SessionStore()
+    session['user'] = 1
+    session.save()
+    cache.clear()
+    assert SessionStore(session.session_key)['user'] == 1
+
+
+def test_deleted_on_another_pod(db, settings):
+    settings.SESSION_CACHE_TIMEOUT = 1
+    session = SessionStore()
+    session['user'] = 1
+    session.save()
+    # Logged out on another pod: only the database row is deleted here
+    Session.objects.filter(pk=session.session_key).delete()
+    assert SessionStore(session.session_key)['user'] == 1
+    time.sleep(1.1)
+    assert SessionStore(session.session_key).load() == {}
+
+
+def test_reloaded_session_is_not_rewritten(db, django_assert_num_queries):
+    session = SessionStore()
+    session['user'] = 1
+    session.save()
+    cache.clear()
+    session = SessionStore(session.session_key)
+    assert session['user'] == 1
+    # Written less than SESSION_WRITE_INTERVAL ago
+    with django_assert_num_queries(0):
+        session.save()
+
+
+def test_login_flow(client, user1):
+    response = client.post('/login/auth/', {'username': user1.username, 'password': user1.password})
+    assert response['Location'] == '/api/docs/'
+    assert client.get('/login/')['Location'] == '/api/docs/'
+    client.get('/logout/')
+    assert client.get('/login/').status_code == 200
+
+
+def test_purge_sessions(db):
+    now = timezone.now()
+    Session.objects.bulk_create(
+        [Session(session_key=f'expired{i}', session_data='', expire_date=now - datetime.timedelta(days=1)) for i in range(25)]
+        + [Session(session_key='current', session_data='', expire_date=now + datetime.timedelta(days=1))]
+    )
+    out = StringIO()
+    call_command('purge_sessions', '--batch-size', '10', stdout=out)
+    assert 'Deleted 25 expired sessions' in out.getvalue()
+    assert list(Session.objects.values_list('session_key', flat=True)) == ['current']
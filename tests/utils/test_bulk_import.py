@@ -0,0 +1,81 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.utils import bulk
+
+
+def write(tmp_path, name, content):
+    path = os.path.join(tmp_path, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def test_import_csv(db, tmp_path):
+    password = make_password('secret')
+    path = write(tmp_path, 'users.csv', (
+        'username,first_name,password,is_staff,groups\n'
+        f'user1,One,{password},true,"[""ops"",""dev""]"\n'
+        'user2,,,false,\n'
+        'user3,"Multi\nline",raw-password,,"[""ops""]"\n'
+    ))
+    out = StringIO()
+    call_command('bulk_import', 'users', path, '--batch-size', '2', stdout=out)
+    assert '3 rows: 3 created, 0 updated, 0 skipped, 0 invalid' in out.getvalue()
+    assert not os.path.exists(path + '.checkpoint')
+
+    user1 = User.objects.get(username='user1')
+    assert user1.password == password
+    assert user1.is_staff
+    assert sorted(user1.groups.values_list('name', flat=True)) == ['dev', 'ops']
+    assert not User.objects.get(username='user2').has_usable_password()
+    user3 = User.objects.get(username='user3')
+    assert user3.first_name == 'Multi\nline'
+    assert user3.check_password('raw-password')
+
+
+def test_import_ndjson_update_and_errors(db, tmp_path):
+    Group.objects.create(name='ops')
+    path = write(tmp_path, 'groups.ndjson', '{"name": "ops"}\n{"name": "dev"}\n\n{"name": ""}\n')
+    with pytest.raises(CommandError, match='Too many invalid rows'):
+        call_command('bulk_import', 'groups', path, stdout=StringIO(), stderr=StringIO())
+
+    User.objects.create_user('user1', email='old@example.com')
+    path = write(tmp_path, 'users.ndjson', '{"username": "user1", "email": "new@example.com"}\n{"username": "bad name!"}\n')
+    err = StringIO()
+    call_command('bulk_import', 'users', path, '--update', '--max-errors', '1', stdout=StringIO(), stderr=err)
+    assert 'Row 2' in err.getvalue()
+    assert User.objects.get(username='user1').email == 'new@example.com'
+
+
+def test_resume_from_checkpoint(db, tmp_path, monkeypatch):
+    path = write(tmp_path, 'groups.csv', 'name\n' + ''.join(f'group{i}\n' for i in range(10)))
+    write_batch = bulk.GroupImporter.write
+    calls = []
+
+    def failing_write(self, batch):
+        calls.append(batch)
+        if len(calls) == 3:
+            raise RuntimeError('connection lost')
+        return write_batch(self, batch)
+
+    monkeypatch.setattr(bulk.GroupImporter, 'write', failing_write)
+    with pytest.raises(RuntimeError):
+        call_command('bulk_import', 'groups', path, '--batch-size', '3', stdout=StringIO())
+    assert Group.objects.count() == 6
+    with open(path + '.checkpoint') as f:
+        assert json.load(f)['rows'] == 6
+
+    monkeypatch.setattr(bulk.GroupImporter, 'write', write_batch)
+    out = StringIO()
+    call_command('bulk_import', 'groups', path, '--batch-size', '3', stdout=out)
+    assert 'Resuming after row 6' in out.getvalue()
+    assert '10 rows: 4 created' in out.getvalue()
+    assert sorted(Group.objects.values_list('name', flat=True)) == sorted(f'group{i}' for i in range(10))
@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+
+import pytest
+
+from core.utils.cache import SQLiteCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def _make(**options):
+        return SQLiteCache(os.path.join(tmp_path, 'cache.sqlite3'), {'OPTIONS': options})
+    return _make
+
+
+def test_basic_operations(make_cache):
+    cache = make_cache()
+    assert cache.get('missing', 'default') == 'default'
+    cache.set('a', {'value': 1})
+    assert cache.get('a') == {'value': 1}
+    assert not cache.add('a', 2)
+    assert cache.add('b', 2)
+    assert cache.incr('b', 3) == 5
+    with pytest.raises(ValueError):
+        cache.incr('missing')
+    assert cache.delete('a')
+    assert not cache.has_key('a')
+    cache.set('expired', 1, timeout=0)
+    assert cache.get('expired') is None
+    assert cache.add('expired', 2)
+    cache.clear()
+    assert cache.get('b') is None
+
+
+def test_lru_eviction(make_cache):
+    cache = make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+    for i, key in enumerate('abc'):
+        cache.set(key, i)
+    # Make 'a' the most recently used entry
+    cache._connection.execute("UPDATE cache SET accessed = accessed + 10 WHERE key = ':1:a'")
+    cache.set('d', 3)
+    assert cache.get('a') == 0
+    assert cache.get('b') is None
+    assert cache.get('d') == 3
+
+
+def test_size_bound(make_cache):
+    cache = make_cache(MAX_SIZE=1000)
+    for i in range(20):
+        cache.set(f'k{i}', b'x' * 100)
+    entries, size = cache._connection.execute('SELECT entries, size FROM stats').fetchone()
+    assert size <= 1000
+    assert cache.get('k19') == b'x' * 100
+
+
+def _increment(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(50):
+        cache.incr('counter')
+
+
+def test_shared_between_processes(make_cache, tmp_path):
+    cache = make_cache()
+    cache.set('counter', 0)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_increment, args=(cache._location,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert cache.get('counter') == 200
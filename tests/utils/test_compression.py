@@ -0,0 +1,87 @@
+import gzip
+import os
+import zlib
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from core.utils import encoding
+from core.utils.compression import CompressionMiddleware
+
+BODY = b'{"results":[%s]}' % b','.join(b'{"id":%d,"name":"group"}' % i for i in range(200))
+
+
+def process(response, accept_encoding='gzip'):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+def test_compresses_json():
+    response = HttpResponse(BODY, content_type='application/json')
+    response['ETag'] = '"abc"'
+    response = process(response)
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert response['ETag'] == 'W/"abc"'
+    assert gzip.decompress(response.content) == BODY
+
+
+def test_skips_small_and_binary_bodies():
+    assert not process(HttpResponse(b'{}', content_type='application/json')).has_header('Content-Encoding')
+    assert not process(HttpResponse(BODY, content_type='image/png')).has_header('Content-Encoding')
+    assert not process(HttpResponse(BODY, content_type='application/json'), 'identity').has_header('Content-Encoding')
+
+
+def test_streaming_is_compressed_incrementally():
+    chunks = [b'{"id":%d}\n' % i for i in range(1000)]
+    response = process(StreamingHttpResponse(iter(chunks), content_type='application/x-ndjson'))
+    assert response['Content-Encoding'] == 'gzip'
+    assert not response.has_header('Content-Length')
+
+    # Each chunk can be decoded as soon as it is received
+    decompressor = zlib.decompressobj(31)
+    stream = iter(response.streaming_content)
+    assert decompressor.decompress(next(stream)) == chunks[0]
+    assert decompressor.decompress(b''.join(stream)) == b''.join(chunks[1:])
+
+
+def test_precompressed_static_file(tmp_path):
+    path = os.path.join(tmp_path, 'app.js')
+    with open(path, 'wb') as f:
+        f.write(b'var a = 1;\n' * 1000)
+    with open(path + '.gz', 'wb') as f:
+        f.write(encoding.compress(b'var a = 1;\n' * 1000, 'gzip'))
+
+    # (response.close() would also send request_finished)
+    with open(path, 'rb') as f:
+        response = process(FileResponse(f, content_type='text/javascript'))
+        assert response['Content-Encoding'] == 'gzip'
+        assert int(response['Content-Length']) == os.path.getsize(path + '.gz')
+        assert gzip.decompress(b''.join(response.streaming_content)) == b'var a = 1;\n' * 1000
+        response.file_to_stream.close()
+
+    with open(path, 'rb') as f:
+        response = process(FileResponse(f, content_type='text/javascript'), 'identity')
+        assert not response.has_header('Content-Encoding')
+        assert response['Vary'] == 'Accept-Encoding'
+
+
+def test_precompressed_keeps_file_headers(tmp_path):
+    path = os.path.join(tmp_path, 'index.html')
+    with open(path, 'wb') as f:
+        f.write(b'<p>a</p>\n' * 1000)
+    with open(path + '.gz', 'wb') as f:
+        f.write(encoding.compress(b'<p>a</p>\n' * 1000, 'gzip'))
+
+    # Type and name are guessed from the original file, not the variant
+    with open(path, 'rb') as f:
+        response = process(FileResponse(f))
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Content-Type'] == 'text/html'
+        assert response['Content-Disposition'] == 'inline; filename="index.html"'
+        response.file_to_stream.close()
+
+    with open(path, 'rb') as f:
+        response = process(FileResponse(f, as_attachment=True, filename='report.html'))
+        assert response['Content-Disposition'] == 'attachment; filename="report.html"'
+        response.file_to_stream.close()
@@ -0,0 +1,77 @@
+import gc
+import threading
+import time
+
+import pytest
+
+from core.utils.db.pool import ConnectionPool, PoolTimeout
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def close(self):
+        self.closed = True
+
+
+def reset(connection):
+    return not connection.broken
+
+
+def make_pool(**options):
+    return ConnectionPool('test', reset, STATS_INTERVAL=None, **options)
+
+
+def test_reuse_most_recent():
+    pool = make_pool()
+    first, second = pool.acquire(Connection), pool.acquire(Connection)
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire(Connection) is second
+    assert pool.stats() == dict(size=2, in_use=1, idle=1, waiting=0, created=2, reused=1, discarded=0, timeouts=0)
+
+
+def test_broken_connection_discarded():
+    pool = make_pool()
+    connection = pool.acquire(Connection)
+    connection.broken = True
+    pool.release(connection)
+    assert connection.closed
+    assert pool.acquire(Connection) is not connection
+
+
+def test_max_size_waits_for_release():
+    pool = make_pool(MAX_SIZE=1, TIMEOUT=0.05)
+    connection = pool.acquire(Connection)
+    with pytest.raises(PoolTimeout):
+        pool.acquire(Connection)
+
+    pool.options['TIMEOUT'] = 5
+    threading.Timer(0.05, pool.release, (connection,)).start()
+    assert pool.acquire(Connection) is connection
+
+
+def test_leaked_connection_frees_its_slot():
+    pool = make_pool(MAX_SIZE=1, TIMEOUT=0.05)
+    pool.acquire(Connection)
+    gc.collect()
+    assert pool.acquire(Connection) is not None
+
+
+def test_idle_timeout_keeps_min_size():
+    pool = make_pool(MIN_SIZE=1, IDLE_TIMEOUT=0.01)
+    connections = [pool.acquire(Connection) for _ in range(3)]
+    for connection in connections:
+        pool.release(connection)
+    time.sleep(0.02)
+    assert pool.acquire(Connection) is connections[-1]
+    assert [c.closed for c in connections] == [True, True, False]
+
+
+def test_max_lifetime():
+    pool = make_pool(MAX_LIFETIME=0)
+    connection = pool.acquire(Connection)
+    pool.release(connection)
+    assert connection.closed
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.wsgi import get_wsgi_application
+
+from core.utils import loadtest
+
+
+def test_run_wsgi_counts_queries(db):
+    counter = loadtest.QueryCounter()
+    counter.install()
+    try:
+        result = loadtest.run_wsgi(get_wsgi_application(), [
+            loadtest.Request('POST', '/api/token/', (('Content-Type', 'application/x-www-form-urlencoded'),),
+                             b'username=nobody&password=x'),
+        ], concurrency=2, duration=0.2)
+    finally:
+        counter.uninstall()
+    summary = result.summary()
+    assert summary['requests'] > 0
+    assert summary['statuses'] == {401: summary['requests']}
+    # The user lookup of each login attempt
+    assert counter.count == summary['requests']
+
+
+def test_benchmark_compare_flags_regressions(tmp_path):
+    def write(name, throughput, queries):
+        path = tmp_path / name
+        path.write_text(json.dumps({'meta': {}, 'scenarios': {'sample': {
+            'throughput': throughput, 'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 3.0, 'queries_per_request': queries,
+        }}}))
+        return str(path)
+
+    baseline = write('baseline.json', 1000.0, 1.0)
+    call_command('benchmark_compare', baseline, write('faster.json', 1050.0, 1.0), '--fail-on-regression')
+    with pytest.raises(CommandError, match='sample throughput'):
+        call_command('benchmark_compare', baseline, write('slower.json', 800.0, 1.0), '--fail-on-regression')
+    with pytest.raises(CommandError, match='sample queries_per_request'):
+        call_command('benchmark_compare', baseline, write('queries.json', 1000.0, 2.0), '--fail-on-regression')
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+from core.utils import metrics
+
+
+def test_collect_sums_worker_files(settings, tmp_path):
+    settings.METRICS = {'DIR': str(tmp_path), 'BUCKETS': (0.1, 1.0), 'MAX_ROUTES': 3}
+    # Two workers writing to their own files
+    for pid, durations in ((1, (0.05, 0.5)), (2, (5.0,))):
+        worker = metrics.MetricsFile(os.path.join(tmp_path, f'metrics_{pid}.db'), (0.1, 1.0), 3)
+        for duration in durations:
+            worker.observe('GET api/sample/', duration, error=duration > 1)
+        worker.close()
+
+    totals = metrics.collect()
+    requests, errors, duration_sum, *buckets = totals['GET api/sample/']
+    assert (requests, errors, buckets) == (3, 1, [1, 1, 1])
+    assert duration_sum == 5.55
+
+    text = metrics.render(totals)
+    assert 'http_requests_total{method="GET",route="api/sample/"} 3\n' in text
+    assert 'http_request_errors_total{method="GET",route="api/sample/"} 1\n' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="api/sample/",le="1.0"} 2\n' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="api/sample/",le="+Inf"} 3\n' in text
+
+
+def test_routes_beyond_capacity_overflow(tmp_path):
+    worker = metrics.MetricsFile(os.path.join(tmp_path, 'metrics_1.db'), (0.1,), 3)
+    for route in ('a', 'b', 'c', 'd'):
+        worker.observe(f'GET {route}', 0.01, error=False)
+    counts = {key: counters[metrics.REQUESTS] for key, counters in worker.read().items()}
+    worker.close()
+    assert counts == {metrics.OVERFLOW_KEY: 2, 'GET a': 1, 'GET b': 1}
+
+
+def _exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def test_exited_workers_are_merged(settings, tmp_path):
+    settings.METRICS = {'DIR': str(tmp_path), 'BUCKETS': (0.1, 1.0), 'MAX_ROUTES': 3}
+    for pid in (os.getpid(), _exited_pid(), _exited_pid()):
+        worker = metrics.MetricsFile(os.path.join(tmp_path, f'metrics_{pid}.db'), (0.1, 1.0), 3)
+        worker.observe('GET api/sample/', 0.05, error=False)
+        worker.close()
+    totals = metrics.collect()
+
+    metrics.merge_exited_workers()
+    assert sorted(path.name for path in tmp_path.glob('metrics_*.db')) == sorted(
+        [f'metrics_{os.getpid()}.db', metrics.MERGED_FILE]
+    )
+    assert metrics.collect() == totals
+
+    # Later exits add up in the merged file
+    worker = metrics.MetricsFile(os.path.join(tmp_path, f'metrics_{_exited_pid()}.db'), (0.1, 1.0), 3)
+    worker.observe('GET api/sample/', 5.0, error=True)
+    worker.close()
+    metrics.merge_exited_workers()
+    assert len(list(tmp_path.glob('metrics_*.db'))) == 2
+    requests, errors, _, *buckets = metrics.collect()['GET api/sample/']
+    assert (requests, errors, buckets) == (4, 1, [3, 0, 1])
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from rest_framework.test import APIClient
+
+from core.utils import profiling
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.PROFILING = {'TOKEN': 'secret', 'INTERVAL': 0.001, 'DIR': str(tmp_path), 'MAX_PROFILES': 3}
+    return tmp_path
+
+
+def busy_view(request):
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return HttpResponse('done')
+
+
+def test_off_by_default(settings):
+    settings.PROFILING = {}
+    with pytest.raises(MiddlewareNotUsed):
+        profiling.ProfilerMiddleware(busy_view)
+
+
+def test_sampler():
+    sampler = profiling.StackSampler(threading.get_ident(), 0.001)
+    sampler.start()
+    busy_view(None)
+    sampler.stop()
+    assert sampler.samples > 0
+    for line in sampler.collapsed().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+    assert 'busy_view (tests/utils/test_profiling.py:' in sampler.collapsed()
+
+
+def test_profiled_requests(profiles):
+    middleware = profiling.ProfilerMiddleware(busy_view)
+    factory = RequestFactory()
+    assert 'X-Profile-Id' not in middleware(factory.get('/busy/'))
+    assert 'X-Profile-Id' not in middleware(factory.get('/busy/', HTTP_X_PROFILE='wrong'))
+
+    response = middleware(factory.get('/busy/?key=value', HTTP_X_PROFILE='secret'))
+    profile_id = response['X-Profile-Id']
+    profile, = profiling.list_profiles()
+    assert profile['id'] == profile_id
+    assert profile['path'] == '/busy/' and profile['status'] == 200 and profile['samples'] > 0
+    with open(profiling.profile_path(profile_id)) as f:
+        assert 'busy_view' in f.read()
+
+
+def test_ring_is_bounded(profiles, settings):
+    settings.PROFILING = dict(settings.PROFILING, TOKEN='', SAMPLE_RATE=1.0)
+    middleware = profiling.ProfilerMiddleware(lambda request: HttpResponse())
+    ids = [middleware(RequestFactory().get('/'))['X-Profile-Id'] for _ in range(5)]
+    assert profiling.profile_ids() == ids[:-4:-1]
+    assert len(list(profiles.iterdir())) == 6
+    assert profiling.profile_path(ids[0]) is None
+    assert profiling.profile_path('../../etc/passwd') is None
+
+
+def test_ids_sort_by_creation(monkeypatch):
+    # Even when created within the same clock tick
+    monkeypatch.setattr(profiling.time, 'time_ns', lambda: 1700000000000000000)
+    ids = [profiling.new_profile_id() for _ in range(100)]
+    assert sorted(ids) == ids
+
+
+def test_profiles_api(profiles, db):
+    response = Client().get('/api/sample/', HTTP_X_PROFILE='secret')
+    profile_id = response['X-Profile-Id']
+
+    user = get_user_model().objects.create_user('profiles-user')
+    client = APIClient()
+    client.force_authenticate(user)
+    assert client.get('/api/profiles/').status_code == 403
+
+    user.is_staff = True
+    user.save()
+    profile, = client.get('/api/profiles/').json()
+    assert profile['id'] == profile_id and profile['path'] == '/api/sample/'
+    response = client.get(f'/api/profiles/{profile_id}/')
+    assert response.status_code == 200
+    assert f'{profile_id}.folded' in response['Content-Disposition']
+    with open(profiling.profile_path(profile_id), 'rb') as f:
+        assert b''.join(response.streaming_content) == f.read()
+    assert client.get('/api/profiles/00000000000000000000-00000000/').status_code == 404
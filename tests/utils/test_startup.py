@@ -0,0 +1,49 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management import call_command
+from django.test import Client
+
+from core.utils import warmup
+
+LOADED = '''
+import json, sys
+import django
+django.setup()
+from django.urls import get_resolver, resolve
+get_resolver().url_patterns
+resolve('/api/users/')
+resolve('/api/docs/')
+print(json.dumps([module in sys.modules for module in ('drf_yasg.views', 'config.admin_urls')]))
+'''
+
+
+def test_docs_and_admin_are_loaded_lazily():
+    process = subprocess.run([sys.executable, '-c', LOADED], capture_output=True, text=True, env=os.environ)
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout) == [False, False]
+
+
+def test_lazy_admin_urls(db):
+    assert Client().get('/admin/login/').status_code == 200
+
+
+def test_ready_after_warmup(monkeypatch, settings):
+    settings.WARMUP = {'URLS': ('/api/users/', '/missing/'), 'TEMPLATES': ('login.html',)}
+    monkeypatch.setattr(warmup, '_ready', warmup._ready.__class__())
+    client = Client()
+    assert client.get('/ready').status_code == 503
+    warmup.run()
+    assert client.get('/ready').status_code == 200
+
+
+def test_startup_profile():
+    out = io.StringIO()
+    call_command('startup_profile', '--repeat', '1', '--top', '3', stdout=out)
+    output = out.getvalue()
+    for phase in ('django.setup()', 'URLconf', 'middleware'):
+        assert phase in output
+    assert 'Slowest imports' in output
@@ -0,0 +1,119 @@
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.utils.http import http_date, parse_http_date
+
+from core.utils.staticfiles import IMMUTABLE_CACHE_CONTROL, StaticFilesMiddleware
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'static')
+
+
+@pytest.fixture(scope='module')
+def root(tmp_path_factory):
+    return tmp_path_factory.mktemp('static')
+
+
+@pytest.fixture(scope='module')
+def middleware(root):
+    with override_settings(
+        DEBUG=False,
+        STATIC_URL='/static/',
+        STATIC_ROOT=str(root),
+        STATICFILES_DIRS=[STATIC_DIR],
+        STATICFILES_STORAGE='core.utils.staticfiles.CompressedManifestStaticFilesStorage',
+        # Fast levels; the admin and Swagger UI files are collected too
+        STATIC_SERVING={'GZIP_LEVEL': 1, 'BROTLI_QUALITY': 1},
+    ):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        middleware = StaticFilesMiddleware(lambda request: HttpResponse('view'))
+    with open(root / 'staticfiles.json') as f:
+        middleware.paths = json.load(f)['paths']
+    return middleware
+
+
+def serve(middleware, path, method='get', **headers):
+    request = getattr(RequestFactory(), method)(path, **headers)
+    response = middleware(request)
+    if hasattr(response, 'file_to_stream'):
+        content = b''.join(response.streaming_content)
+        response.file_to_stream.close()
+        return response, content
+    return response, response.content
+
+
+def test_collectstatic_writes_variants(middleware, root):
+    hashed = middleware.paths['css/bootstrap.min.css']
+    assert hashed != 'css/bootstrap.min.css'
+    assert (root / (hashed + '.gz')).exists()
+    # Too small to be worth compressing
+    assert not (root / 'css' / 'base.css.gz').exists()
+
+
+def test_serves_hashed_files_compressed_and_immutable(middleware, root):
+    hashed = middleware.paths['css/bootstrap.min.css']
+    response, content = serve(middleware, '/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/css; charset=utf-8'
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert response['Vary'] == 'Accept-Encoding'
+    assert int(response['Content-Length']) == len(content)
+    assert gzip.decompress(content) == (root / hashed).read_bytes()
+
+
+def test_serves_original_names_uncompressed(middleware, root):
+    response, content = serve(middleware, '/static/css/bootstrap.min.css', HTTP_ACCEPT_ENCODING='identity')
+    assert not response.has_header('Content-Encoding')
+    assert response['Cache-Control'] == 'public, max-age=60'
+    assert content == (root / 'css' / 'bootstrap.min.css').read_bytes()
+
+
+def test_conditional_and_head_requests(middleware):
+    response, _ = serve(middleware, '/static/css/base.css')
+    response, content = serve(middleware, '/static/css/base.css', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+    response, content = serve(middleware, '/static/css/base.css', 'head')
+    assert response.status_code == 200
+    assert content == b''
+    assert response['Content-Length'] == str(os.path.getsize(os.path.join(STATIC_DIR, 'css', 'base.css')))
+
+
+def test_modification_dates(middleware):
+    response, _ = serve(middleware, '/static/css/base.css')
+    last_modified = response['Last-Modified']
+    assert parse_http_date(last_modified)
+    response, _ = serve(middleware, '/static/css/base.css', HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+    response, _ = serve(middleware, '/static/css/base.css', HTTP_IF_MODIFIED_SINCE=http_date(86400))
+    assert response.status_code == 200
+    response, _ = serve(middleware, '/static/css/base.css', HTTP_IF_UNMODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+    response, _ = serve(middleware, '/static/css/base.css', HTTP_IF_UNMODIFIED_SINCE=http_date(86400))
+    assert response.status_code == 412
+
+
+def test_other_requests_go_through(middleware):
+    for path in ('/static/missing.css', '/api/sample/', '/static/../config/urls.py'):
+        assert serve(middleware, path)[1] == b'view'
+    assert serve(middleware, '/static/css/base.css', 'post')[1] == b'view'
+
+
+def test_async_chain(middleware, root):
+    async def view(request):
+        return HttpResponse('view')
+
+    with override_settings(DEBUG=False, STATIC_URL='/static/', STATIC_ROOT=str(root)):
+        async_middleware = StaticFilesMiddleware(view)
+    # Awaited by Django, without a thread hop
+    assert asyncio.iscoroutinefunction(async_middleware)
+    hashed = middleware.paths['css/bootstrap.min.css']
+    response = asyncio.run(async_middleware(RequestFactory().get('/static/' + hashed)))
+    assert response.status_code == 200
+    response.file_to_stream.close()
+    assert asyncio.run(async_middleware(RequestFactory().get('/api/users/'))).content == b'view'